@@ -1,13 +1,21 @@
+import os
+
 from flask import Flask
-from config import SQL_ALCHEMY_DB_CONNECTION_URL, BACKEND_SERVER_PORT, PRODUCT_CSV_PATH
+from config import SQL_ALCHEMY_DB_CONNECTION_URL, BACKEND_SERVER_PORT, PRODUCT_CSV_PATH, EXECUTION_WORKERS, \
+    EXECUTION_BATCH_SIZE, EXECUTION_POLL_INTERVAL_SECONDS
 from routes.order import orders_bp
 from routes.statistics import statistics_bp
 from routes.users import users_bp
 from routes.products import product_bp
 from routes.categories import categories_bp
 from database import get_db_connection
+from repository.countries import get_country_catalog
 from utils.authentication import setup_jwt_authentication
+from utils.commands import setup_cli_commands
+from utils.db_utils import add_missing_columns, add_missing_indexes
 from service.csv_parser_service import load_products_from_csv
+from service.db.product_search_service import create_product_search_index
+from service.execution_worker import ExecutionWorkerPool
 
 
 def setup_app():
@@ -19,11 +27,20 @@ def setup_app():
     db.init_app(app)
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        add_missing_indexes()
+        create_product_search_index()
         load_products_from_csv(PRODUCT_CSV_PATH)
 
+    # loads the bundled countries snapshot so order validation doesn't wait for the countries api
+    get_country_catalog()
+
     # for session managing
     setup_jwt_authentication(app)
 
+    # maintenance commands
+    setup_cli_commands(app)
+
     # routs
     app.register_blueprint(users_bp)
     app.register_blueprint(product_bp)
@@ -34,7 +51,21 @@ def setup_app():
     return app
 
 
+def start_execution_workers(app: Flask) -> None:
+    """
+    Starts the threads draining the asynchronous order execution queue.
+
+    Only called by the serving entrypoint, so CLI commands and other importers of the app don't execute orders.
+    """
+    if EXECUTION_WORKERS > 0:
+        ExecutionWorkerPool(app, EXECUTION_WORKERS, EXECUTION_BATCH_SIZE, EXECUTION_POLL_INTERVAL_SECONDS).start()
+
+
 application = setup_app()
 
 if __name__ == '__main__':
+    # with the debug reloader this module runs in a watcher process and in the serving child process,
+    # only the child (WERKZEUG_RUN_MAIN) serves requests.
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_execution_workers(application)
     application.run(host="0.0.0.0", port=BACKEND_SERVER_PORT, debug=True)
@@ -15,3 +15,80 @@ APP_NAME = "E-commerce app"
 SQL_ALCHEMY_DB_CONNECTION_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:{POSTGRES_PORT}/{POSTGRES_DB}"
 
 PRODUCT_CSV_PATH = "./data/products.csv"
+
+# Countries catalog (used for validating order locations)
+COUNTRIES_API_URL = "https://countriesnow.space/api/v0.1/countries"
+COUNTRIES_SNAPSHOT_PATH = "./data/countries.json"
+COUNTRIES_CACHE_TTL_SECONDS = int(os.getenv("COUNTRIES_CACHE_TTL_SECONDS", 24 * 60 * 60))
+COUNTRIES_REQUEST_TIMEOUT_SECONDS = 5
+
+# Pagination
+ORDERS_PAGE_DEFAULT_SIZE = 20
+ORDERS_PAGE_MAX_SIZE = 100
+
+PRODUCTS_PAGE_DEFAULT_SIZE = 20
+PRODUCTS_PAGE_MAX_SIZE = 100
+
+# Bulk product upsert (POST /products/upsert)
+PRODUCTS_UPSERT_BATCH_SIZE = 1000
+PRODUCTS_UPSERT_MAX_ROWS = int(os.getenv("PRODUCTS_UPSERT_MAX_ROWS", 100000))
+
+# Product search (/products/search)
+PRODUCT_SEARCH_DEFAULT_LIMIT = 10
+PRODUCT_SEARCH_MAX_LIMIT = 50
+# lowest trigram similarity of a fuzzy match (on postgres the pg_trgm.similarity_threshold setting, 0.3 by default)
+PRODUCT_SEARCH_MIN_SIMILARITY = 0.3
+
+# Orders export
+ORDERS_EXPORT_BATCH_SIZE = 1000
+
+# Idempotency keys (POST /orders/)
+IDEMPOTENCY_KEY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", 24 * 60 * 60))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10000))
+# share stored responses between workers through the idempotency_keys table
+IDEMPOTENCY_USE_DATABASE = os.getenv("IDEMPOTENCY_USE_DATABASE", "false").lower() == "true"
+# a key still pending after this long was abandoned (crashed worker) and can be claimed again
+IDEMPOTENCY_PENDING_TIMEOUT_SECONDS = 60
+
+# Asynchronous order execution (POST /orders/execute/async)
+# number of worker threads started by the server (`python app.py`, not by `flask` commands),
+# 0 to run them only via `flask run-execution-workers`
+EXECUTION_WORKERS = int(os.getenv("EXECUTION_WORKERS", 2))
+EXECUTION_BATCH_SIZE = int(os.getenv("EXECUTION_BATCH_SIZE", 100))
+EXECUTION_POLL_INTERVAL_SECONDS = float(os.getenv("EXECUTION_POLL_INTERVAL_SECONDS", 1))
+# a job whose order hits a database error is retried, and marked as failed after this many attempts
+EXECUTION_JOB_MAX_ATTEMPTS = 3
+# running jobs older than this are considered abandoned (crashed worker) and are claimed again
+EXECUTION_JOB_LEASE_SECONDS = int(os.getenv("EXECUTION_JOB_LEASE_SECONDS", 300))
+
+# Statistics results cache (/statistics/profit, /product-sales, /category-product-sales)
+# results are invalidated when executed orders change, this bounds staleness for changes made by other workers
+STATISTICS_CACHE_MAX_STALENESS_SECONDS = float(os.getenv("STATISTICS_CACHE_MAX_STALENESS_SECONDS", 30))
+STATISTICS_CACHE_MAX_ENTRIES = 128
+
+# In-memory sales analytics (/statistics/analytics/...)
+# database the executed order items are loaded from, e.g. a read replica (defaults to the app database)
+ANALYTICS_DATABASE_URL = os.getenv("ANALYTICS_DATABASE_URL")
+# new executions are loaded at most this often
+ANALYTICS_REFRESH_INTERVAL_SECONDS = float(os.getenv("ANALYTICS_REFRESH_INTERVAL_SECONDS", 5))
+# incremental loads re-read this far back, for executions committed after later ones were loaded
+ANALYTICS_REFRESH_OVERLAP_SECONDS = 60
+# everything is reloaded this often, to drop executed orders deleted by other workers
+ANALYTICS_FULL_RELOAD_SECONDS = int(os.getenv("ANALYTICS_FULL_RELOAD_SECONDS", 60 * 60))
+
+# Top selling products (/statistics/top-products)
+TOP_PRODUCTS_MAX_K = 50
+
+# Distinct buyers per product/category (/statistics/distinct-buyers)
+# HyperLogLog precision, 2 ** precision registers with ~1.04 / sqrt(2 ** precision) relative error.
+# Changing it requires `flask --app app rebuild-distinct-buyers`.
+DISTINCT_BUYERS_HLL_PRECISION = 11
+
+# Order value percentiles (/statistics/order-value-percentiles)
+# t-digest compression, higher keeps more centroids (~compression / 2) and gives more accurate tail percentiles
+ORDER_VALUE_DIGEST_COMPRESSION = 200
+
+# Product details cache (GET /products/?name=, GET /products/<id>)
+PRODUCT_CACHE_MAX_ENTRIES = int(os.getenv("PRODUCT_CACHE_MAX_ENTRIES", 10000))
+# bounds how stale a product can be when it was changed by another worker
+PRODUCT_CACHE_TTL_SECONDS = int(os.getenv("PRODUCT_CACHE_TTL_SECONDS", 60))
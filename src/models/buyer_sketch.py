@@ -0,0 +1,79 @@
+from datetime import datetime
+from database import get_db_connection
+
+db = get_db_connection()
+
+
+class ProductBuyersSketch(db.Model):
+    """
+    HyperLogLog sketch of the distinct users that bought a product on one day, by the orders' execution time.
+
+    Attributes:
+        product_id (int): Foreign key to Product, part of composite primary key.
+        day (date): The execution day, part of composite primary key.
+        sketch (bytes): The serialized HyperLogLog sketch of the buyers' user ids.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'product_buyers_sketch'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sketch = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CategoryBuyersSketch(db.Model):
+    """
+    HyperLogLog sketch of the distinct users that bought products of a category on one day
+    (by the products' category when the buyers were recorded).
+
+    Attributes:
+        category_id (int): Foreign key to Category, part of composite primary key.
+        day (date): The execution day, part of composite primary key.
+        sketch (bytes): The serialized HyperLogLog sketch of the buyers' user ids.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'category_buyers_sketch'
+
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sketch = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ProductBuyersTotalSketch(db.Model):
+    """
+    HyperLogLog sketch of the distinct users that ever bought a product, merged with the daily sketch updates
+    so reads without a day range don't merge every day.
+
+    Attributes:
+        product_id (int): Foreign key to Product, primary key.
+        sketch (bytes): The serialized HyperLogLog sketch of the buyers' user ids.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'product_buyers_total_sketch'
+
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    sketch = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CategoryBuyersTotalSketch(db.Model):
+    """
+    HyperLogLog sketch of the distinct users that ever bought products of a category
+    (by the products' category when the buyers were recorded).
+
+    Attributes:
+        category_id (int): Foreign key to Category, primary key.
+        sketch (bytes): The serialized HyperLogLog sketch of the buyers' user ids.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'category_buyers_total_sketch'
+
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    sketch = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,51 @@
+from datetime import datetime
+from database import get_db_connection
+
+db = get_db_connection()
+
+JOB_STATUS_QUEUED = 'queued'
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_DONE = 'done'
+JOB_STATUS_FAILED = 'failed'
+ACTIVE_JOB_STATUSES_SQL = f"status IN ('{JOB_STATUS_QUEUED}', '{JOB_STATUS_RUNNING}')"
+
+
+class ExecutionJob(db.Model):
+    """
+    Represents a queued request to execute an order, drained by the execution workers.
+
+    Attributes:
+        id (int): Primary key, also the job id returned to the client.
+        order_id (int): Foreign key to the Order to execute.
+        user_id (int): Foreign key to the User that requested the execution.
+        status (str): One of queued, running, done or failed.
+        error (str): Why the order wasn't executed, for failed jobs.
+        total_price (float): The executed order's total price, for done jobs.
+        started_at (datetime): When a worker claimed the job, used to re-queue jobs of crashed workers.
+        attempts (int): Number of executions that failed with a database error.
+        created_at (datetime): Timestamp when the job was queued.
+        updated_at (datetime): Timestamp of the last status change.
+    """
+    __tablename__ = 'execution_jobs'
+    __table_args__ = (
+        # workers claim the oldest queued jobs
+        db.Index('ix_execution_jobs_status_id', 'status', 'id'),
+        # at most one queued or running job per order
+        db.Index('ux_execution_jobs_active_order_id', 'order_id', unique=True,
+                 postgresql_where=db.text(ACTIVE_JOB_STATUSES_SQL), sqlite_where=db.text(ACTIVE_JOB_STATUSES_SQL)),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=JOB_STATUS_QUEUED)
+    error = db.Column(db.Text)
+    total_price = db.Column(db.Float)
+    started_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ExecutionJob {self.id} order={self.order_id} {self.status}>'
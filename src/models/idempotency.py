@@ -0,0 +1,35 @@
+from datetime import datetime
+from database import get_db_connection
+
+db = get_db_connection()
+
+
+class IdempotencyKey(db.Model):
+    """
+    Represents the stored response of a request made with an Idempotency-Key header.
+
+    Only used when the idempotency store is shared between workers through the database. A row is inserted
+    as pending when a request claims its key, and completed with the response once the request succeeded.
+
+    Attributes:
+        user_id (int): The user that sent the request, part of composite primary key.
+        key (str): The Idempotency-Key header value, part of composite primary key.
+        request_hash (str): Hash of the request body, used to detect a key reused for another request.
+        pending (bool): Whether the request is still running (status_code and response_body are empty).
+        status_code (int): The HTTP status of the original response.
+        response_body (str): The JSON body of the original response.
+        created_at (datetime): Timestamp when the key was claimed.
+    """
+    __tablename__ = 'idempotency_keys'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    pending = db.Column(db.Boolean, nullable=False, default=False, server_default=db.text('false'))
+    status_code = db.Column(db.Integer, nullable=False)
+    response_body = db.Column(db.Text, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<IdempotencyKey {self.user_id}:{self.key}>'
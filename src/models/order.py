@@ -33,14 +33,29 @@ class Order(db.Model):
         created_at (datetime): Timestamp when the order was created.
         items (List[OrderItem]): List of OrderItem instances in this order.
         user_id (int): Foreign key to the User who placed the order.
+        total_quantity (int): Total number of units in the order, kept in sync with its items.
+        total_price (float): Sum of unit_price * quantity of the order's items.
+        executed_at (datetime): Timestamp when the order was executed.
     """
     __tablename__ = 'orders'
+    __table_args__ = (
+        # order history is listed per user, newest first (keyset pagination on created_at, id)
+        db.Index('ix_orders_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        # the analytics data is refreshed with the orders executed since its last load
+        db.Index('ix_orders_executed_at', 'executed_at'),
+        # per country statistics read the executed orders of one location
+        db.Index('ix_orders_location_executed', 'location', 'executed'),
+    )
     id = db.Column(db.Integer, primary_key=True)
 
     items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan', passive_deletes=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     executed = db.Column(db.Boolean, default=False)
+    executed_at = db.Column(db.DateTime)
     location = db.Column(db.String, nullable=False)
+    # computed when the items are written, so sales reports don't need to read the items
+    total_quantity = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_price = db.Column(db.Float, nullable=False, default=0, server_default='0')
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
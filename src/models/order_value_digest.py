@@ -0,0 +1,25 @@
+from datetime import datetime
+from database import get_db_connection
+
+db = get_db_connection()
+
+
+class OrderValueDigest(db.Model):
+    """
+    t-digest of the total price of the orders executed on one day in one location (country).
+
+    Attributes:
+        day (date): The execution day, part of composite primary key.
+        location (str): The orders' location, part of composite primary key.
+        orders_count (int): Number of orders in the digest.
+        digest (bytes): The serialized t-digest of the orders' total price.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'order_value_digest'
+
+    day = db.Column(db.Date, primary_key=True)
+    location = db.Column(db.String, primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    digest = db.Column(db.LargeBinary, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
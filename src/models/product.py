@@ -18,6 +18,17 @@ class Product(db.Model):
         updated_at (datetime): Last updated timestamp.
     """
     __tablename__ = 'products'
+    __table_args__ = (
+        # catalog listing: keyset pagination on (sort column, id), optionally within a category
+        db.Index('ix_products_category_id_id', 'category_id', 'id'),
+        db.Index('ix_products_price_id', 'price', 'id'),
+        db.Index('ix_products_category_id_price_id', 'category_id', 'price', 'id'),
+        db.Index('ix_products_category_id_name', 'category_id', 'name'),
+        # conditional GET of a category's products: latest update time per category
+        db.Index('ix_products_category_id_updated_at', 'category_id', 'updated_at'),
+        # incremental refresh of the in-memory sales analytics
+        db.Index('ix_products_updated_at', 'updated_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), unique=True, nullable=False)
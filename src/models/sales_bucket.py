@@ -0,0 +1,52 @@
+from datetime import datetime
+from database import get_db_connection
+
+db = get_db_connection()
+
+SALES_BUCKET_GRANULARITIES = ('hour', 'day')
+
+
+class ProductSalesBucket(db.Model):
+    """
+    Sales of a product in one time bucket (hour or day), by the orders' execution time.
+
+    Attributes:
+        granularity (str): 'hour' or 'day', part of composite primary key.
+        bucket_start (datetime): Start of the bucket, part of composite primary key.
+        product_id (int): Foreign key to Product, part of composite primary key.
+        quantity_sold (int): Units sold in the bucket.
+        revenue (float): Sum of unit_price * quantity of the units sold in the bucket.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'product_sales_bucket'
+
+    granularity = db.Column(db.String(5), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CategorySalesBucket(db.Model):
+    """
+    Sales of a category (by the products' current category) in one time bucket (hour or day).
+
+    Attributes:
+        granularity (str): 'hour' or 'day', part of composite primary key.
+        bucket_start (datetime): Start of the bucket, part of composite primary key.
+        category_id (int): Foreign key to Category, part of composite primary key.
+        quantity_sold (int): Units sold in the bucket.
+        revenue (float): Sum of unit_price * quantity of the units sold in the bucket.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'category_sales_bucket'
+
+    granularity = db.Column(db.String(5), primary_key=True)
+    bucket_start = db.Column(db.DateTime, primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
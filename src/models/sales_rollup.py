@@ -0,0 +1,70 @@
+from datetime import datetime
+from database import get_db_connection
+
+db = get_db_connection()
+
+
+class ProductSalesRollup(db.Model):
+    """
+    Running sales totals of a product over all executed orders.
+
+    Updated in the same transaction that executes (or deletes) orders, rebuilt from order_item
+    with `flask rebuild-sales-rollups`.
+
+    Attributes:
+        product_id (int): Foreign key to Product, primary key.
+        quantity_sold (int): Total units sold.
+        revenue (float): Sum of unit_price * quantity of the sold units.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'product_sales_rollup'
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# best selling products: ORDER BY quantity_sold DESC, product_id LIMIT k
+db.Index('ix_product_sales_rollup_quantity_sold',
+         ProductSalesRollup.quantity_sold.desc(), ProductSalesRollup.product_id)
+
+
+class CategorySalesRollup(db.Model):
+    """
+    Running sales totals of a category (by the products' current category) over all executed orders.
+
+    Attributes:
+        category_id (int): Foreign key to Category, primary key.
+        quantity_sold (int): Total units sold.
+        revenue (float): Sum of unit_price * quantity of the sold units.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'category_sales_rollup'
+
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id', ondelete='CASCADE'), primary_key=True)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class LocationSalesRollup(db.Model):
+    """
+    Running sales totals of a shipping country over all executed orders.
+
+    Attributes:
+        location (str): The country name, primary key.
+        orders_count (int): Number of executed orders shipped to the country.
+        quantity_sold (int): Total units sold.
+        revenue (float): Total price of the executed orders.
+        updated_at (datetime): Timestamp of the last change.
+    """
+    __tablename__ = 'location_sales_rollup'
+
+    location = db.Column(db.String, primary_key=True)
+    orders_count = db.Column(db.Integer, nullable=False, default=0)
+    quantity_sold = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
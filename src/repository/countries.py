@@ -1,4 +1,13 @@
+import json
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+
 import requests
+from cachetools import TTLCache
+
+from config import COUNTRIES_API_URL, COUNTRIES_SNAPSHOT_PATH, COUNTRIES_CACHE_TTL_SECONDS, \
+    COUNTRIES_REQUEST_TIMEOUT_SECONDS
 
 
 def get_all_countries() -> list[str]:
@@ -15,7 +24,7 @@ def get_all_countries() -> list[str]:
         requests.exceptions.HTTPError: If the request to the API fails (non-200 status).
         requests.exceptions.RequestException: For any network-related errors.
     """
-    response = requests.get("https://countriesnow.space/api/v0.1/countries")
+    response = requests.get(COUNTRIES_API_URL, timeout=COUNTRIES_REQUEST_TIMEOUT_SECONDS)
     response.raise_for_status()
     countries = response.json()
 
@@ -24,3 +33,118 @@ def get_all_countries() -> list[str]:
         for country in countries['data']
     ]
     return allowed_countries
+
+
+def load_countries_snapshot(snapshot_path: str) -> list[str]:
+    """
+    Loads the bundled list of country names from a JSON file.
+
+    Args:
+        snapshot_path: Path to a JSON file containing a list of country names.
+
+    Returns:
+        list[str]: The country names, or an empty list if the file is missing or malformed.
+    """
+    try:
+        with open(snapshot_path, encoding="utf-8") as snapshot_file:
+            return list(json.load(snapshot_file))
+    except (OSError, ValueError) as e:
+        print(f"couldn't load countries snapshot from {snapshot_path}: {str(e)}")
+        return []
+
+
+def normalize_country_name(name: str) -> str:
+    """
+    Normalizes a country name for lookups (case-insensitive, whitespace collapsed).
+
+    Args:
+        name: The country name as given by the user or the API.
+
+    Returns:
+        str: The normalized lookup key.
+    """
+    return " ".join(name.split()).casefold()
+
+
+class CountryCatalog:
+    """
+    In-process catalog of the countries we ship to.
+
+    The catalog starts from the bundled snapshot, so it can answer lookups without any network access.
+    Fresh data is kept in a TTL cache; once it expires, lookups keep answering from the last known
+    list while a single background thread re-fetches it from the API (stale-while-revalidate).
+    A failed refresh keeps the previous list and is retried after another TTL period.
+    """
+    _CACHE_KEY = "countries"
+
+    def __init__(self, snapshot_path: str, ttl_seconds: int, fetcher=get_all_countries):
+        self._fetcher = fetcher
+        self._cache = TTLCache(maxsize=1, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._countries = self._index(load_countries_snapshot(snapshot_path))
+
+    @staticmethod
+    def _index(names: Iterable[str]) -> Dict[str, str]:
+        return {normalize_country_name(name): name for name in names if name}
+
+    def _current(self) -> Dict[str, str]:
+        with self._lock:
+            countries = self._cache.get(self._CACHE_KEY)
+            if countries is not None:
+                return countries
+            if self._countries and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self.refresh, daemon=True).start()
+            stale_countries = self._countries
+
+        # nothing to fall back to (no snapshot yet), so we have to wait for the API once.
+        if not stale_countries:
+            self.refresh()
+            return self._countries
+        return stale_countries
+
+    def refresh(self) -> bool:
+        """
+        Re-fetches the country list from the API and replaces the cached one.
+
+        Returns:
+            bool: True if the list was refreshed, False if the API call failed.
+        """
+        try:
+            countries = self._index(self._fetcher())
+        except (requests.RequestException, KeyError, TypeError, ValueError) as e:
+            print(f"couldn't refresh the countries catalog: {str(e)}")
+            countries = None
+
+        with self._lock:
+            self._refreshing = False
+            if countries:
+                self._countries = countries
+            # on failure the previous list is cached again, so the API is retried only after the ttl.
+            self._cache[self._CACHE_KEY] = self._countries
+
+        return bool(countries)
+
+    def resolve(self, name: Optional[str]) -> Optional[str]:
+        """
+        Finds the canonical spelling of a country name.
+
+        Args:
+            name: The country name to look up.
+
+        Returns:
+            Optional[str]: The canonical country name, or None if we don't ship to it.
+        """
+        if not name:
+            return None
+        return self._current().get(normalize_country_name(name))
+
+    def __contains__(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+
+# using a singleton so all requests share the same cached catalog.
+@lru_cache(maxsize=1)
+def get_country_catalog() -> CountryCatalog:
+    return CountryCatalog(COUNTRIES_SNAPSHOT_PATH, COUNTRIES_CACHE_TTL_SECONDS)
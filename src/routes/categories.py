@@ -2,7 +2,8 @@ import http
 
 from flask import Blueprint, request, jsonify
 from service.db.category_service import get_all_categories, get_products_by_category, update_category_name, \
-    delete_category
+    delete_category, get_categories_version, get_category_products_version
+from utils.http_cache import is_not_modified, not_modified_response, set_version_headers
 
 categories_bp = Blueprint('categories', __name__, url_prefix='/categories')
 
@@ -12,15 +13,22 @@ def handle_get_all_categories():
     """
     Get a list of all category names.
 
+    Supports conditional requests: the response has ETag and Last-Modified headers, and a request with a
+    matching If-None-Match (or If-Modified-Since) gets an empty 304 Not Modified response.
+
     Returns:
         JSON with list of category names and HTTP 200 status,
+        HTTP 304 if the client's copy is current,
         or HTTP 500 on failure.
     """
     try:
+        version = get_categories_version()
+        if is_not_modified(version):
+            return not_modified_response(version)
 
         categories = [category.name for category in get_all_categories()]
 
-        return jsonify({"categories": categories}), http.HTTPStatus.OK
+        return set_version_headers(jsonify({"categories": categories}), version), http.HTTPStatus.OK
     except Exception as e:
         return jsonify({"errors": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
 
@@ -30,6 +38,8 @@ def handle_get_products_by_category(category_name):
     """
     Get all product names belonging to a given category.
 
+    Supports conditional requests, like the categories list.
+
     Args:
         category_name (str): Provided via URL path parameter.
 
@@ -38,6 +48,7 @@ def handle_get_products_by_category(category_name):
             {
                 "<category_name>": [<product_name>, ...]
             }
+        - HTTP 304 Not Modified: The client's copy is current (empty body).
         - HTTP 400 Bad Request:
             {
                 "error": "missing 'category' argument."
@@ -52,9 +63,14 @@ def handle_get_products_by_category(category_name):
         return jsonify({"error": " missing 'category' argument ."}), http.HTTPStatus.BAD_REQUEST
 
     try:
+        version = get_category_products_version(category_name)
+        if version and is_not_modified(version):
+            return not_modified_response(version)
+
         products = get_products_by_category(category_name)
         if products:
-            return jsonify({f"{category_name}": products}), http.HTTPStatus.OK
+            response = jsonify({f"{category_name}": products})
+            return (set_version_headers(response, version) if version else response), http.HTTPStatus.OK
 
     except Exception as e:
         return jsonify({"errors": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
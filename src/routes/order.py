@@ -1,12 +1,20 @@
 import http
+import json
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from pydantic import ValidationError
-from werkzeug.exceptions import BadRequest
-
-from schemas.order import CreateOrder, ExecuteOrder, UpdateOrderInput, DeleteOrderInput
-from service.db.order_service import create_order, get_user_orders, execute_order, update_order, delete_order
+from werkzeug.exceptions import BadRequest, Conflict, UnprocessableEntity
+
+from config import ORDERS_PAGE_DEFAULT_SIZE, ORDERS_PAGE_MAX_SIZE
+from schemas.order import CreateOrder, ExecuteOrder, UpdateOrderInput, DeleteOrderInput, ExecuteOrdersBatch
+from service.db.order_service import create_order, get_user_orders, execute_order, update_order, delete_order, \
+    execute_orders, iter_orders_export
+from repository.countries import get_country_catalog
+from service.db.execution_job_service import enqueue_order_execution, get_execution_job
+from service.idempotency_service import replay_or_run
+from utils.pagination import parse_page_size
+from utils.query_params import parse_bool_param, parse_datetime_param
 
 orders_bp = Blueprint('orders', __name__, url_prefix='/orders')
 
@@ -20,7 +28,7 @@ def handle_create_order():
     Expects:
         JSON payload matching the CreateOrder schema:
         {
-            "user_id": int,
+            "location": str,
             "items": [
                 {
                     "product_id": int,
@@ -33,6 +41,11 @@ def handle_create_order():
     Requires:
         - A valid JWT token in the Authorization header.
 
+    Optional headers:
+        - Idempotency-Key: a unique value per order. Retrying the request with the same key and body
+          returns the original response (with an "Idempotent-Replayed: true" header) instead of
+          creating another order. A retry sent while the original request is still running gets a 409.
+
     Returns:
         - HTTP 201 Created:
             {
@@ -42,21 +55,54 @@ def handle_create_order():
             {
                 "errors": <validation_errors>
             }
+            or
+            {
+                "error": "<invalid location / missing products message>"
+            }
+        - HTTP 409 Conflict:
+            {
+                "error": "A request with this Idempotency-Key is still being processed, retry later."
+            }
+        - HTTP 422 Unprocessable Entity:
+            {
+                "error": "Idempotency-Key was already used for a different request."
+            }
     """
     try:
         order = CreateOrder(**request.json)
-        new_order = create_order(order)
-        return jsonify({"id": new_order.id}), http.HTTPStatus.CREATED
+
+        def run_create_order():
+            return {"id": create_order(order).id}, http.HTTPStatus.CREATED
+
+        idempotency_key = request.headers.get("Idempotency-Key")
+        if not idempotency_key:
+            body, status_code = run_create_order()
+            return jsonify(body), status_code
+
+        user_id = int(get_jwt_identity())
+        response, replayed = replay_or_run(user_id, idempotency_key, request.json, run_create_order)
+        headers = {"Idempotent-Replayed": "true"} if replayed else {}
+        return jsonify(response.body), response.status_code, headers
 
     except ValidationError as e:
         return jsonify({"errors": e.errors()}), http.HTTPStatus.BAD_REQUEST
+    except (ValueError, BadRequest) as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Conflict as e:
+        return jsonify({"error": e.description}), http.HTTPStatus.CONFLICT
+    except UnprocessableEntity as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.UNPROCESSABLE_ENTITY
 
 
 @orders_bp.route('/', methods=['GET'])
 @jwt_required()
 def handle_get_user_order():
     """
-    Retrieve all orders for the authenticated user.
+    Retrieve the authenticated user's orders, newest first, one page at a time.
+
+    Query params:
+        limit (optional): Page size, defaults to 20 and is capped at 100.
+        cursor (optional): The "next_cursor" returned with the previous page.
 
     Requires:
         - A valid JWT token in the Authorization header.
@@ -80,7 +126,13 @@ def handle_get_user_order():
                         ]
                     },
                     ...
-                ]
+                ],
+                "next_cursor": str | null
+            }
+
+        - HTTP 400 Bad Request:
+            {
+                "error": "<invalid limit / cursor message>"
             }
 
         - HTTP 500 Internal Server Error:
@@ -88,12 +140,56 @@ def handle_get_user_order():
                 "error": "failed to get orders for user <user_id>"
             }
     """
-    user_id = get_jwt_identity()
+    user_id = int(get_jwt_identity())
     try:
-        orders = get_user_orders(user_id)
-        return jsonify({"user": f"{user_id}", "orders": orders}), http.HTTPStatus.OK
+        limit = parse_page_size(request.args.get("limit"), ORDERS_PAGE_DEFAULT_SIZE, ORDERS_PAGE_MAX_SIZE)
+        orders, next_cursor = get_user_orders(user_id, limit, request.args.get("cursor"))
+        return (jsonify({"user": f"{user_id}", "orders": orders, "next_cursor": next_cursor}),
+                http.HTTPStatus.OK)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
     except Exception:
-        return jsonify({"error": f"failed to get orders for user {user_id}"})
+        return jsonify({"error": f"failed to get orders for user {user_id}"}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@orders_bp.route('/export', methods=['GET'])
+@jwt_required()
+def handle_export_orders():
+    """
+    Streams the logged-in user's orders with their items as NDJSON (one JSON order per line).
+
+    Query params (all optional):
+        executed: "true" / "false" to export only executed / pending orders.
+        location: Only export orders shipped to this country.
+        from: ISO 8601 date, only export orders created at or after it.
+        to: ISO 8601 date, only export orders created before it.
+
+    Requires:
+        - A valid JWT token in the Authorization header.
+
+    Returns:
+        - HTTP 200 OK: application/x-ndjson body, each line is:
+            {"id": int, "user_id": int, "location": str, "executed": bool, "created_at": str,
+             "items": [{"product_id": int, "product_name": str, "quantity": int, "unit_price": float}, ...]}
+        - HTTP 400 Bad Request:
+            {
+                "error": "<invalid query param message>"
+            }
+    """
+    try:
+        executed = parse_bool_param(request.args.get("executed"), "executed")
+        created_from = parse_datetime_param(request.args.get("from"), "from")
+        created_to = parse_datetime_param(request.args.get("to"), "to")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+
+    location = request.args.get("location")
+    if location:
+        location = get_country_catalog().resolve(location) or location
+
+    orders = iter_orders_export(int(get_jwt_identity()), executed, location, created_from, created_to)
+    ndjson_lines = (json.dumps(order) + "\n" for order in orders)
+    return Response(stream_with_context(ndjson_lines), mimetype="application/x-ndjson")
 
 
 @orders_bp.route('/execute', methods=['POST'])
@@ -135,6 +231,124 @@ def handle_execute_order():
         return jsonify({"error": "cant execute order, try again later."}), http.HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@orders_bp.route('/execute-batch', methods=['POST'])
+@jwt_required()
+def handle_execute_orders_batch():
+    """
+    Executes many orders of the authenticated user in a single transaction.
+
+    Expects:
+        JSON payload with the order IDs (up to 1000), in the order they should be fulfilled:
+        {
+            "ids": [<order_id: int>, ...]
+        }
+
+    Requires:
+        JWT-authenticated user.
+
+    Returns:
+        200 OK: A report of every order, orders that couldn't be executed have an error:
+            {
+                "executed": int,
+                "failed": int,
+                "results": [
+                    {"id": int, "executed": bool, "total_price": float | null, "error": str | null},
+                    ...
+                ]
+            }
+        400 Bad Request: If input validation fails or a database error occurs.
+        500 Internal Server Error: On unexpected errors.
+    """
+    user_id = int(get_jwt_identity())
+    try:
+        batch = ExecuteOrdersBatch(**request.json)
+        results = execute_orders(batch.ids, user_id)
+        executed_count = sum(result.executed for result in results)
+        return (jsonify({"executed": executed_count,
+                         "failed": len(results) - executed_count,
+                         "results": [result.dict() for result in results]}),
+                http.HTTPStatus.OK)
+
+    except ValidationError as ve:
+        return jsonify({"error": ve.errors()}), http.HTTPStatus.BAD_REQUEST
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception:
+        return jsonify({"error": "cant execute orders, try again later."}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@orders_bp.route('/execute/async', methods=['POST'])
+@jwt_required()
+def handle_enqueue_order_execution():
+    """
+    Queues an order of the authenticated user for execution by the background workers.
+
+    Expects:
+        JSON payload with the order ID:
+        {
+            "id": <order_id: int>
+        }
+
+    Requires:
+        JWT-authenticated user.
+
+    Returns:
+        202 Accepted: The job was queued, its status is available at the Location header:
+            {
+                "job_id": int,
+                "order_id": int,
+                "status": "queued",
+                ...
+            }
+        400 Bad Request: If validation fails, or the order is not found, not owned by the user or already executed.
+        500 Internal Server Error: On unexpected errors.
+    """
+    user_id = int(get_jwt_identity())
+    try:
+        order_id = ExecuteOrder(**request.json).id
+        job = enqueue_order_execution(order_id, user_id)
+        return (jsonify(job.dict()), http.HTTPStatus.ACCEPTED,
+                {"Location": url_for("orders.handle_get_execution_job", job_id=job.job_id)})
+
+    except ValidationError as ve:
+        return jsonify({"error": ve.errors()}), http.HTTPStatus.BAD_REQUEST
+    except BadRequest as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception:
+        return jsonify({"error": "cant queue order execution, try again later."}), \
+            http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@orders_bp.route('/execute/jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def handle_get_execution_job(job_id):
+    """
+    Returns the status of an asynchronous order execution of the authenticated user.
+
+    Args:
+        job_id (int): Provided via URL path parameter.
+
+    Returns:
+        200 OK:
+            {
+                "job_id": int,
+                "order_id": int,
+                "status": "queued" | "running" | "done" | "failed",
+                "jobs_ahead": int | null,
+                "total_price": float | null,
+                "error": str | null,
+                "created_at": str (ISO 8601),
+                "updated_at": str (ISO 8601)
+            }
+        404 Not Found: If the job doesn't exist or belongs to another user.
+    """
+    user_id = int(get_jwt_identity())
+    try:
+        return jsonify(get_execution_job(job_id, user_id).dict()), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.NOT_FOUND
+
+
 @orders_bp.route('/update', methods=['PUT'])
 @jwt_required()
 def handle_update_order():
@@ -1,11 +1,20 @@
 import http
+import json
+from collections import Counter
 
 from flask import Blueprint, request, jsonify
 from pydantic import ValidationError
 
-from schemas.product import ProductInfo, UpdateProduct
-from service.db.category_service import get_category_name_by_id
-from service.db.product_service import get_product_by_name, add_product_to_db, remove_product, update_product
+from config import PRODUCTS_PAGE_DEFAULT_SIZE, PRODUCTS_PAGE_MAX_SIZE, PRODUCT_SEARCH_DEFAULT_LIMIT, \
+    PRODUCT_SEARCH_MAX_LIMIT
+from schemas.product import ProductInfo, UpdateProduct, CatalogProduct
+from service.db.product_cache_service import get_product_details, get_product_details_by_name
+from service.db.product_search_service import search_products
+from service.db.product_service import add_product_to_db, remove_product, update_product, list_products, \
+    upsert_products
+from utils.http_cache import make_resource_version, is_not_modified, not_modified_response, set_version_headers
+from utils.pagination import parse_page_size
+from utils.query_params import parse_bool_param, parse_float_param
 
 product_bp = Blueprint('products', __name__, url_prefix='/products')
 
@@ -15,6 +24,9 @@ def handle_get_product_info_by_name():
     """
     Handle request to get product information by name.
 
+    Supports conditional requests: the response has ETag and Last-Modified headers, and a request with a
+    matching If-None-Match (or If-Modified-Since) gets an empty 304 Not Modified response.
+
     Returns:
         JSON response with product info or error message.
     """
@@ -23,10 +35,11 @@ def handle_get_product_info_by_name():
         name = request.args.get("name")
         if not name:
             return jsonify({"error": "missing name query param"}), http.HTTPStatus.BAD_REQUEST
-        product = get_product_by_name(name)
-        category_name = get_category_name_by_id(product.id)
-        return jsonify(ProductInfo(id=product.id, name=product.name, quantity=product.quantity,
-                                   category=category_name, price=product.price).dict()), http.HTTPStatus.OK
+        product = get_product_details_by_name(name)
+        version = make_resource_version(product.updated_at, product.id)
+        if is_not_modified(version):
+            return not_modified_response(version)
+        return set_version_headers(jsonify(CatalogProduct(**product._asdict()).dict()), version), http.HTTPStatus.OK
     except ValueError as e:
         return jsonify({"error": str(e)}), http.HTTPStatus.UNPROCESSABLE_ENTITY
     except Exception:
@@ -34,6 +47,102 @@ def handle_get_product_info_by_name():
             {"error": "couldn't get the product info due to an internal error."}), http.HTTPStatus.INTERNAL_SERVER_ERROR
 
 
+@product_bp.route('/<int:product_id>', methods=['GET'])
+def handle_get_product_info_by_id(product_id: int):
+    """
+    Handle request to get product information by ID. Supports conditional requests, like the lookup by name.
+
+    Returns:
+        JSON response with product info or error message.
+    """
+    try:
+        product = get_product_details(product_id)
+        version = make_resource_version(product.updated_at, product.id)
+        if is_not_modified(version):
+            return not_modified_response(version)
+        return set_version_headers(jsonify(CatalogProduct(**product._asdict()).dict()), version), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.NOT_FOUND
+    except Exception:
+        return jsonify(
+            {"error": "couldn't get the product info due to an internal error."}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@product_bp.route('/catalog', methods=['GET'])
+def handle_list_products():
+    """
+    List the product catalog, one page at a time.
+
+    Query params:
+        limit (optional): Page size, default 20, at most 100.
+        cursor (optional): The "next_cursor" returned with the previous page.
+        category (optional): Only products of this category.
+        min_price / max_price (optional): Only products in this price range (inclusive).
+        in_stock (optional): "true" for products in stock only, "false" for out of stock products only.
+        sort (optional): "id" (default), "price", "-price", "name" or "-name".
+
+    Returns:
+        - HTTP 200 OK:
+            {
+                "products": [{"id", "name", "quantity", "category", "price"}, ...],
+                "next_cursor": str | null
+            }
+        - HTTP 400 Bad Request:
+            {
+                "error": "<invalid query param message>"
+            }
+    """
+    try:
+        limit = parse_page_size(request.args.get("limit"), PRODUCTS_PAGE_DEFAULT_SIZE, PRODUCTS_PAGE_MAX_SIZE)
+        products, next_cursor = list_products(
+            limit,
+            request.args.get("cursor"),
+            category=request.args.get("category"),
+            min_price=parse_float_param(request.args.get("min_price"), "min_price"),
+            max_price=parse_float_param(request.args.get("max_price"), "max_price"),
+            in_stock=parse_bool_param(request.args.get("in_stock"), "in_stock"),
+            sort=request.args.get("sort", "id")
+        )
+        return jsonify({"products": [product.dict() for product in products], "next_cursor": next_cursor}), \
+            http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception:
+        return jsonify({"error": "couldn't list the products due to an internal error."}), \
+            http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@product_bp.route('/search', methods=['GET'])
+def handle_search_products():
+    """
+    Search products by name, tolerating partial names and typos.
+
+    Query params:
+        q (required): The search text.
+        limit (optional): Maximum number of matches, default 10, capped at 50.
+
+    Returns:
+        - HTTP 200 OK:
+            {
+                "products": [{"id", "name", "score", "prefix_match"}, ...]
+            }
+            Names starting with the search text come first, then the most similar names.
+        - HTTP 400 Bad Request:
+            {
+                "error": "<missing search text / invalid limit message>"
+            }
+    """
+    try:
+        limit = parse_page_size(request.args.get("limit"), PRODUCT_SEARCH_DEFAULT_LIMIT, PRODUCT_SEARCH_MAX_LIMIT)
+        products = search_products(request.args.get("q"), limit)
+        return jsonify({"products": [product.dict() for product in products]}), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception:
+        return jsonify({"error": "couldn't search the products due to an internal error."}), \
+            http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
 @product_bp.route('/add', methods=['POST'])
 def handle_add_product():
     """
@@ -66,6 +175,65 @@ def handle_add_product():
         return jsonify({"error": e.errors()}), http.HTTPStatus.BAD_REQUEST
 
 
+@product_bp.route('/upsert', methods=['POST'])
+def handle_upsert_products():
+    """
+    Handle request to insert or update many products at once, matched by name.
+
+    Expects:
+        A JSON array (Content-Type: application/json) or one JSON object per line
+        (Content-Type: application/x-ndjson) of:
+        {
+            "name": str,
+            "quantity": int,
+            "category": str,
+            "price": float
+        }
+        Missing categories are created.
+
+    Returns:
+        - HTTP 200 OK:
+            {
+                "inserted": int,
+                "updated": int,
+                "unchanged": int,
+                "rejected": int,
+                "results": [{"row", "name", "status", "id", "error"}, ...]
+            }
+            status is "inserted", "updated", "unchanged", "invalid" or "duplicate".
+        - HTTP 400 Bad Request:
+            {
+                "error": "<malformed body / too many rows message>"
+            }
+    """
+    if request.mimetype == "application/x-ndjson":
+        try:
+            rows = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError as e:
+            return jsonify({"error": f"invalid NDJSON body: {e}"}), http.HTTPStatus.BAD_REQUEST
+    else:
+        rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return jsonify({"error": "body must be a JSON array of products."}), http.HTTPStatus.BAD_REQUEST
+
+    try:
+        results = upsert_products(rows)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception:
+        return jsonify({"error": "couldn't upsert the products due to an internal error."}), \
+            http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+    statuses = Counter(result.status for result in results)
+    return jsonify({
+        "inserted": statuses["inserted"],
+        "updated": statuses["updated"],
+        "unchanged": statuses["unchanged"],
+        "rejected": statuses["invalid"] + statuses["duplicate"],
+        "results": [result.dict() for result in results]
+    }), http.HTTPStatus.OK
+
+
 @product_bp.route('/remove', methods=['DELETE'])
 def handle_remove_product_by_id():
     """
@@ -1,9 +1,18 @@
 import http
 
-from flask import Blueprint, jsonify
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
 
 from service.db.order_service import calculate_total_order_sales
-from service.db.statistics import calculate_product_sales_percentage, calculate_category_product_sales
+from service.db.statistics import calculate_product_sales_percentage, calculate_category_product_sales, \
+    calculate_sales_over_time, calculate_location_sales, calculate_location_sales_details
+from service.db.distinct_buyers_service import calculate_distinct_buyers
+from service.db.order_value_service import calculate_order_value_percentiles
+from service.db.top_products_service import get_top_products
+from service.sales_analytics import get_sales_analytics
+from service.statistics_cache import get_statistics_cache
+from utils.query_params import parse_bool_param, parse_datetime_param
 
 statistics_bp = Blueprint('statistics', __name__, url_prefix='/statistics')
 
@@ -53,3 +62,238 @@ def get_category_product_sales():
         return jsonify([r.dict() for r in results]), http.HTTPStatus.OK
     except Exception as e:
         return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/sales-over-time', methods=['GET'])
+def get_sales_over_time():
+    """
+    Returns product or category sales over a time range, summed from hourly/daily sales buckets.
+
+    Query params:
+        from (required): ISO 8601 date, start of the range (inclusive).
+        to (optional): ISO 8601 date, end of the range (exclusive), defaults to now.
+        granularity (optional): "hour" or "day" (default).
+        group_by (optional): "product" (default) or "category".
+
+    Response Codes:
+        200 OK: {"group_by", "granularity", "start", "end", "totals": [...], "buckets": [...]}
+        400 Bad Request: If a query param is missing or invalid.
+        500 Internal Server Error: If an exception occurs during processing.
+    """
+    try:
+        start = parse_datetime_param(request.args.get("from"), "from")
+        end = parse_datetime_param(request.args.get("to"), "to") or datetime.utcnow()
+        if not start:
+            return jsonify({"error": "missing 'from' query param"}), http.HTTPStatus.BAD_REQUEST
+
+        results = calculate_sales_over_time(request.args.get("group_by", "product"),
+                                            request.args.get("granularity", "day"), start, end)
+        return jsonify(results.dict()), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/locations', methods=['GET'])
+def get_location_sales():
+    """
+    Returns the order count, units and revenue of every shipping country (from the location sales rollup).
+    """
+    try:
+        results = calculate_location_sales()
+        return jsonify([r.dict() for r in results]), http.HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/locations/<string:location>', methods=['GET'])
+def get_location_sales_details(location: str):
+    """
+    Returns the order count, units and revenue of one shipping country and its best selling products.
+
+    Query params:
+        top (optional): Number of best selling products, default 5.
+
+    Response Codes:
+        200 OK: {"location", "orders_count", "quantity_sold", "revenue", "top_products": [...]}
+        400 Bad Request: If the country or a query param is invalid.
+        500 Internal Server Error: If an exception occurs during processing.
+    """
+    try:
+        results = calculate_location_sales_details(location, request.args.get("top", 5, type=int))
+        return jsonify(results.dict()), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/top-products', methods=['GET'])
+def get_top_selling_products():
+    """
+    Returns the k best selling products of all executed orders.
+
+    Query params:
+        k (optional): Number of products, default 10.
+        exact (optional): Accepted for compatibility, the quantities are always exact (read from the sales rollup).
+
+    Response Codes:
+        200 OK: {"k", "exact", "products": [{"product_id", "product_name", "quantity_sold", "max_overestimate"}]}
+        400 Bad Request: If a query param is invalid.
+        500 Internal Server Error: If an exception occurs during processing.
+    """
+    try:
+        k = request.args.get("k", 10, type=int)
+        parse_bool_param(request.args.get("exact"), "exact")
+        return jsonify(get_top_products(k).dict()), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/distinct-buyers', methods=['GET'])
+def get_distinct_buyers():
+    """
+    Returns the estimated number of distinct users that bought each product or category
+    (HyperLogLog sketches, ~2% error), and of all of them together.
+
+    Query params:
+        group_by (optional): "product" (default) or "category".
+        ids (optional): Comma separated product/category IDs, all of them if not given.
+        from (optional): ISO 8601 date, first execution day (inclusive).
+        to (optional): ISO 8601 date, last execution day (exclusive).
+
+    Response Codes:
+        200 OK: {"group_by", "start", "end", "total_distinct_buyers", "entities": [{"id", "name", "distinct_buyers"}]}
+        400 Bad Request: If a query param is invalid.
+        500 Internal Server Error: If an exception occurs during processing.
+    """
+    try:
+        raw_ids = request.args.get("ids", "")
+        try:
+            entity_ids = [int(entity_id) for entity_id in raw_ids.split(",") if entity_id.strip()]
+        except ValueError:
+            raise ValueError(f"invalid 'ids' parameter: {raw_ids}")
+        start = parse_datetime_param(request.args.get("from"), "from")
+        end = parse_datetime_param(request.args.get("to"), "to")
+
+        results = calculate_distinct_buyers(request.args.get("group_by", "product"), entity_ids,
+                                            start.date() if start else None, end.date() if end else None)
+        return jsonify(results.dict()), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/order-value-percentiles', methods=['GET'])
+def get_order_value_percentiles():
+    """
+    Returns order value percentiles of executed orders, merged from per day and per location t-digests.
+
+    Query params:
+        percentiles (optional): Comma separated percentiles between 0 and 100, default 50,90,99.
+        group_by (optional): "location" or "day" to also return the percentiles of every group.
+        location (optional): Comma separated country names (any case / spacing), all of them if not given.
+        from (optional): ISO 8601 date, first execution day (inclusive).
+        to (optional): ISO 8601 date, last execution day (exclusive).
+
+    Response Codes:
+        200 OK: {"group_by", "start", "end", "overall": {...}, "groups": [{"key", "orders_count", "min", "max",
+                 "percentiles": {"p50", ...}}]}
+        400 Bad Request: If a query param is invalid, or a location isn't a country we ship to.
+        500 Internal Server Error: If an exception occurs during processing.
+    """
+    try:
+        raw_percentiles = request.args.get("percentiles", "")
+        try:
+            percentiles = [float(percentile) for percentile in raw_percentiles.split(",") if percentile.strip()]
+        except ValueError:
+            raise ValueError(f"invalid 'percentiles' parameter: {raw_percentiles}")
+        locations = [location.strip() for location in request.args.get("location", "").split(",")
+                     if location.strip()]
+        start = parse_datetime_param(request.args.get("from"), "from")
+        end = parse_datetime_param(request.args.get("to"), "to")
+
+        results = calculate_order_value_percentiles(percentiles, request.args.get("group_by"), locations,
+                                                    start.date() if start else None, end.date() if end else None)
+        return jsonify(results.dict()), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/cache', methods=['GET'])
+def get_statistics_cache_info():
+    """
+    Returns the hit/miss counters of the statistics results cache of the worker serving the request.
+    """
+    return jsonify(get_statistics_cache().info().dict()), http.HTTPStatus.OK
+
+
+@statistics_bp.route('/analytics/profit', methods=['GET'])
+def get_analytics_total_profit():
+    """
+    Same as GET /profit, computed from the in-memory analytics data (refreshed every few seconds).
+    """
+    try:
+        return jsonify(get_sales_analytics().total_sales().dict()), http.HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/analytics/product-sales', methods=['GET'])
+def get_analytics_product_sales():
+    """
+    Same as GET /product-sales, computed from the in-memory analytics data (refreshed every few seconds).
+    """
+    try:
+        results = get_sales_analytics().product_sales_percentage()
+        return jsonify([r.dict() for r in results]), http.HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/analytics/category-product-sales', methods=['GET'])
+def get_analytics_category_product_sales():
+    """
+    Same as GET /category-product-sales, computed from the in-memory analytics data (refreshed every few seconds).
+    """
+    try:
+        results = get_sales_analytics().category_product_sales()
+        return jsonify([r.dict() for r in results]), http.HTTPStatus.OK
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+@statistics_bp.route('/analytics/group-by', methods=['GET'])
+def get_analytics_group_by():
+    """
+    Sums executed sales by any combination of dimensions, from the in-memory analytics data.
+
+    Query params:
+        dimensions (optional): Comma separated list of product, category, location, hour, day.
+                               Omit for the overall total.
+        from (optional): ISO 8601 date, only orders executed at or after it.
+        to (optional): ISO 8601 date, only orders executed before it.
+
+    Response Codes:
+        200 OK: [{"keys": {...}, "quantity_sold", "revenue", "orders_count"}, ...]
+        400 Bad Request: If a query param is invalid.
+        500 Internal Server Error: If an exception occurs during processing.
+    """
+    try:
+        raw_dimensions = request.args.get("dimensions", "")
+        dimensions = [dimension.strip() for dimension in raw_dimensions.split(",") if dimension.strip()]
+        start = parse_datetime_param(request.args.get("from"), "from")
+        end = parse_datetime_param(request.args.get("to"), "to")
+
+        results = get_sales_analytics().group_sales(dimensions, start, end)
+        return jsonify([r.dict() for r in results]), http.HTTPStatus.OK
+    except ValueError as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.BAD_REQUEST
+    except Exception as e:
+        return jsonify({"error": str(e)}), http.HTTPStatus.INTERNAL_SERVER_ERROR
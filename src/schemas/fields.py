@@ -0,0 +1,11 @@
+from datetime import date, datetime
+from typing import Annotated
+
+from pydantic import PlainSerializer
+
+# a datetime dumped as an ISO 8601 string, flask's jsonify would otherwise write it as an RFC 1123 date
+# (second precision, no standard parsing in most clients).
+IsoDatetime = Annotated[datetime, PlainSerializer(lambda value: value.isoformat(), return_type=str)]
+
+# a date dumped as an ISO 8601 string ('2026-10-18'), for the same reason.
+IsoDate = Annotated[date, PlainSerializer(lambda value: value.isoformat(), return_type=str)]
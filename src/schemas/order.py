@@ -1,4 +1,10 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, conlist
+
+from schemas.fields import IsoDatetime
+
+MAX_ORDERS_PER_EXECUTION_BATCH = 1000
 
 
 class AddOrderItem(BaseModel):
@@ -35,6 +41,56 @@ class ExecuteOrder(BaseModel):
     id: int
 
 
+class ExecuteOrdersBatch(BaseModel):
+    """
+    Represents a request to execute many orders at once.
+
+    Attributes:
+        ids (List[int]): The IDs of the orders to execute, in the order they should be fulfilled.
+    """
+    ids: conlist(int, min_length=1, max_length=MAX_ORDERS_PER_EXECUTION_BATCH)
+
+
+class ExecuteOrderResult(BaseModel):
+    """
+    The outcome of executing a single order as part of a batch.
+
+    Attributes:
+        id (int): The ID of the order.
+        executed (bool): Whether the order was executed by this request.
+        total_price (Optional[float]): The order's total price, if it was executed.
+        error (Optional[str]): The reason the order wasn't executed.
+    """
+    id: int
+    executed: bool
+    total_price: Optional[float] = None
+    error: Optional[str] = None
+
+
+class ExecutionJobInfo(BaseModel):
+    """
+    The status of an asynchronous order execution.
+
+    Attributes:
+        job_id (int): The ID of the execution job.
+        order_id (int): The ID of the order to execute.
+        status (str): One of queued, running, done or failed.
+        jobs_ahead (Optional[int]): Number of queued jobs before this one, while it is queued.
+        total_price (Optional[float]): The order's total price, once it was executed.
+        error (Optional[str]): The reason the order wasn't executed, if the job failed.
+        created_at (datetime): When the job was queued (ISO 8601 in JSON).
+        updated_at (datetime): When the job status last changed (ISO 8601 in JSON).
+    """
+    job_id: int
+    order_id: int
+    status: str
+    jobs_ahead: Optional[int] = None
+    total_price: Optional[float] = None
+    error: Optional[str] = None
+    created_at: IsoDatetime
+    updated_at: IsoDatetime
+
+
 class UpdateOrderInput(BaseModel):
     """
     Schema for updating an existing order.
@@ -1,6 +1,6 @@
 from typing import Optional
 
-from pydantic import BaseModel, EmailStr, constr
+from pydantic import BaseModel, EmailStr, constr, conint, confloat
 
 
 class ProductInfo(BaseModel):
@@ -41,3 +41,71 @@ class UpdateProduct(BaseModel):
     quantity: Optional[int] = None
     category: Optional[str] = None
     price: Optional[int] = None
+
+
+class CatalogProduct(BaseModel):
+    """
+    Schema of a product in the catalog listing.
+
+    Attributes:
+        id: Unique identifier of the product.
+        name: Name of the product.
+        quantity: Number of items in stock.
+        category: The category this product belongs to.
+        price: Price of the product.
+    """
+    id: int
+    name: str
+    quantity: int
+    category: str
+    price: float
+
+
+class ProductSearchResult(BaseModel):
+    """
+    Schema of a product search match.
+
+    Attributes:
+        id: Unique identifier of the product.
+        name: Name of the product.
+        score: Trigram similarity of the name to the search text (0 to 1).
+        prefix_match: Whether the name starts with the search text.
+    """
+    id: int
+    name: str
+    score: float
+    prefix_match: bool
+
+
+class UpsertProduct(BaseModel):
+    """
+    Schema of a row of the bulk product upsert.
+
+    Attributes:
+        name: Name of the product, identifies the product to update.
+        quantity: Number of items in stock.
+        category: The category of the product, created if it doesn't exist.
+        price: Price of the product.
+    """
+    name: constr(strip_whitespace=True, min_length=1, max_length=120)
+    quantity: conint(ge=0)
+    category: constr(strip_whitespace=True, min_length=1, max_length=100)
+    price: confloat(gt=0)
+
+
+class ProductUpsertResult(BaseModel):
+    """
+    Schema of the outcome of a row of the bulk product upsert.
+
+    Attributes:
+        row: Index of the row in the request (0 based).
+        name: Name of the product, if the row has one.
+        status: 'inserted', 'updated', 'unchanged', 'invalid' or 'duplicate' (a later row has the same name).
+        id: ID of the product, for inserted, updated and unchanged rows.
+        error: Why the row was rejected, for invalid and duplicate rows.
+    """
+    row: int
+    name: Optional[str] = None
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
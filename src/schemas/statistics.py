@@ -1,6 +1,8 @@
 # schemas/statistics.py
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional
+
+from schemas.fields import IsoDate, IsoDatetime
 
 
 class ProductSalesPercentage(BaseModel):
@@ -61,3 +63,234 @@ class CategoryProductSales(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SalesBucketInfo(BaseModel):
+    """
+    Sales of a single product or category in one time bucket.
+
+    Attributes:
+        bucket_start (datetime): Start of the hour or day bucket (ISO 8601 in JSON).
+        id (int): The product or category id.
+        name (str): The product or category name.
+        quantity_sold (int): Units sold in the bucket.
+        revenue (float): Revenue of the units sold in the bucket.
+    """
+    bucket_start: IsoDatetime
+    id: int
+    name: str
+    quantity_sold: int
+    revenue: float
+
+
+class SalesTotalInfo(BaseModel):
+    """
+    Sales of a single product or category summed over a time range.
+
+    Attributes:
+        id (int): The product or category id.
+        name (str): The product or category name.
+        quantity_sold (int): Units sold in the range.
+        revenue (float): Revenue of the units sold in the range.
+    """
+    id: int
+    name: str
+    quantity_sold: int
+    revenue: float
+
+
+class SalesOverTime(BaseModel):
+    """
+    Sales of products or categories over a time range, per time bucket and in total.
+
+    Attributes:
+        group_by (str): 'product' or 'category'.
+        granularity (str): 'hour' or 'day'.
+        start (datetime): Start of the range (inclusive, truncated to the granularity, ISO 8601 in JSON).
+        end (datetime): End of the range (exclusive, ISO 8601 in JSON).
+        totals (List[SalesTotalInfo]): Sales of each product/category over the whole range.
+        buckets (List[SalesBucketInfo]): Sales of each product/category per bucket, ordered by time.
+    """
+    group_by: str
+    granularity: str
+    start: IsoDatetime
+    end: IsoDatetime
+    totals: List[SalesTotalInfo]
+    buckets: List[SalesBucketInfo]
+
+
+class StatisticsCacheInfo(BaseModel):
+    """
+    Counters of the statistics results cache of one worker.
+
+    Attributes:
+        hits (int): Requests served from the cache.
+        misses (int): Requests that computed the result.
+        waits (int): Requests that waited for a concurrent request computing the same result.
+        invalidations (int): Times the cache was dropped because executed sales changed.
+        entries (int): Results currently cached.
+        max_staleness_seconds (float): Maximum age of a cached result.
+    """
+    hits: int
+    misses: int
+    waits: int
+    invalidations: int
+    entries: int
+    max_staleness_seconds: float
+
+
+class AnalyticsGroup(BaseModel):
+    """
+    Executed sales of one group of an analytics group-by.
+
+    Attributes:
+        keys (Dict[str, Any]): The group's dimension values (product_id/product_name, category_id/category_name,
+            location, hour, day), hour and day as ISO 8601 strings.
+        quantity_sold (int): Units sold in the group.
+        revenue (float): Revenue of the units sold in the group.
+        orders_count (int): Number of executed orders with items in the group.
+    """
+    keys: Dict[str, Any]
+    quantity_sold: int
+    revenue: float
+    orders_count: int
+
+
+class TopProductInfo(BaseModel):
+    """
+    A best selling product.
+
+    Attributes:
+        product_id (int): Unique identifier for the product.
+        product_name (str): Name of the product.
+        quantity_sold (int): Units sold.
+        max_overestimate (int): How much quantity_sold may exceed the true value, always 0 (kept for clients).
+    """
+    product_id: int
+    product_name: str
+    quantity_sold: int
+    max_overestimate: int
+
+
+class TopProducts(BaseModel):
+    """
+    The k best selling products of all executed orders, best first.
+
+    Attributes:
+        k (int): The number of products asked for.
+        exact (bool): Always true, the result is read from the sales rollup (kept for clients).
+        products (List[TopProductInfo]): The best selling products.
+    """
+    k: int
+    exact: bool
+    products: List[TopProductInfo]
+
+
+class DistinctBuyersInfo(BaseModel):
+    """
+    Estimated distinct buyers of a single product or category.
+
+    Attributes:
+        id (int): The product or category id.
+        name (str): The product or category name.
+        distinct_buyers (int): Estimated number of distinct users that bought it.
+    """
+    id: int
+    name: str
+    distinct_buyers: int
+
+
+class DistinctBuyers(BaseModel):
+    """
+    Estimated distinct buyers of products or categories over a range of execution days.
+
+    Attributes:
+        group_by (str): 'product' or 'category'.
+        start (Optional[date]): First day (inclusive, ISO 8601 in JSON), None for no limit.
+        end (Optional[date]): Last day (exclusive, ISO 8601 in JSON), None for no limit.
+        total_distinct_buyers (int): Estimated distinct users that bought any of the entities.
+        entities (List[DistinctBuyersInfo]): The estimate of every product/category with sales in the range.
+    """
+    group_by: str
+    start: Optional[IsoDate]
+    end: Optional[IsoDate]
+    total_distinct_buyers: int
+    entities: List[DistinctBuyersInfo]
+
+
+class OrderValuePercentilesInfo(BaseModel):
+    """
+    Order value percentiles of a group of executed orders.
+
+    Attributes:
+        key (Optional[str]): The location or day (ISO date) of the group, None for all the orders.
+        orders_count (int): Number of orders in the group.
+        min (Optional[float]): Lowest order value.
+        max (Optional[float]): Highest order value.
+        percentiles (Dict[str, float]): Estimated order value per percentile, e.g. {"p50": 12.5, "p99": 80.0}.
+    """
+    key: Optional[str]
+    orders_count: int
+    min: Optional[float]
+    max: Optional[float]
+    percentiles: Dict[str, float]
+
+
+class OrderValuePercentiles(BaseModel):
+    """
+    Order value percentiles over a range of execution days, overall and per location or day.
+
+    Attributes:
+        group_by (Optional[str]): 'location', 'day' or None.
+        start (Optional[date]): First day (inclusive, ISO 8601 in JSON), None for no limit.
+        end (Optional[date]): Last day (exclusive, ISO 8601 in JSON), None for no limit.
+        overall (OrderValuePercentilesInfo): Percentiles of all the orders in the range.
+        groups (List[OrderValuePercentilesInfo]): Percentiles of every location or day, empty if not grouped.
+    """
+    group_by: Optional[str]
+    start: Optional[IsoDate]
+    end: Optional[IsoDate]
+    overall: OrderValuePercentilesInfo
+    groups: List[OrderValuePercentilesInfo]
+
+
+class LocationSalesInfo(BaseModel):
+    """
+    Sales totals of the executed orders shipped to one country.
+
+    Attributes:
+        location (str): The country name.
+        orders_count (int): Number of executed orders.
+        quantity_sold (int): Units sold.
+        revenue (float): Total price of the executed orders.
+    """
+    location: str
+    orders_count: int
+    quantity_sold: int
+    revenue: float
+
+
+class LocationProductSales(BaseModel):
+    """
+    Sales of a single product in one country.
+
+    Attributes:
+        product_id (int): Unique identifier for the product.
+        product_name (str): Name of the product.
+        quantity_sold (int): Units shipped to the country.
+        revenue (float): Revenue of these units.
+    """
+    product_id: int
+    product_name: str
+    quantity_sold: int
+    revenue: float
+
+
+class LocationSalesDetails(LocationSalesInfo):
+    """
+    Sales totals of one country with its best selling products.
+
+    Attributes:
+        top_products (List[LocationProductSales]): The best selling products in the country, best first.
+    """
+    top_products: List[LocationProductSales]
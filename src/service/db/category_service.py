@@ -1,10 +1,14 @@
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
 from models.category import Category
-from sqlalchemy import select
+from sqlalchemy import select, func
 from database import get_db_connection
 from models.product import Product
+from service.db.product_cache_service import get_product_cache
+from service.db.product_search_service import get_product_search_index
+from service.statistics_cache import invalidate_statistics_cache
+from utils.http_cache import ResourceVersion, make_resource_version
 
 db = get_db_connection()
 
@@ -93,6 +97,46 @@ def get_products_by_category(category_name: str) -> List[str]:
     raise ValueError(f"error occurred while fetching products from db")
 
 
+def get_categories_version() -> ResourceVersion:
+    """
+    Returns the version of the categories list, from the categories' latest update time and count.
+
+    Returns:
+        ResourceVersion: The ETag and last modification time of the categories list.
+    """
+    categories_version_stmt = select(func.max(Category.updated_at), func.count(Category.id))
+    last_updated_at, categories_count = db.session.execute(categories_version_stmt).one()
+    return make_resource_version(last_updated_at, categories_count)
+
+
+def get_category_products_version(category_name: str) -> Optional[ResourceVersion]:
+    """
+    Returns the version of a category's products list, from the latest update time of the category and
+    its products, and the products count.
+
+    Args:
+        category_name: The name of the category.
+
+    Returns:
+        Optional[ResourceVersion]: The ETag and last modification time of the list,
+        or None if the category doesn't exist.
+    """
+    category_version_stmt = (
+        select(Category.id, Category.updated_at, func.max(Product.updated_at), func.count(Product.id))
+        .select_from(Category)
+        .outerjoin(Product, Product.category_id == Category.id)
+        .where(Category.name == category_name)
+        .group_by(Category.id, Category.updated_at)
+    )
+    row = db.session.execute(category_version_stmt).one_or_none()
+    if not row:
+        return None
+
+    category_id, category_updated_at, products_updated_at, products_count = row
+    last_updated_at = max(filter(None, (category_updated_at, products_updated_at)), default=None)
+    return make_resource_version(last_updated_at, category_id, products_count)
+
+
 def update_category_name(current_category_name: str, new_category_name: str) -> None:
     """
     Updates the name of a category.
@@ -111,6 +155,9 @@ def update_category_name(current_category_name: str, new_category_name: str) ->
     category.name = new_category_name
     category.updated_at = datetime.utcnow()
     db.session.commit()
+    invalidate_statistics_cache()
+    # the cached records of all the category's products hold its name
+    get_product_cache().clear()
 
 
 def delete_category(category_to_delete: str) -> None:
@@ -129,3 +176,7 @@ def delete_category(category_to_delete: str) -> None:
 
     db.session.delete(category)
     db.session.commit()
+    invalidate_statistics_cache()
+    # the category's products were deleted with it
+    get_product_cache().clear()
+    get_product_search_index().invalidate()
@@ -0,0 +1,287 @@
+import time
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, delete, func, tuple_, distinct
+
+from config import DISTINCT_BUYERS_HLL_PRECISION
+from database import get_db_connection
+from models.buyer_sketch import ProductBuyersSketch, CategoryBuyersSketch, ProductBuyersTotalSketch, \
+    CategoryBuyersTotalSketch
+from models.category import Category
+from models.order import Order, OrderItem
+from models.product import Product
+from schemas.statistics import DistinctBuyers, DistinctBuyersInfo
+from utils.db_utils import upsert_insert
+from utils.sketches import HyperLogLog
+
+db = get_db_connection()
+
+DISTINCT_BUYERS_REBUILD_BATCH_SIZE = 10000
+
+
+def _sketch_sources() -> List[Tuple]:
+    """
+    Lists the daily sketch tables with their entity key column (also the matching column of the buyers query)
+    and the table of the entities' all-time sketches.
+    """
+    return [
+        (ProductBuyersSketch, "product_id", ProductBuyersTotalSketch),
+        (CategoryBuyersSketch, "category_id", CategoryBuyersTotalSketch),
+    ]
+
+
+def _buyers_select():
+    """
+    Selects the buyer, product, category and execution time of the items of executed orders.
+    """
+    return (
+        select(Order.user_id, OrderItem.product_id, Product.category_id,
+               func.coalesce(Order.executed_at, Order.updated_at).label("executed_at"))
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.executed.is_(True))
+    )
+
+
+def _new_sketches() -> Dict[str, Dict[Tuple[int, date], HyperLogLog]]:
+    """
+    Creates empty sketches per (entity id, day) for every sketch table, keyed by the table's key column.
+    """
+    return {key_column: defaultdict(lambda: HyperLogLog(DISTINCT_BUYERS_HLL_PRECISION))
+            for _, key_column, _ in _sketch_sources()}
+
+
+def _add_buyer(sketches: Dict[str, Dict[Tuple[int, date], HyperLogLog]], row) -> None:
+    """
+    Adds the buyer of a row of the buyers query to the sketches of its product and category.
+    """
+    day = row.executed_at.date()
+    for key_column, entity_sketches in sketches.items():
+        entity_sketches[(getattr(row, key_column), day)].add(row.user_id)
+
+
+def _all_time_sketches(day_sketches: Dict[Tuple[int, date], HyperLogLog]) -> Dict[Tuple[int], HyperLogLog]:
+    """
+    Merges (entity id, day) sketches into one sketch per entity, keyed by (entity id,).
+    """
+    all_time_sketches = defaultdict(lambda: HyperLogLog(DISTINCT_BUYERS_HLL_PRECISION))
+    for (entity_id, _), sketch in day_sketches.items():
+        all_time_sketches[(entity_id,)].merge(sketch)
+    return all_time_sketches
+
+
+def _merge_into_sketches(model, key_columns: Tuple[str, ...], sketches: Dict[Tuple, HyperLogLog]) -> None:
+    """
+    Merges sketches into the stored sketches with the same key (entity and day, or entity only). Missing rows
+    are inserted first and the rows are locked before they are read, so concurrent executions can't overwrite
+    each other's buyers.
+    """
+    if not sketches:
+        return
+
+    now = datetime.utcnow()
+    empty_sketch = HyperLogLog(DISTINCT_BUYERS_HLL_PRECISION).to_bytes()
+    db.session.execute(
+        upsert_insert(model)
+        .values([{**dict(zip(key_columns, key)), "sketch": empty_sketch, "updated_at": now} for key in sketches])
+        .on_conflict_do_nothing(index_elements=list(key_columns))
+    )
+
+    columns = [getattr(model, key_column) for key_column in key_columns]
+    if len(columns) > 1:
+        keys_filter = tuple_(*columns).in_(list(sketches))
+    else:
+        keys_filter = columns[0].in_([key for key, in sketches])
+    stored_sketches_stmt = (
+        select(*columns, model.sketch)
+        .where(keys_filter)
+        .order_by(*columns)
+        .with_for_update()
+    )
+    merged_rows = []
+    for *key, stored_sketch in db.session.execute(stored_sketches_stmt):
+        sketch = HyperLogLog.from_bytes(stored_sketch)
+        sketch.merge(sketches[tuple(key)])
+        merged_rows.append({**dict(zip(key_columns, key)), "sketch": sketch.to_bytes(), "updated_at": now})
+    db.session.execute(update(model), merged_rows)
+
+
+def record_order_buyers(order_ids: List[int]) -> None:
+    """
+    Adds the buyers of newly executed orders to the per product and per category daily and all-time sketches.
+
+    Must run in the transaction that marks the orders as executed (after marking them), it doesn't commit.
+
+    Args:
+        order_ids: The IDs of the orders that were just executed.
+    """
+    if not order_ids:
+        return
+
+    sketches = _new_sketches()
+    for row in db.session.execute(_buyers_select().where(OrderItem.order_id.in_(order_ids))):
+        _add_buyer(sketches, row)
+
+    for model, key_column, total_model in _sketch_sources():
+        _merge_into_sketches(model, (key_column, "day"), sketches[key_column])
+        _merge_into_sketches(total_model, (key_column,), _all_time_sketches(sketches[key_column]))
+
+
+def rebuild_distinct_buyers() -> None:
+    """
+    Recomputes all the buyers sketches from the executed orders, one day at a time, in one transaction.
+    The all-time sketches are merged from the daily ones in memory (one sketch per product and category).
+
+    Needed after executed orders are deleted or products are re-categorized (sketches can't remove buyers),
+    and after changing the sketch precision.
+    """
+    for model, _, total_model in _sketch_sources():
+        db.session.execute(delete(model))
+        db.session.execute(delete(total_model))
+
+    all_time_sketches = {key_column: defaultdict(lambda: HyperLogLog(DISTINCT_BUYERS_HLL_PRECISION))
+                         for _, key_column, _ in _sketch_sources()}
+
+    def flush(sketches: Dict[str, Dict[Tuple[int, date], HyperLogLog]]) -> None:
+        for sketch_model, sketch_key_column, _ in _sketch_sources():
+            rows = [{sketch_key_column: key, "day": day, "sketch": sketch.to_bytes()}
+                    for (key, day), sketch in sketches[sketch_key_column].items()]
+            if rows:
+                db.session.execute(sketch_model.__table__.insert(), rows)
+            for (key, _), sketch in sketches[sketch_key_column].items():
+                all_time_sketches[sketch_key_column][key].merge(sketch)
+
+    buyers_stmt = (
+        _buyers_select()
+        .order_by(func.coalesce(Order.executed_at, Order.updated_at))
+        .execution_options(yield_per=DISTINCT_BUYERS_REBUILD_BATCH_SIZE)
+    )
+    current_day = None
+    day_sketches = None
+    for row in db.session.execute(buyers_stmt):
+        day = row.executed_at.date()
+        if day != current_day:
+            if day_sketches:
+                flush(day_sketches)
+            current_day = day
+            day_sketches = _new_sketches()
+        _add_buyer(day_sketches, row)
+    if day_sketches:
+        flush(day_sketches)
+
+    for _, key_column, total_model in _sketch_sources():
+        rows = [{key_column: key, "sketch": sketch.to_bytes()} for key, sketch in all_time_sketches[key_column].items()]
+        if rows:
+            db.session.execute(total_model.__table__.insert(), rows)
+
+    db.session.commit()
+
+
+def _group_by_source(group_by: str) -> Tuple:
+    if group_by == "product":
+        return ProductBuyersSketch, ProductBuyersSketch.product_id, Product, ProductBuyersTotalSketch
+    if group_by == "category":
+        return CategoryBuyersSketch, CategoryBuyersSketch.category_id, Category, CategoryBuyersTotalSketch
+    raise ValueError("group_by must be 'product' or 'category'.")
+
+
+def calculate_distinct_buyers(group_by: str, entity_ids: Optional[List[int]] = None,
+                              start: Optional[date] = None, end: Optional[date] = None) -> DistinctBuyers:
+    """
+    Estimates the number of distinct users that bought each product or category, by merging their
+    daily HyperLogLog sketches, and the distinct buyers of all of them together. Without a day range, their
+    all-time sketches are read instead, so the cost doesn't grow with the number of days.
+
+    Args:
+        group_by: 'product' or 'category'.
+        entity_ids: The product or category IDs, all of them if not given.
+        start: First execution day (inclusive), the first day with sales if not given.
+        end: Last execution day (exclusive), no limit if not given.
+
+    Raises:
+        ValueError: If group_by is invalid.
+
+    Returns:
+        DistinctBuyers: The estimated distinct buyers of every product/category with sales in the range,
+        and of their union.
+    """
+    model, key, entity, total_model = _group_by_source(group_by)
+    if not start and not end:
+        model, key = total_model, getattr(total_model, key.key)
+    sketches_stmt = (
+        select(entity.id, entity.name, model.sketch)
+        .select_from(model)
+        .join(entity, entity.id == key)
+        .order_by(entity.id)
+    )
+    if entity_ids:
+        sketches_stmt = sketches_stmt.where(key.in_(entity_ids))
+    if start:
+        sketches_stmt = sketches_stmt.where(model.day >= start)
+    if end:
+        sketches_stmt = sketches_stmt.where(model.day < end)
+
+    total_sketch = HyperLogLog(DISTINCT_BUYERS_HLL_PRECISION)
+    entity_sketches = {}
+    entity_names = {}
+    for entity_id, name, stored_sketch in db.session.execute(sketches_stmt):
+        sketch = HyperLogLog.from_bytes(stored_sketch)
+        if entity_id in entity_sketches:
+            entity_sketches[entity_id].merge(sketch)
+        else:
+            entity_sketches[entity_id] = sketch
+            entity_names[entity_id] = name
+        total_sketch.merge(sketch)
+
+    return DistinctBuyers(
+        group_by=group_by,
+        start=start,
+        end=end,
+        total_distinct_buyers=total_sketch.count(),
+        entities=[DistinctBuyersInfo(id=entity_id, name=entity_names[entity_id], distinct_buyers=sketch.count())
+                  for entity_id, sketch in entity_sketches.items()]
+    )
+
+
+def benchmark_distinct_buyers(group_by: str) -> Dict[str, float]:
+    """
+    Compares the sketch estimates of every product or category with an exact COUNT(DISTINCT user_id)
+    over the executed orders.
+
+    Args:
+        group_by: 'product' or 'category'.
+
+    Returns:
+        Dict[str, float]: The number of entities compared, the mean and max relative error of the estimates
+        and the duration (seconds) of the exact query and of the sketch query.
+    """
+    _group_by_source(group_by)
+    entity_column = OrderItem.product_id if group_by == "product" else Product.category_id
+
+    started = time.perf_counter()
+    exact_stmt = (
+        select(entity_column, func.count(distinct(Order.user_id)))
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.executed.is_(True))
+        .group_by(entity_column)
+    )
+    exact_counts = dict(db.session.execute(exact_stmt).all())
+    exact_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    estimates = {info.id: info.distinct_buyers for info in calculate_distinct_buyers(group_by).entities}
+    sketch_seconds = time.perf_counter() - started
+
+    errors = [abs(estimates.get(entity_id, 0) - count) / count for entity_id, count in exact_counts.items()]
+    return {
+        "compared": len(errors),
+        "mean_relative_error": sum(errors) / len(errors) if errors else 0.0,
+        "max_relative_error": max(errors, default=0.0),
+        "exact_query_seconds": exact_seconds,
+        "sketch_query_seconds": sketch_seconds,
+    }
@@ -0,0 +1,205 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import select, update, func, or_, and_, case
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import BadRequest
+
+from config import EXECUTION_JOB_LEASE_SECONDS, EXECUTION_JOB_MAX_ATTEMPTS
+from database import get_db_connection
+from models.execution_job import ExecutionJob, JOB_STATUS_QUEUED, JOB_STATUS_RUNNING, JOB_STATUS_DONE, \
+    JOB_STATUS_FAILED
+from models.order import Order
+from schemas.order import ExecutionJobInfo
+from service.db.order_service import execute_owned_orders
+
+db = get_db_connection()
+
+
+def _get_active_job_id(order_id: int) -> Optional[int]:
+    """
+    Returns the ID of the order's queued or running job, if it has one.
+    """
+    active_job_stmt = select(ExecutionJob.id).where(
+        ExecutionJob.order_id == order_id, ExecutionJob.status.in_([JOB_STATUS_QUEUED, JOB_STATUS_RUNNING])
+    )
+    return db.session.execute(active_job_stmt).scalar()
+
+
+def enqueue_order_execution(order_id: int, user_id: int) -> ExecutionJobInfo:
+    """
+    Queues an order for execution by the execution workers.
+
+    An order has at most one active job (enforced by a partial unique index): if it is already queued or
+    running, that job is returned instead of queuing a new one.
+
+    Args:
+        order_id (int): The ID of the order to execute.
+        user_id (int): The ID of the user requesting the execution.
+
+    Returns:
+        ExecutionJobInfo: The queued job, or the order's already active job.
+
+    Raises:
+        BadRequest: If the order doesn't exist, doesn't belong to the user or is already executed.
+    """
+    order = db.session.execute(select(Order.user_id, Order.executed).where(Order.id == order_id)).one_or_none()
+    if not order:
+        raise BadRequest(f"no order found with id {order_id}")
+
+    if order.user_id != user_id:
+        raise BadRequest("User cannot execute orders that do not belong to them.")
+
+    if order.executed:
+        raise BadRequest("This order has already been executed.")
+
+    job_id = _get_active_job_id(order_id)
+    if job_id is None:
+        job = ExecutionJob(order_id=order_id, user_id=user_id, status=JOB_STATUS_QUEUED)
+        db.session.add(job)
+        try:
+            db.session.commit()
+            job_id = job.id
+        except IntegrityError:
+            # a concurrent request queued the order first
+            db.session.rollback()
+            job_id = _get_active_job_id(order_id)
+            if job_id is None:
+                # ... and its job already finished, check the order again
+                return enqueue_order_execution(order_id, user_id)
+
+    return get_execution_job(job_id, user_id)
+
+
+def get_execution_job(job_id: int, user_id: int) -> ExecutionJobInfo:
+    """
+    Retrieves the status of an execution job.
+
+    Args:
+        job_id (int): The ID of the job.
+        user_id (int): The ID of the user asking, must be the one that queued the job.
+
+    Returns:
+        ExecutionJobInfo: The job status, with the number of jobs ahead of it while it is queued.
+
+    Raises:
+        ValueError: If the job doesn't exist or belongs to another user.
+    """
+    job = ExecutionJob.query.filter_by(id=job_id).first()
+    if not job or job.user_id != user_id:
+        raise ValueError(f"no execution job found with id {job_id}")
+
+    jobs_ahead = None
+    if job.status == JOB_STATUS_QUEUED:
+        jobs_ahead_stmt = select(func.count(ExecutionJob.id)).where(
+            ExecutionJob.status == JOB_STATUS_QUEUED, ExecutionJob.id < job.id
+        )
+        jobs_ahead = db.session.execute(jobs_ahead_stmt).scalar()
+
+    return ExecutionJobInfo(job_id=job.id, order_id=job.order_id, status=job.status, jobs_ahead=jobs_ahead,
+                            total_price=job.total_price, error=job.error, created_at=job.created_at,
+                            updated_at=job.updated_at)
+
+
+def claim_execution_jobs(batch_size: int) -> List[ExecutionJob]:
+    """
+    Claims the oldest queued jobs (and jobs abandoned by a crashed worker) for this worker.
+
+    Rows are locked with SKIP LOCKED, so concurrent workers (threads or processes) claim different jobs.
+    Only one job per order is claimed per batch, the others wait for the next batch.
+
+    Args:
+        batch_size (int): The maximum number of jobs to claim.
+
+    Returns:
+        List[ExecutionJob]: The claimed jobs, now marked as running.
+    """
+    now = datetime.utcnow()
+    abandoned_before = now - timedelta(seconds=EXECUTION_JOB_LEASE_SECONDS)
+    claim_stmt = (
+        select(ExecutionJob)
+        .where(or_(
+            ExecutionJob.status == JOB_STATUS_QUEUED,
+            and_(ExecutionJob.status == JOB_STATUS_RUNNING, ExecutionJob.started_at < abandoned_before)
+        ))
+        .order_by(ExecutionJob.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    jobs = db.session.execute(claim_stmt).scalars().all()
+
+    claimed_jobs = {}
+    for job in jobs:
+        if job.order_id not in claimed_jobs:
+            claimed_jobs[job.order_id] = job
+            job.status = JOB_STATUS_RUNNING
+            job.started_at = now
+
+    db.session.commit()
+    return list(claimed_jobs.values())
+
+
+def _requeue_or_fail_job(job_id: int, error: str) -> None:
+    """
+    Puts a job whose execution hit a database error back in the queue, or marks it as failed once it
+    used all its attempts.
+    """
+    attempts = ExecutionJob.attempts + 1
+    db.session.execute(
+        update(ExecutionJob)
+        .where(ExecutionJob.id == job_id)
+        .values(attempts=attempts,
+                status=case((attempts >= EXECUTION_JOB_MAX_ATTEMPTS, JOB_STATUS_FAILED), else_=JOB_STATUS_QUEUED),
+                started_at=None, error=error)
+    )
+    db.session.commit()
+
+
+def run_execution_batch(batch_size: int) -> int:
+    """
+    Claims a batch of jobs and executes their orders together.
+
+    All the orders of the batch are executed with `execute_owned_orders`, so orders touching the same
+    products have their stock decrements aggregated into a single statement. If the batch hits a database
+    error (nothing is executed), its orders are executed one by one, so a bad order can't block the others:
+    a job that fails this way is retried by a later batch, up to EXECUTION_JOB_MAX_ATTEMPTS times.
+
+    Args:
+        batch_size (int): The maximum number of jobs to process.
+
+    Returns:
+        int: The number of processed jobs (0 when the queue is empty).
+    """
+    jobs = claim_execution_jobs(batch_size)
+    if not jobs:
+        return 0
+
+    job_ids = {job.order_id: job.id for job in jobs}
+    order_owners = {job.order_id: job.user_id for job in jobs}
+    try:
+        results = execute_owned_orders(order_owners)
+    except BadRequest as e:
+        if len(order_owners) == 1:
+            _requeue_or_fail_job(job_ids[next(iter(order_owners))], e.description)
+            return len(jobs)
+
+        results = []
+        for order_id, user_id in order_owners.items():
+            try:
+                results.extend(execute_owned_orders({order_id: user_id}))
+            except BadRequest as order_error:
+                _requeue_or_fail_job(job_ids[order_id], order_error.description)
+
+    if results:
+        db.session.execute(update(ExecutionJob), [
+            {
+                "id": job_ids[result.id],
+                "status": JOB_STATUS_DONE if result.executed else JOB_STATUS_FAILED,
+                "total_price": result.total_price,
+                "error": result.error
+            }
+            for result in results
+        ])
+        db.session.commit()
+
+    return len(jobs)
@@ -0,0 +1,232 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event, select, insert, delete, func
+
+from database import get_db_connection
+from models.order import Order, OrderItem
+from models.product import Product
+from models.user import User
+from service.db.order_service import insert_order_items, backfill_order_totals, calculate_total_order_sales
+from service.db.sales_rollup_service import rebuild_sales_rollups
+
+db = get_db_connection()
+
+BENCHMARK_ORDER_LOCATION = "Benchmark"
+
+
+@contextmanager
+def _count_statements() -> Iterator[List[int]]:
+    """
+    Counts the statements sent to the database inside the block (an executemany counts once per batch sent).
+    Yields a single element list holding the count.
+    """
+    counter = [0]
+
+    def count_statement(*_):
+        counter[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count_statement)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count_statement)
+
+
+def _insert_order_items_per_item(quantities: Dict[int, int], order_id: int) -> None:
+    """
+    The order items insertion that `insert_order_items` replaced: one product lookup and one
+    `session.add` per item.
+    """
+    for product_id, quantity in quantities.items():
+        product = db.session.get(Product, product_id)
+        if not product:
+            raise ValueError(f"Product with ID {product_id} not found")
+        db.session.add(OrderItem(order_id=order_id, product_id=product_id, quantity=quantity,
+                                 unit_price=product.price))
+    db.session.flush()
+
+
+def benchmark_order_creation(item_counts: List[int], repeats: int) -> List[Dict[str, float]]:
+    """
+    Compares the statements and latency of creating an order (before commit) with the per item insertion
+    and with the batched `insert_order_items`, for orders of different sizes.
+
+    Every order is rolled back, the database is left unchanged.
+
+    Args:
+        item_counts: The numbers of distinct products per order to measure.
+        repeats: The number of orders created per item count and insertion, the median latency is reported.
+
+    Raises:
+        ValueError: If there is no user, or fewer products than the largest item count.
+
+    Returns:
+        List[Dict[str, float]]: Per item count, the statements and median milliseconds of each insertion.
+    """
+    user_id = db.session.execute(select(User.id).limit(1)).scalar()
+    if user_id is None:
+        raise ValueError("the benchmark needs at least one user.")
+    product_ids = db.session.execute(select(Product.id).order_by(Product.id).limit(max(item_counts))).scalars().all()
+    if len(product_ids) < max(item_counts):
+        raise ValueError(f"the benchmark needs at least {max(item_counts)} products, found {len(product_ids)}.")
+    db.session.rollback()
+
+    insertions = {"per_item": _insert_order_items_per_item, "batched": insert_order_items}
+    results = []
+    for item_count in item_counts:
+        quantities = {product_id: 1 for product_id in product_ids[:item_count]}
+        result = {"items": item_count}
+        for name, insert_items in insertions.items():
+            durations = []
+            for _ in range(repeats):
+                db.session.expunge_all()
+                with _count_statements() as statements:
+                    started = time.perf_counter()
+                    order = Order(user_id=user_id, location=BENCHMARK_ORDER_LOCATION)
+                    db.session.add(order)
+                    db.session.flush()
+                    insert_items(quantities, order.id)
+                    durations.append(time.perf_counter() - started)
+                db.session.rollback()
+            result[f"{name}_statements"] = statements[0]
+            result[f"{name}_ms"] = statistics.median(durations) * 1000
+        results.append(result)
+
+    return results
+
+
+def _seed_executed_orders(first_id: int, last_id: int, items_per_order: int, batch_size: int) -> None:
+    """
+    Bulk inserts executed orders in an id range with random items of existing products, without their stored
+    totals (like orders created before the totals were stored), one transaction per batch.
+    """
+    user_id = db.session.execute(select(User.id).limit(1)).scalar()
+    if user_id is None:
+        raise ValueError("the benchmark needs at least one user.")
+    products = db.session.execute(select(Product.id, Product.price)).all()
+    if len(products) < items_per_order:
+        raise ValueError(f"the benchmark needs at least {items_per_order} products, found {len(products)}.")
+
+    rng = random.Random(first_id)
+    now = datetime.utcnow()
+    for batch_first_id in range(first_id, last_id + 1, batch_size):
+        order_ids = range(batch_first_id, min(batch_first_id + batch_size, last_id + 1))
+        db.session.execute(insert(Order), [
+            {"id": order_id, "user_id": user_id, "location": BENCHMARK_ORDER_LOCATION, "executed": True,
+             "executed_at": now, "created_at": now, "updated_at": now}
+            for order_id in order_ids
+        ])
+        db.session.execute(insert(OrderItem), [
+            {"order_id": order_id, "product_id": product.id, "quantity": rng.randint(1, 5),
+             "unit_price": product.price}
+            for order_id in order_ids
+            for product in rng.sample(products, items_per_order)
+        ])
+        db.session.commit()
+
+
+def _delete_orders(first_id: int, last_id: int, batch_size: int) -> None:
+    """
+    Deletes the orders in an id range and their items, one transaction per batch.
+    """
+    for batch_first_id in range(first_id, last_id + 1, batch_size):
+        batch_last_id = min(batch_first_id + batch_size - 1, last_id)
+        db.session.execute(delete(OrderItem).where(OrderItem.order_id.between(batch_first_id, batch_last_id)))
+        db.session.execute(delete(Order).where(Order.id.between(batch_first_id, batch_last_id)))
+        db.session.commit()
+
+
+def _calculate_total_order_sales_per_order() -> Tuple[int, float]:
+    """
+    The profit calculation that the stored totals replaced: loads every executed order, then lazily
+    loads its items and sums their prices in Python.
+    """
+    executed_orders = Order.query.filter_by(executed=True).all()
+    total_profit = 0.0
+    for order in executed_orders:
+        for item in order.items:
+            total_profit += item.unit_price * item.quantity
+    return len(executed_orders), total_profit
+
+
+def _calculate_total_order_sales_from_totals() -> Tuple[int, float]:
+    """
+    The profit calculation over the orders' stored totals, a single COUNT/SUM aggregate.
+    """
+    sales_stmt = (
+        select(func.count(Order.id), func.coalesce(func.sum(Order.total_price), 0))
+        .where(Order.executed.is_(True))
+    )
+    number_of_executed_orders, total_profit = db.session.execute(sales_stmt).one()
+    return number_of_executed_orders, total_profit
+
+
+def _calculate_total_order_sales_from_rollup() -> Tuple[int, float]:
+    """
+    The profit calculation of `/statistics/profit`, a read of the per location sales rollup (uncached).
+    """
+    sales_info = calculate_total_order_sales.__wrapped__()
+    return sales_info.number_of_executed_orders, sales_info.total_profit
+
+
+def _timed(func_to_time) -> Tuple[Any, float]:
+    started = time.perf_counter()
+    result = func_to_time()
+    return result, time.perf_counter() - started
+
+
+def benchmark_order_profit(orders_count: int, items_per_order: int, batch_size: int,
+                           include_per_order: bool = True) -> Dict[str, Any]:
+    """
+    Compares the profit calculations at scale: seeds executed orders without stored totals, backfills their
+    totals, then times the per order calculation, the aggregate over the stored totals and the sales rollup
+    read that serves `/statistics/profit`. The seeded orders are deleted and the rollups rebuilt at the end.
+
+    Meant for a benchmark database, the seeded orders are visible to other sessions while it runs.
+
+    Args:
+        orders_count: The number of executed orders to seed (0 to only measure the existing orders).
+        items_per_order: The number of distinct products per seeded order.
+        batch_size: The number of orders inserted, backfilled and deleted per transaction.
+        include_per_order: Whether to time the per order calculation, which loads every executed order
+            and its items in memory.
+
+    Raises:
+        ValueError: If there is no user, or fewer products than items_per_order.
+
+    Returns:
+        Dict[str, Any]: The executed orders count, the duration (seconds) of the seeding, of the backfill
+        and of each calculation, and the (orders count, total profit) of each calculation.
+    """
+    first_id = (db.session.execute(select(func.max(Order.id))).scalar() or 0) + 1
+    last_id = first_id + orders_count - 1
+    try:
+        _, seed_seconds = _timed(lambda: _seed_executed_orders(first_id, last_id, items_per_order, batch_size))
+        _, backfill_seconds = _timed(lambda: backfill_order_totals(batch_size))
+        rebuild_sales_rollups()
+        db.session.commit()
+
+        results = {"seed_seconds": seed_seconds, "backfill_seconds": backfill_seconds}
+        calculations = {
+            "stored_totals": _calculate_total_order_sales_from_totals,
+            "rollup": _calculate_total_order_sales_from_rollup,
+        }
+        if include_per_order:
+            calculations["per_order"] = _calculate_total_order_sales_per_order
+        for name, calculate in calculations.items():
+            results[name], results[f"{name}_seconds"] = _timed(calculate)
+            db.session.rollback()
+            db.session.expunge_all()
+        results["executed_orders"] = results["stored_totals"][0]
+    finally:
+        db.session.rollback()
+        _delete_orders(first_id, last_id, batch_size)
+        rebuild_sales_rollups()
+        db.session.commit()
+
+    return results
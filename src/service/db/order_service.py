@@ -1,45 +1,119 @@
 from datetime import datetime
-from typing import List, Dict, Any
+from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 
 from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import insert, select, update, delete, or_, and_, func
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
 from werkzeug.exceptions import BadRequest
 
+from config import ORDERS_EXPORT_BATCH_SIZE
 from database import get_db_connection
 from models.order import Order, OrderItem
+from models.sales_rollup import LocationSalesRollup
 
 from models.product import Product
-from repository.countries import get_all_countries
-from schemas.order import AddOrderItem, CreateOrder, OrderItemInfo, OrderInfo, UpdateOrderInput, SalesInfo
+from service.db.product_service import get_products_by_ids, decrement_product_quantities
+from service.db.distinct_buyers_service import record_order_buyers
+from service.db.order_value_service import record_order_values
+from service.db.product_cache_service import get_product_cache
+from service.db.sales_rollup_service import record_executed_orders, remove_executed_orders
+from service.sales_analytics import get_sales_analytics
+from service.statistics_cache import cached_statistics, invalidate_statistics_cache
+from repository.countries import get_country_catalog
+from utils.pagination import encode_cursor, decode_cursor
+from schemas.order import AddOrderItem, CreateOrder, OrderItemInfo, OrderInfo, UpdateOrderInput, SalesInfo, \
+    ExecuteOrderResult
 
 db = get_db_connection()
 
 
-def add_order_item_to_db(item: AddOrderItem, new_order: Order) -> None:
+def merge_order_items(items: List[AddOrderItem]) -> Dict[int, int]:
     """
-    Adds an order item to the database based on the product and order provided.
+    Merges the requested items into a single quantity per product.
 
     Args:
-        item: An object containing product_id and quantity.
-        new_order: The order to which this item belongs.
+        items: The requested order items, a product may appear more than once.
+
+    Returns:
+        Dict[int, int]: Mapping of product id to the total requested quantity, in request order.
+    """
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+
+def add_order_items_to_db(items: List[AddOrderItem], new_order: Order) -> List[Dict[str, Any]]:
+    """
+    Adds the order items to the database with a single products lookup and a single bulk insert.
+
+    Args:
+        items: A list of objects containing product_id and quantity.
+        new_order: The order to which these items belong (must already have an id).
 
     Raises:
-        ValueError: If the product with the given ID is not found.
+        ValueError: If any of the requested products is not found (all missing ids are reported).
 
     Returns:
-        None
+        List[Dict[str, Any]]: The inserted order item rows, including the product name.
+    """
+    return insert_order_items(merge_order_items(items), new_order.id)
+
+
+def insert_order_items(quantities: Dict[int, int], order_id: int) -> List[Dict[str, Any]]:
     """
-    product = Product.query.get(item.product_id)
-    if not product:
-        raise ValueError(f"Product with ID {item.product_id} not found")
-
-    order_item = OrderItem(
-        order_id=new_order.id,
-        product_id=item.product_id,
-        quantity=item.quantity,
-        unit_price=product.price
+    Inserts order items priced at the current product prices, with a single products lookup
+    and a single bulk insert.
+
+    Args:
+        quantities: Mapping of product id to the quantity to order.
+        order_id: The ID of the order to which these items belong.
+
+    Raises:
+        ValueError: If any of the requested products is not found (all missing ids are reported).
+
+    Returns:
+        List[Dict[str, Any]]: The inserted order item rows, including the product name.
+    """
+    if not quantities:
+        return []
+
+    products = get_products_by_ids(quantities.keys())
+
+    missing_ids = [product_id for product_id in quantities if product_id not in products]
+    if missing_ids:
+        raise ValueError(f"Products with IDs {missing_ids} not found")
+
+    order_items = [
+        {
+            "order_id": order_id,
+            "product_id": product_id,
+            "product_name": products[product_id].name,
+            "quantity": quantity,
+            "unit_price": products[product_id].price
+        }
+        for product_id, quantity in quantities.items()
+    ]
+    db.session.execute(
+        insert(OrderItem),
+        [{key: value for key, value in item.items() if key != "product_name"} for item in order_items]
     )
-    db.session.add(order_item)
+
+    return order_items
+
+
+def set_order_totals(order: Order, order_items: List[Dict[str, Any]]) -> None:
+    """
+    Stores the item count and total price of an order from its items.
+
+    Args:
+        order: The order to update.
+        order_items: All the items of the order (dicts with quantity and unit_price).
+    """
+    order.total_quantity = sum(item["quantity"] for item in order_items)
+    order.total_price = sum(item["unit_price"] * item["quantity"] for item in order_items)
 
 
 def create_order(order: CreateOrder) -> Order:
@@ -50,87 +124,142 @@ def create_order(order: CreateOrder) -> Order:
         order: An object with an `items` attribute (list of items with product_id and quantity).
 
     Raises:
-        ValueError: If the order has no items.
+        ValueError: If the order has no items, the location is invalid or a product is not found.
 
     Returns:
         Order: The newly created order instance.
     """
     if len(order.items) == 0:
         raise ValueError("no items in order")
-    if order.location not in get_all_countries():
+    location = get_country_catalog().resolve(order.location)
+    if not location:
         raise ValueError("we dont ship for this country or invalid country name.")
 
     new_order = Order(user_id=get_jwt_identity())
-    new_order.location = order.location
+    new_order.location = location
 
     db.session.add(new_order)
     db.session.flush()
 
-    for item in order.items:
-        add_order_item_to_db(item, new_order)
+    try:
+        order_items = add_order_items_to_db(order.items, new_order)
+    except ValueError:
+        db.session.rollback()
+        raise
+    set_order_totals(new_order, order_items)
 
     db.session.commit()
 
     return new_order
 
 
-def get_user_orders(user_id: int) -> List[Dict]:
+def get_user_orders(user_id: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
     """
-    Retrieve all orders for a given user by user ID.
+    Retrieve a page of a user's orders, newest first.
+
+    The orders are paginated with a keyset on (created_at, id), and their items and product names
+    are loaded eagerly, so a page always costs the same small number of queries.
 
     Args:
         user_id (int): The ID of the user whose orders are to be retrieved.
+        limit (int): The maximum number of orders in the page.
+        cursor (Optional[str]): The cursor returned with the previous page, None for the first page.
 
     Returns:
-        List[Dict]: A list of dictionaries, each representing an order associated with the user.
-                    Each dictionary contains serialized order data via the `to_dict()` method.
-    """
-    orders = Order.query.filter_by(user_id=user_id).all()
-    return [order.to_dict() for order in orders]
-
-
-def update_quantities(order: Order) -> None:
-    """
-    Deducts quantities of products based on the given order's items.
-
-    Args:
-        order (Order): The order containing items whose quantities should be updated.
+        Tuple[List[Dict], Optional[str]]: The serialized orders (via the `to_dict()` method) and the
+                                          cursor of the next page, or None if this is the last page.
 
     Raises:
-        ValueError: If requested quantity exceeds available product quantity.
-        BadRequest: If a database error occurs during update.
+        ValueError: If the cursor is malformed.
     """
-    try:
-        order_items = [item for item in order.items]
-        for item in order_items:
-            product = Product.query.filter_by(id=item.product_id).first()
-            if product.quantity >= item.quantity:
-                product.quantity -= item.quantity
-            else:
-                raise ValueError(
-                    f"cant execute order, asked for {item.quantity} of {product.name} but storage has less.")
-
-        db.session.commit()
-    except SQLAlchemyError as e:
-        db.session.rollback()
-        raise BadRequest("Database error occurred during order execution")
-
+    get_orders_query = (
+        Order.query
+        .options(selectinload(Order.items).joinedload(OrderItem.product).load_only(Product.name))
+        .filter(Order.user_id == user_id)
+        .order_by(Order.created_at.desc(), Order.id.desc())
+    )
 
-def calculate_order_price(order: Order) -> float:
+    last_seen = decode_cursor(cursor, 2)
+    if last_seen:
+        try:
+            last_created_at, last_id = datetime.fromisoformat(last_seen[0]), int(last_seen[1])
+        except (TypeError, ValueError):
+            raise ValueError("invalid cursor.")
+        get_orders_query = get_orders_query.filter(or_(
+            Order.created_at < last_created_at,
+            and_(Order.created_at == last_created_at, Order.id < last_id)
+        ))
+
+    orders = get_orders_query.limit(limit + 1).all()
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor([orders[-1].created_at.isoformat(), orders[-1].id])
+
+    return [order.to_dict() for order in orders], next_cursor
+
+
+def iter_orders_export(user_id: int, executed: Optional[bool] = None, location: Optional[str] = None,
+                       created_from: Optional[datetime] = None,
+                       created_to: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
     """
-    Calculates the total price for all items in the order.
+    Streams a user's orders with their items, one dictionary per order, ordered by order id.
 
-    Args:
-        order (Order): The order whose total price should be calculated.
+    The rows are read as a flat orders/items/products projection through a server side cursor
+    (`yield_per`), so memory stays flat no matter how many orders are exported.
 
-    Returns:
-        float: The total price calculated as sum of (unit_price * quantity) for all items.
+    Args:
+        user_id (int): The ID of the user whose orders are exported.
+        executed (Optional[bool]): Only export executed (True) or pending (False) orders.
+        location (Optional[str]): Only export orders shipped to this country.
+        created_from (Optional[datetime]): Only export orders created at or after this time.
+        created_to (Optional[datetime]): Only export orders created before this time.
+
+    Yields:
+        Dict[str, Any]: An order with its id, user_id, location, executed, created_at and items.
     """
-    order_items = [item for item in order.items]
-    price = 0.0
-    for item in order_items:
-        price += item.unit_price * item.quantity
-    return price
+    export_stmt = (
+        select(Order.id, Order.user_id, Order.location, Order.executed, Order.created_at,
+               OrderItem.product_id, Product.name.label("product_name"), OrderItem.quantity, OrderItem.unit_price)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(Order.user_id == user_id)
+        .order_by(Order.id, OrderItem.product_id)
+    )
+    if executed is not None:
+        export_stmt = export_stmt.where(Order.executed.is_(executed))
+    if location:
+        export_stmt = export_stmt.where(Order.location == location)
+    if created_from:
+        export_stmt = export_stmt.where(Order.created_at >= created_from)
+    if created_to:
+        export_stmt = export_stmt.where(Order.created_at < created_to)
+
+    rows = db.session.execute(export_stmt.execution_options(yield_per=ORDERS_EXPORT_BATCH_SIZE))
+
+    current_order = None
+    for row in rows:
+        if current_order is None or current_order["id"] != row.id:
+            if current_order is not None:
+                yield current_order
+            current_order = {
+                "id": row.id,
+                "user_id": row.user_id,
+                "location": row.location,
+                "executed": row.executed,
+                "created_at": row.created_at.isoformat(),
+                "items": []
+            }
+        if row.product_id is not None:
+            current_order["items"].append({
+                "product_id": row.product_id,
+                "product_name": row.product_name,
+                "quantity": row.quantity,
+                "unit_price": row.unit_price
+            })
+
+    if current_order is not None:
+        yield current_order
 
 
 def execute_order(order_id: int, user_id: int) -> Dict[str, Any]:
@@ -138,6 +267,10 @@ def execute_order(order_id: int, user_id: int) -> Dict[str, Any]:
     Executes an order by validating user ownership, checking execution status,
     updating product quantities, calculating the price, and marking the order as executed.
 
+    Marking the order as executed and decrementing the stock happen in a single transaction:
+    the order is flagged with a conditional UPDATE (so it can't be executed twice concurrently)
+    and all its products are decremented with one conditional UPDATE. On a shortage nothing is changed.
+
     Args:
         order_id (int): The ID of the order to execute.
         user_id (int): The ID of the user requesting the execution.
@@ -146,8 +279,9 @@ def execute_order(order_id: int, user_id: int) -> Dict[str, Any]:
         Dict[str, Any]: A dictionary containing the executed order's item details and total price.
 
     Raises:
-        ValueError: If the order does not exist or does not belong to the user.
-        BadRequest: If the order is already executed or a database error occurs.
+        ValueError: If there isn't enough stock for one of the order's products.
+        BadRequest: If the order doesn't exist, doesn't belong to the user, is already executed
+                    or a database error occurs.
     """
 
     order = Order.query.filter_by(id=order_id).first()
@@ -159,22 +293,180 @@ def execute_order(order_id: int, user_id: int) -> Dict[str, Any]:
 
     if order.executed:
         raise BadRequest("This order has already been executed.")
-    order.executed = True
-    db.session.commit()
 
-    update_quantities(order)
-    price = calculate_order_price(order)
+    get_order_items_stmt = (
+        select(OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price, Product.name)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(OrderItem.order_id == order_id)
+    )
+    order_items = db.session.execute(get_order_items_stmt).all()
+
+    try:
+        mark_executed_stmt = (
+            update(Order)
+            .where(Order.id == order_id, Order.executed.is_(False))
+            .values(executed=True, executed_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if db.session.execute(mark_executed_stmt).rowcount != 1:
+            raise BadRequest("This order has already been executed.")
+
+        decrement_product_quantities({item.product_id: item.quantity for item in order_items})
+        record_executed_orders([order_id])
+        record_order_buyers([order_id])
+        record_order_values([order_id])
+        db.session.commit()
+        invalidate_statistics_cache()
+        get_product_cache().invalidate(item.product_id for item in order_items)
+
+    except (ValueError, BadRequest):
+        db.session.rollback()
+        raise
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise BadRequest("Database error occurred during order execution")
 
-    order_items = [item for item in order.items]
-    order_details = [{item.product.name: item.quantity} for item in order_items]
+    price = sum(item.unit_price * item.quantity for item in order_items)
+    order_details = [{item.name: item.quantity} for item in order_items]
 
     return {"items": order_details, "total_price": price}
 
 
+def execute_orders(order_ids: List[int], user_id: int) -> List[ExecuteOrderResult]:
+    """
+    Executes many orders of a user in a single transaction (see `execute_owned_orders`).
+
+    Args:
+        order_ids (List[int]): The IDs of the orders to execute.
+        user_id (int): The ID of the user requesting the execution.
+
+    Returns:
+        List[ExecuteOrderResult]: The outcome of every requested order, in request order.
+
+    Raises:
+        BadRequest: If a database error occurs (nothing is executed in that case).
+    """
+    return execute_owned_orders({order_id: user_id for order_id in order_ids})
+
+
+def execute_owned_orders(order_owners: Dict[int, int]) -> List[ExecuteOrderResult]:
+    """
+    Executes many orders in a single transaction, each on behalf of the user that requested it.
+
+    The orders, their items and the stock of the involved products are read (and locked) with one
+    query each. Stock is then allocated to the orders in the given order, an order that can't be
+    fully fulfilled is skipped, and the required quantities of all the accepted orders are
+    aggregated per product and decremented with a single UPDATE, so the number of statements
+    doesn't grow with the number of orders.
+
+    Args:
+        order_owners (Dict[int, int]): Mapping of the IDs of the orders to execute (in fulfilment order)
+                                       to the ID of the user requesting each execution.
+
+    Returns:
+        List[ExecuteOrderResult]: The outcome of every requested order, in request order.
+
+    Raises:
+        BadRequest: If a database error occurs (nothing is executed in that case).
+    """
+    order_ids = list(order_owners.keys())
+    errors = {}
+
+    get_orders_stmt = (
+        select(Order.id, Order.user_id, Order.executed)
+        .where(Order.id.in_(order_ids))
+        .order_by(Order.id)
+        .with_for_update()
+    )
+    orders = {order.id: order for order in db.session.execute(get_orders_stmt)}
+
+    for order_id in order_ids:
+        order = orders.get(order_id)
+        if not order:
+            errors[order_id] = f"no order found with id {order_id}"
+        elif order.user_id != order_owners[order_id]:
+            errors[order_id] = "User cannot execute orders that do not belong to them."
+        elif order.executed:
+            errors[order_id] = "This order has already been executed."
+
+    executable_ids = [order_id for order_id in order_ids if order_id not in errors]
+
+    items_by_order = defaultdict(list)
+    if executable_ids:
+        get_items_stmt = (
+            select(OrderItem.order_id, OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price)
+            .where(OrderItem.order_id.in_(executable_ids))
+        )
+        for item in db.session.execute(get_items_stmt):
+            items_by_order[item.order_id].append(item)
+
+    product_ids = {item.product_id for items in items_by_order.values() for item in items}
+    stock = {}
+    if product_ids:
+        get_stock_stmt = (
+            select(Product.id, Product.name, Product.quantity)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update()
+        )
+        stock = {product.id: product for product in db.session.execute(get_stock_stmt)}
+
+    available = {product_id: product.quantity for product_id, product in stock.items()}
+    required = defaultdict(int)
+    prices = {}
+    for order_id in executable_ids:
+        items = items_by_order[order_id]
+        short_item = next((item for item in items if available[item.product_id] < item.quantity), None)
+        if short_item:
+            errors[order_id] = (f"cant execute order, asked for {short_item.quantity} of "
+                                f"{stock[short_item.product_id].name} but storage has less.")
+            continue
+
+        for item in items:
+            available[item.product_id] -= item.quantity
+            required[item.product_id] += item.quantity
+        prices[order_id] = sum(item.unit_price * item.quantity for item in items)
+
+    if prices:
+        try:
+            mark_executed_stmt = (
+                update(Order)
+                .where(Order.id.in_(prices.keys()), Order.executed.is_(False))
+                .values(executed=True, executed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            if db.session.execute(mark_executed_stmt).rowcount != len(prices):
+                raise ValueError("orders have changed during execution.")
+
+            decrement_product_quantities(required)
+            record_executed_orders(list(prices.keys()))
+            record_order_buyers(list(prices.keys()))
+            record_order_values(list(prices.keys()))
+            db.session.commit()
+            invalidate_statistics_cache()
+            get_product_cache().invalidate(required.keys())
+
+        except (ValueError, SQLAlchemyError):
+            db.session.rollback()
+            raise BadRequest("Database error occurred during orders execution")
+    else:
+        db.session.rollback()
+
+    return [
+        ExecuteOrderResult(id=order_id, executed=order_id in prices, total_price=prices.get(order_id),
+                           error=errors.get(order_id))
+        for order_id in order_ids
+    ]
+
+
 def update_order(order_details: UpdateOrderInput, user_id: int) -> OrderInfo:
     """
     Update an existing order's items, replacing them with the given ones.
 
+    Only the difference with the current items is written: removed products are deleted, products
+    whose quantity changed are updated (keeping the unit price they were ordered at), and new products
+    are inserted at their current price. The response is built from the items already in memory.
+
     Args:
         order_details (UpdateOrder): The order update request, containing id and items.
         user_id (int): The ID of the user attempting the update.
@@ -183,6 +475,7 @@ def update_order(order_details: UpdateOrderInput, user_id: int) -> OrderInfo:
         OrderInfo: The updated order info including order id and list of items.
 
     Raises:
+        ValueError: If any of the new products is not found.
         BadRequest: If order not found, user mismatch, no items provided, or DB error occurs.
     """
     order = Order.query.filter_by(id=order_details.id).first()
@@ -199,27 +492,60 @@ def update_order(order_details: UpdateOrderInput, user_id: int) -> OrderInfo:
         raise BadRequest("cant update order that already executed.")
 
     try:
-        if order_details.location and order_details.location in get_all_countries():
-            order.location = order_details.location
-        else:
+        location = get_country_catalog().resolve(order_details.location)
+        if not location:
             raise BadRequest("we dont ship for this country or invalid country name")
 
-        OrderItem.query.filter_by(order_id=order_details.id).delete()
-
-        for item in order_details.items:
-            add_order_item_to_db(item, order)
-
+        get_items_stmt = (
+            select(OrderItem.product_id, OrderItem.quantity, OrderItem.unit_price,
+                   Product.name.label("product_name"))
+            .join(Product, Product.id == OrderItem.product_id)
+            .where(OrderItem.order_id == order.id)
+        )
+        current_items = {item.product_id: item._asdict() for item in db.session.execute(get_items_stmt)}
+        requested_quantities = merge_order_items(order_details.items)
+
+        removed_ids = [product_id for product_id in current_items if product_id not in requested_quantities]
+        changed_items = [
+            {"order_id": order.id, "product_id": product_id, "quantity": quantity}
+            for product_id, quantity in requested_quantities.items()
+            if product_id in current_items and current_items[product_id]["quantity"] != quantity
+        ]
+        new_quantities = {
+            product_id: quantity
+            for product_id, quantity in requested_quantities.items()
+            if product_id not in current_items
+        }
+
+        if removed_ids:
+            db.session.execute(
+                delete(OrderItem)
+                .where(OrderItem.order_id == order.id, OrderItem.product_id.in_(removed_ids))
+                .execution_options(synchronize_session=False)
+            )
+        if changed_items:
+            db.session.execute(update(OrderItem), changed_items)
+        inserted_items = {item["product_id"]: item for item in insert_order_items(new_quantities, order.id)}
+
+        order_items = []
+        for product_id, quantity in requested_quantities.items():
+            item = inserted_items.get(product_id) or dict(current_items[product_id], quantity=quantity)
+            order_items.append(item)
+
+        order.location = location
+        set_order_totals(order, order_items)
+        order.updated_at = datetime.utcnow()
         db.session.commit()
-        updated_items = OrderItem.query.filter_by(order_id=order.id).all()
 
         updated_items = [
-            OrderItemInfo(name=item.product.name, quantity=item.quantity)
-            for item in updated_items
+            OrderItemInfo(name=item["product_name"], quantity=item["quantity"])
+            for item in order_items
         ]
-        order.updated_at = datetime.utcnow()
-
-        return OrderInfo(id=order.id, items=updated_items, location=order.location)
+        return OrderInfo(id=order_details.id, items=updated_items, location=location)
 
+    except ValueError:
+        db.session.rollback()
+        raise
     except SQLAlchemyError:
         db.session.rollback()
         raise BadRequest("Database error occurred during order update")
@@ -238,6 +564,7 @@ def delete_order(order_id: int, user_id: int) -> None:
 
     Behavior:
         - If the order exists and belongs to the user, it is removed from the database.
+        - If the order was executed, its sales are subtracted from the sales rollups.
         - Commits the transaction to persist the deletion.
     """
     order = Order.query.filter_by(id=order_id).first()
@@ -247,26 +574,74 @@ def delete_order(order_id: int, user_id: int) -> None:
     if order.user_id != user_id:
         raise BadRequest("User cannot delete orders that do not belong to them.")
 
+    was_executed = order.executed
+    if was_executed:
+        remove_executed_orders([order_id])
+
     db.session.delete(order)
     db.session.commit()
+    if was_executed:
+        invalidate_statistics_cache()
+        get_sales_analytics().forget_orders([order_id])
 
 
-def calculate_total_order_sales():
+@cached_statistics
+def calculate_total_order_sales() -> SalesInfo:
     """
     Calculate total profit and count of executed orders.
 
-    Queries the database for all orders marked as executed,
-    calculates the total profit using `calculate_order_price`,
-    and returns a `SalesInfo` Pydantic model.
+    Read from the per location sales rollup, a handful of rows kept up to date when orders execute.
+    Served from the statistics cache.
 
     Returns:
         SalesInfo: A model containing:
             - number_of_executed_orders (int): Count of executed orders.
             - total_profit (float): Sum of profits from all executed orders.
     """
-    executed_orders = Order.query.filter_by(executed=True).all()
-    total_profit = 0
-    for order in executed_orders:
-        total_profit += calculate_order_price(order)
+    sales_stmt = select(
+        func.coalesce(func.sum(LocationSalesRollup.orders_count), 0),
+        func.coalesce(func.sum(LocationSalesRollup.revenue), 0)
+    )
+    number_of_executed_orders, total_profit = db.session.execute(sales_stmt).one()
+
+    return SalesInfo(number_of_executed_orders=number_of_executed_orders, total_profit=total_profit)
+
+
+def backfill_order_totals(batch_size: int = 1000) -> int:
+    """
+    Recomputes the stored total_quantity and total_price of every order from its items.
+
+    Used once for orders created before the totals were stored, and for recovery.
+    The orders are updated in id ranges, one transaction per batch.
+
+    Args:
+        batch_size (int): The number of order ids updated per transaction.
+
+    Returns:
+        int: The number of orders updated.
+    """
+    max_order_id = db.session.execute(select(func.max(Order.id))).scalar() or 0
+
+    order_quantity = (
+        select(func.coalesce(func.sum(OrderItem.quantity), 0))
+        .where(OrderItem.order_id == Order.id)
+        .scalar_subquery()
+    )
+    order_price = (
+        select(func.coalesce(func.sum(OrderItem.quantity * OrderItem.unit_price), 0))
+        .where(OrderItem.order_id == Order.id)
+        .scalar_subquery()
+    )
+
+    updated_orders = 0
+    for first_id in range(1, max_order_id + 1, batch_size):
+        backfill_stmt = (
+            update(Order)
+            .where(Order.id >= first_id, Order.id < first_id + batch_size)
+            .values(total_quantity=order_quantity, total_price=order_price, updated_at=Order.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        updated_orders += db.session.execute(backfill_stmt).rowcount
+        db.session.commit()
 
-    return SalesInfo(number_of_executed_orders=len(executed_orders), total_profit=total_profit)
+    return updated_orders
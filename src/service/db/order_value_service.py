@@ -0,0 +1,187 @@
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, delete, func, tuple_
+
+from config import ORDER_VALUE_DIGEST_COMPRESSION
+from database import get_db_connection
+from models.order import Order
+from models.order_value_digest import OrderValueDigest
+from repository.countries import get_country_catalog
+from schemas.statistics import OrderValuePercentiles, OrderValuePercentilesInfo
+from utils.db_utils import upsert_insert
+from utils.sketches import TDigest
+
+db = get_db_connection()
+
+ORDER_VALUE_REBUILD_BATCH_SIZE = 10000
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def _order_values_select():
+    """
+    Selects the total price, location and execution day of executed orders.
+    """
+    return (
+        select(Order.total_price, Order.location,
+               func.coalesce(Order.executed_at, Order.updated_at).label("executed_at"))
+        .where(Order.executed.is_(True))
+    )
+
+
+def _new_digests() -> Dict[Tuple[date, str], TDigest]:
+    return defaultdict(lambda: TDigest(ORDER_VALUE_DIGEST_COMPRESSION))
+
+
+def record_order_values(order_ids: List[int]) -> None:
+    """
+    Adds the total price of newly executed orders to the (day, location) order value digests.
+
+    Must run in the transaction that marks the orders as executed (after marking them), it doesn't commit.
+    Missing rows are inserted first and the rows are locked before they are read, so concurrent executions
+    can't overwrite each other's values.
+
+    Args:
+        order_ids: The IDs of the orders that were just executed.
+    """
+    if not order_ids:
+        return
+
+    digests = _new_digests()
+    for row in db.session.execute(_order_values_select().where(Order.id.in_(order_ids))):
+        digests[(row.executed_at.date(), row.location)].add(row.total_price)
+
+    now = datetime.utcnow()
+    empty_digest = TDigest(ORDER_VALUE_DIGEST_COMPRESSION).to_bytes()
+    db.session.execute(
+        upsert_insert(OrderValueDigest)
+        .values([{"day": day, "location": location, "orders_count": 0, "digest": empty_digest, "updated_at": now}
+                 for day, location in digests])
+        .on_conflict_do_nothing(index_elements=["day", "location"])
+    )
+
+    stored_digests_stmt = (
+        select(OrderValueDigest.day, OrderValueDigest.location, OrderValueDigest.orders_count,
+               OrderValueDigest.digest)
+        .where(tuple_(OrderValueDigest.day, OrderValueDigest.location).in_(list(digests)))
+        .order_by(OrderValueDigest.day, OrderValueDigest.location)
+        .with_for_update()
+    )
+    merged_rows = []
+    for row in db.session.execute(stored_digests_stmt):
+        new_digest = digests[(row.day, row.location)]
+        digest = TDigest.from_bytes(row.digest)
+        digest.merge(new_digest)
+        merged_rows.append({"day": row.day, "location": row.location, "digest": digest.to_bytes(),
+                            "orders_count": row.orders_count + int(new_digest.count), "updated_at": now})
+    db.session.execute(update(OrderValueDigest), merged_rows)
+
+
+def rebuild_order_value_digests() -> None:
+    """
+    Recomputes all the order value digests from the executed orders, one day at a time, in one transaction.
+
+    Needed after executed orders are deleted (digests can't remove values) or their items changed.
+    """
+    db.session.execute(delete(OrderValueDigest))
+
+    def flush(digests: Dict[Tuple[date, str], TDigest]) -> None:
+        db.session.execute(OrderValueDigest.__table__.insert(), [
+            {"day": day, "location": location, "orders_count": int(digest.count), "digest": digest.to_bytes()}
+            for (day, location), digest in digests.items()
+        ])
+
+    order_values_stmt = (
+        _order_values_select()
+        .order_by(func.coalesce(Order.executed_at, Order.updated_at))
+        .execution_options(yield_per=ORDER_VALUE_REBUILD_BATCH_SIZE)
+    )
+    current_day = None
+    day_digests = None
+    for row in db.session.execute(order_values_stmt):
+        day = row.executed_at.date()
+        if day != current_day:
+            if day_digests:
+                flush(day_digests)
+            current_day = day
+            day_digests = _new_digests()
+        day_digests[(day, row.location)].add(row.total_price)
+    if day_digests:
+        flush(day_digests)
+
+    db.session.commit()
+
+
+def _percentiles_info(key: Optional[str], digest: TDigest, percentiles: List[float]) -> OrderValuePercentilesInfo:
+    return OrderValuePercentilesInfo(
+        key=key,
+        orders_count=int(digest.count),
+        min=digest.min if digest.count else None,
+        max=digest.max if digest.count else None,
+        percentiles={f"p{percentile:g}": round(digest.quantile(percentile / 100), 2)
+                     for percentile in percentiles} if digest.count else {}
+    )
+
+
+def calculate_order_value_percentiles(percentiles: Optional[List[float]] = None, group_by: Optional[str] = None,
+                                      locations: Optional[List[str]] = None, start: Optional[date] = None,
+                                      end: Optional[date] = None) -> OrderValuePercentiles:
+    """
+    Estimates order value percentiles by merging the stored (day, location) t-digests of a range,
+    without reading the orders.
+
+    Args:
+        percentiles: The percentiles to estimate (between 0 and 100), p50/p90/p99 if not given.
+        group_by: None for the overall percentiles only, or also per 'location' or per 'day'.
+        locations: Only orders of these countries (any case / spacing accepted), all of them if not given.
+        start: First execution day (inclusive), no limit if not given.
+        end: Last execution day (exclusive), no limit if not given.
+
+    Raises:
+        ValueError: If group_by, a percentile or a location is invalid.
+
+    Returns:
+        OrderValuePercentiles: The overall percentiles, and the percentiles of every group.
+    """
+    percentiles = list(percentiles or DEFAULT_PERCENTILES)
+    if any(not 0 <= percentile <= 100 for percentile in percentiles):
+        raise ValueError("percentiles must be between 0 and 100.")
+    if group_by not in (None, "location", "day"):
+        raise ValueError("group_by must be 'location' or 'day'.")
+    if locations:
+        country_catalog = get_country_catalog()
+        resolved_locations = {location: country_catalog.resolve(location) for location in locations}
+        unknown_locations = [location for location, resolved in resolved_locations.items() if not resolved]
+        if unknown_locations:
+            raise ValueError(f"we dont ship for these countries or invalid country names: {unknown_locations}")
+        locations = list(set(resolved_locations.values()))
+
+    digests_stmt = (
+        select(OrderValueDigest.day, OrderValueDigest.location, OrderValueDigest.digest)
+        .order_by(OrderValueDigest.day, OrderValueDigest.location)
+    )
+    if locations:
+        digests_stmt = digests_stmt.where(OrderValueDigest.location.in_(locations))
+    if start:
+        digests_stmt = digests_stmt.where(OrderValueDigest.day >= start)
+    if end:
+        digests_stmt = digests_stmt.where(OrderValueDigest.day < end)
+
+    overall_digest = TDigest(ORDER_VALUE_DIGEST_COMPRESSION)
+    group_digests = {}
+    for row in db.session.execute(digests_stmt):
+        digest = TDigest.from_bytes(row.digest)
+        overall_digest.merge(digest)
+        if group_by:
+            group_key = row.location if group_by == "location" else row.day.isoformat()
+            group_digests.setdefault(group_key, TDigest(ORDER_VALUE_DIGEST_COMPRESSION)).merge(digest)
+
+    return OrderValuePercentiles(
+        group_by=group_by,
+        start=start,
+        end=end,
+        overall=_percentiles_info(None, overall_digest, percentiles),
+        groups=[_percentiles_info(group_key, group_digests[group_key], percentiles)
+                for group_key in sorted(group_digests)]
+    )
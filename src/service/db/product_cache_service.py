@@ -0,0 +1,150 @@
+import threading
+from functools import lru_cache
+from datetime import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import select
+
+from config import PRODUCT_CACHE_MAX_ENTRIES, PRODUCT_CACHE_TTL_SECONDS
+from database import get_db_connection
+from models.category import Category
+from models.product import Product
+
+db = get_db_connection()
+
+
+class ProductRecord(NamedTuple):
+    """
+    Immutable snapshot of a product's details, shared between requests by the product cache.
+
+    updated_at is the latest update time of the product and its category (the record holds the category name).
+    """
+    id: int
+    name: str
+    quantity: int
+    price: float
+    category: str
+    updated_at: Optional[datetime]
+
+
+class ProductCache:
+    """
+    Read-through LRU/TTL cache of product details by id and by name.
+
+    Records are loaded with a single products/categories join. The product service drops the records
+    of products it changes (details, stock, deletion, category rename/delete); `ttl_seconds` bounds the
+    staleness of changes made by other workers. Names map to ids, so a renamed product's old name stops
+    matching as soon as its record is dropped.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self._records = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._ids_by_name = TTLCache(maxsize=max_entries, ttl=ttl_seconds)
+        self._lock = threading.Lock()
+        # bumped on every invalidation, records loaded across an invalidation are not stored.
+        self._generation = 0
+
+    def get_by_id(self, product_id: int) -> Optional[ProductRecord]:
+        """
+        Returns the details of a product, or None if it doesn't exist.
+        """
+        with self._lock:
+            record = self._records.get(product_id)
+            generation = self._generation
+        if record:
+            return record
+        return self._load(Product.id == product_id, generation)
+
+    def get_by_name(self, name: str) -> Optional[ProductRecord]:
+        """
+        Returns the details of the product with this exact name, or None if it doesn't exist.
+        """
+        with self._lock:
+            product_id = self._ids_by_name.get(name)
+            record = self._records.get(product_id) if product_id is not None else None
+            generation = self._generation
+        if record and record.name == name:
+            return record
+        return self._load(Product.name == name, generation)
+
+    def _load(self, condition, generation: int) -> Optional[ProductRecord]:
+        product_stmt = (
+            select(Product.id, Product.name, Product.quantity, Product.price, Category.name.label("category"),
+                   Product.updated_at, Category.updated_at.label("category_updated_at"))
+            .join(Category, Category.id == Product.category_id)
+            .where(condition)
+        )
+        row = db.session.execute(product_stmt).one_or_none()
+        if not row:
+            return None
+
+        updated_at = max(filter(None, (row.updated_at, row.category_updated_at)), default=None)
+        record = ProductRecord(row.id, row.name, row.quantity, row.price, row.category, updated_at)
+        with self._lock:
+            if generation == self._generation:
+                self._records[record.id] = record
+                self._ids_by_name[record.name] = record.id
+        return record
+
+    def invalidate(self, product_ids: Iterable[int]) -> None:
+        """
+        Drops the records of changed products.
+        """
+        with self._lock:
+            self._generation += 1
+            for product_id in product_ids:
+                self._records.pop(product_id, None)
+
+    def clear(self) -> None:
+        """
+        Drops all the records (e.g. after a category rename, which changes many products).
+        """
+        with self._lock:
+            self._generation += 1
+            self._records.clear()
+            self._ids_by_name.clear()
+
+
+# using a singleton so all requests of this worker share the same cache.
+@lru_cache(maxsize=1)
+def get_product_cache() -> ProductCache:
+    return ProductCache(PRODUCT_CACHE_MAX_ENTRIES, PRODUCT_CACHE_TTL_SECONDS)
+
+
+def get_product_details(product_id: int) -> ProductRecord:
+    """
+    Retrieve the details of a product by its ID, through the product cache.
+
+    Args:
+        product_id: The ID of the product.
+
+    Raises:
+        ValueError: If no product with the given ID exists.
+
+    Returns:
+        ProductRecord: The product's id, name, quantity, price and category name.
+    """
+    record = get_product_cache().get_by_id(product_id)
+    if not record:
+        raise ValueError(f"product with id {product_id} wasn't found.")
+    return record
+
+
+def get_product_details_by_name(product_name: str) -> ProductRecord:
+    """
+    Retrieve the details of a product by its name, through the product cache.
+
+    Args:
+        product_name: The name of the product.
+
+    Raises:
+        ValueError: If no product with the given name exists.
+
+    Returns:
+        ProductRecord: The product's id, name, quantity, price and category name.
+    """
+    record = get_product_cache().get_by_name(product_name)
+    if not record:
+        raise ValueError(f"product with name {product_name} wasn't found.")
+    return record
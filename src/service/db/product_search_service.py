@@ -0,0 +1,117 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from sqlalchemy import select, func, or_, text
+
+from config import PRODUCT_SEARCH_MIN_SIMILARITY, PRODUCT_SEARCH_MAX_LIMIT
+from database import get_db_connection
+from models.product import Product
+from schemas.product import ProductSearchResult
+from utils.search_index import NgramIndex
+
+db = get_db_connection()
+
+PRODUCT_NAME_TRIGRAM_INDEX = "ix_products_name_trgm"
+PRODUCT_SEARCH_INDEX_BATCH_SIZE = 10000
+
+
+def _uses_pg_trgm() -> bool:
+    return db.engine.dialect.name == "postgresql"
+
+
+def create_product_search_index() -> None:
+    """
+    Creates the trigram index used by product search on postgres (pg_trgm GIN index on products.name,
+    which serves both the similarity operator and prefix ILIKE). Other databases use the in-memory index.
+    """
+    if not _uses_pg_trgm():
+        return
+    with db.engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text(f"CREATE INDEX IF NOT EXISTS {PRODUCT_NAME_TRIGRAM_INDEX} "
+                                f"ON products USING gin (name gin_trgm_ops)"))
+
+
+class ProductSearchIndex:
+    """
+    In-memory product name index of this worker, for databases without pg_trgm.
+
+    Built from the products table on first use and kept in sync by the product service
+    (`add_product_to_db`, `update_product`, `remove_product`); changes made in bulk only
+    invalidate it, and it is rebuilt on the next search.
+    """
+
+    def __init__(self):
+        self._index: Optional[NgramIndex] = None
+
+    def _get_index(self) -> NgramIndex:
+        index = self._index
+        if index is None:
+            index = NgramIndex()
+            names_stmt = select(Product.id, Product.name).execution_options(yield_per=PRODUCT_SEARCH_INDEX_BATCH_SIZE)
+            index.build(db.session.execute(names_stmt))
+            self._index = index
+        return index
+
+    def add(self, product_id: int, name: str) -> None:
+        """Indexes a new product, or the new name of a renamed one."""
+        if self._index is not None:
+            self._index.add(product_id, name)
+
+    def remove(self, product_id: int) -> None:
+        """Removes a deleted product from the index."""
+        if self._index is not None:
+            self._index.remove(product_id)
+
+    def invalidate(self) -> None:
+        """Drops the index, it is rebuilt from the products table on the next search."""
+        self._index = None
+
+    def search(self, query: str, limit: int) -> List[ProductSearchResult]:
+        """Finds the products matching a search text, see `search_products`."""
+        return [ProductSearchResult(**match._asdict())
+                for match in self._get_index().search(query, limit, PRODUCT_SEARCH_MIN_SIMILARITY)]
+
+
+# using a singleton so all requests of this worker share the same index.
+@lru_cache(maxsize=1)
+def get_product_search_index() -> ProductSearchIndex:
+    return ProductSearchIndex()
+
+
+def search_products(query: str, limit: int) -> List[ProductSearchResult]:
+    """
+    Search products by name: names starting with the query (case insensitive) first, then names similar
+    to it (trigram similarity, tolerates typos), best matches first.
+
+    On postgres the search runs in the database with the pg_trgm index, otherwise in the in-memory index.
+
+    Args:
+        query: The search text.
+        limit: The maximum number of matches, between 1 and PRODUCT_SEARCH_MAX_LIMIT.
+
+    Raises:
+        ValueError: If the query is empty or the limit is invalid.
+
+    Returns:
+        List[ProductSearchResult]: The matching products, best first.
+    """
+    query = (query or "").strip()
+    if not query:
+        raise ValueError("missing search text.")
+    if not 1 <= limit <= PRODUCT_SEARCH_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {PRODUCT_SEARCH_MAX_LIMIT}.")
+
+    if not _uses_pg_trgm():
+        return get_product_search_index().search(query, limit)
+
+    escaped_query = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    prefix_match = Product.name.ilike(f"{escaped_query}%", escape="\\")
+    score = func.similarity(Product.name, query)
+    search_stmt = (
+        select(Product.id, Product.name, score.label("score"), prefix_match.label("prefix_match"))
+        .where(or_(prefix_match, Product.name.op("%")(query)))
+        .order_by(prefix_match.desc(), score.desc(), Product.name)
+        .limit(limit)
+    )
+    return [ProductSearchResult(**row._asdict()) for row in db.session.execute(search_stmt)]
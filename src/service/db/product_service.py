@@ -1,12 +1,24 @@
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import pandas as pd
+from pydantic import ValidationError
+from sqlalchemy import select, update, case, or_, and_
+from sqlalchemy.engine import Row
+from sqlalchemy.exc import SQLAlchemyError
 
+from config import PRODUCTS_UPSERT_BATCH_SIZE, PRODUCTS_UPSERT_MAX_ROWS
 from database import get_db_connection
 from models.category import Category
 
 from models.product import Product
-from schemas.product import UpdateProduct
+from schemas.product import UpdateProduct, CatalogProduct, UpsertProduct, ProductUpsertResult
+from service.db.product_cache_service import get_product_cache
+from service.db.product_search_service import get_product_search_index
+from service.db.sales_rollup_service import move_product_category_sales
+from service.statistics_cache import invalidate_statistics_cache
+from utils.db_utils import upsert_insert
+from utils.pagination import encode_cursor, decode_cursor
 
 db = get_db_connection()
 
@@ -32,6 +44,149 @@ def get_product_by_name(product_name: str) -> Product:
     return product
 
 
+def get_products_by_ids(product_ids: Iterable[int]) -> Dict[int, Row]:
+    """
+    Retrieve the id, name and price of several products with a single query.
+
+    Args:
+        product_ids: The IDs of the products to find.
+
+    Returns:
+        Dict[int, Row]: Mapping of product id to a row with id, name and price.
+                        Products that don't exist are missing from the mapping.
+    """
+    product_ids = set(product_ids)
+    if not product_ids:
+        return {}
+
+    get_products_stmt = select(Product.id, Product.name, Product.price).where(Product.id.in_(product_ids))
+    return {row.id: row for row in db.session.execute(get_products_stmt)}
+
+
+CATALOG_SORTS = {
+    "id": (Product.id, False),
+    "price": (Product.price, False),
+    "-price": (Product.price, True),
+    "name": (Product.name, False),
+    "-name": (Product.name, True),
+}
+
+
+def list_products(limit: int, cursor: Optional[str] = None, category: Optional[str] = None,
+                  min_price: Optional[float] = None, max_price: Optional[float] = None,
+                  in_stock: Optional[bool] = None, sort: str = "id") -> Tuple[List[CatalogProduct], Optional[str]]:
+    """
+    Retrieve a page of the product catalog.
+
+    The products are paginated with a keyset on (sort column, id), served by the composite indexes on
+    products, and read as a column projection joined to the category name (no ORM objects are loaded).
+
+    Args:
+        limit: The maximum number of products in the page.
+        cursor: The cursor returned with the previous page, None for the first page.
+        category: Only products of this category.
+        min_price: Only products priced at least this.
+        max_price: Only products priced at most this.
+        in_stock: True for products in stock only, False for out of stock products only.
+        sort: One of CATALOG_SORTS ("id", "price", "-price", "name", "-name"), "-" for descending.
+
+    Returns:
+        Tuple[List[CatalogProduct], Optional[str]]: The products and the cursor of the next page,
+                                                    or None if this is the last page.
+
+    Raises:
+        ValueError: If the sort or the cursor is invalid.
+    """
+    if sort not in CATALOG_SORTS:
+        raise ValueError(f"invalid 'sort' parameter, expected one of {list(CATALOG_SORTS)}.")
+    sort_column, descending = CATALOG_SORTS[sort]
+
+    catalog_stmt = (
+        select(Product.id, Product.name, Product.quantity, Product.price, Category.name.label("category"),
+               sort_column.label("sort_value"))
+        .join(Category, Category.id == Product.category_id)
+    )
+    if category:
+        catalog_stmt = catalog_stmt.where(Category.name == category)
+    if min_price is not None:
+        catalog_stmt = catalog_stmt.where(Product.price >= min_price)
+    if max_price is not None:
+        catalog_stmt = catalog_stmt.where(Product.price <= max_price)
+    if in_stock is not None:
+        catalog_stmt = catalog_stmt.where(Product.quantity > 0 if in_stock else Product.quantity <= 0)
+
+    last_seen = decode_cursor(cursor, 2)
+    if last_seen:
+        last_value, last_id = last_seen
+        if not isinstance(last_id, int) or isinstance(last_value, (list, dict)):
+            raise ValueError("invalid cursor.")
+        if descending:
+            catalog_stmt = catalog_stmt.where(or_(sort_column < last_value,
+                                                  and_(sort_column == last_value, Product.id < last_id)))
+        else:
+            catalog_stmt = catalog_stmt.where(or_(sort_column > last_value,
+                                                  and_(sort_column == last_value, Product.id > last_id)))
+
+    if descending:
+        catalog_stmt = catalog_stmt.order_by(sort_column.desc(), Product.id.desc())
+    else:
+        catalog_stmt = catalog_stmt.order_by(sort_column, Product.id)
+
+    rows = db.session.execute(catalog_stmt.limit(limit + 1)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].sort_value, rows[-1].id])
+
+    products = [CatalogProduct(id=row.id, name=row.name, quantity=row.quantity, category=row.category,
+                               price=row.price) for row in rows]
+    return products, next_cursor
+
+
+def decrement_product_quantities(quantities: Dict[int, int]) -> None:
+    """
+    Decrements the stock of several products with a single conditional UPDATE statement.
+
+    Every row is updated with `quantity = quantity - n` only if `quantity >= n`, so concurrent
+    executions can't oversell. The transaction is not committed here, and if any product is
+    short on stock the caller must roll back (other rows of the statement may have been updated).
+
+    Args:
+        quantities: Mapping of product id to the quantity to deduct.
+
+    Raises:
+        ValueError: If a product doesn't exist or doesn't have enough stock.
+    """
+    if not quantities:
+        return
+
+    requested_quantity = case(quantities, value=Product.id)
+    decrement_stmt = (
+        update(Product)
+        .where(Product.id.in_(quantities.keys()), Product.quantity >= requested_quantity)
+        .values(quantity=Product.quantity - requested_quantity)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    )
+    decremented_ids = set(db.session.execute(decrement_stmt).scalars())
+    if len(decremented_ids) == len(quantities):
+        return
+
+    # only on the failure path: find which product is short to build a useful error message, from the stock
+    # before this statement (the rows it already decremented get their quantity added back).
+    get_stock_stmt = select(Product.id, Product.name, Product.quantity).where(Product.id.in_(quantities.keys()))
+    stock = {row.id: row for row in db.session.execute(get_stock_stmt)}
+    for product_id, quantity in quantities.items():
+        product = stock.get(product_id)
+        if not product:
+            raise ValueError(f"cant execute order, product with id {product_id} doesn't exist.")
+        stock_before = product.quantity + (quantity if product_id in decremented_ids else 0)
+        if stock_before < quantity:
+            raise ValueError(f"cant execute order, asked for {quantity} of {product.name} but storage has less.")
+
+    raise ValueError("cant execute order, storage has changed during execution.")
+
+
 def parse_products_df_to_db(df: pd.DataFrame) -> None:
     """
     Add or update products in the database from a cleaned DataFrame.
@@ -53,6 +208,7 @@ def parse_products_df_to_db(df: pd.DataFrame) -> None:
             print(f"error while inserting product to db: {str(e)}")
 
     db.session.commit()
+    get_product_search_index().invalidate()
 
 
 def add_product_to_db(name: str, quantity: int, category_name: str, price: int, commit: bool = True) -> Product:
@@ -93,10 +249,149 @@ def add_product_to_db(name: str, quantity: int, category_name: str, price: int,
 
     if commit:
         db.session.commit()
+        get_product_search_index().add(new_product.id, new_product.name)
 
     return new_product
 
 
+def _get_or_create_category_ids(category_names: Iterable[str]) -> Dict[str, int]:
+    """
+    Returns the IDs of categories by name, inserting the missing ones. Doesn't commit.
+    """
+    category_names = set(category_names)
+    if not category_names:
+        return {}
+
+    now = datetime.utcnow()
+    db.session.execute(
+        upsert_insert(Category)
+        .values([{"name": name, "created_at": now, "updated_at": now} for name in category_names])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    category_ids_stmt = select(Category.name, Category.id).where(Category.name.in_(category_names))
+    return dict(db.session.execute(category_ids_stmt).all())
+
+
+def _validation_error_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, detail['loc']))}: {detail['msg']}" for detail in error.errors())
+
+
+def upsert_products(rows: List[Any]) -> List[ProductUpsertResult]:
+    """
+    Inserts new products and updates existing ones (matched by name) in one transaction.
+
+    Rows are validated first, invalid rows are reported and skipped, and when several rows have the same name
+    the last one is applied. Categories are resolved (and missing ones created) once for all the rows. Products
+    are then written in batches of PRODUCTS_UPSERT_BATCH_SIZE with `INSERT ... ON CONFLICT (name) DO UPDATE`,
+    which only rewrites products whose quantity, price or category changed. The sales of re-categorized
+    products are moved to their new category, like in `update_product`.
+
+    Args:
+        rows: The products, dicts with name, quantity, category and price.
+
+    Raises:
+        ValueError: If there are more than PRODUCTS_UPSERT_MAX_ROWS rows.
+
+    Returns:
+        List[ProductUpsertResult]: The outcome of every row, in the rows order.
+    """
+    if len(rows) > PRODUCTS_UPSERT_MAX_ROWS:
+        raise ValueError(f"at most {PRODUCTS_UPSERT_MAX_ROWS} products can be upserted at once.")
+
+    results: List[Optional[ProductUpsertResult]] = [None] * len(rows)
+    products_by_name: Dict[str, Tuple[int, UpsertProduct]] = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = ProductUpsertResult(row=index, status="invalid", error="row must be an object.")
+            continue
+        try:
+            product = UpsertProduct(**row)
+        except ValidationError as e:
+            name = row.get("name") if isinstance(row.get("name"), str) else None
+            results[index] = ProductUpsertResult(row=index, name=name, status="invalid",
+                                                 error=_validation_error_message(e))
+            continue
+
+        previous = products_by_name.get(product.name)
+        if previous:
+            results[previous[0]] = ProductUpsertResult(row=previous[0], name=product.name, status="duplicate",
+                                                       error=f"replaced by row {index}.")
+        products_by_name[product.name] = (index, product)
+
+    try:
+        category_ids = _get_or_create_category_ids(product.category for _, product in products_by_name.values())
+        now = datetime.utcnow()
+        # sorted by name, so concurrent upserts lock the same products in the same order
+        entries = [products_by_name[name] for name in sorted(products_by_name)]
+        inserted_ids, updated_ids = [], []
+        categories_changed = False
+
+        insert_stmt = upsert_insert(Product.__table__)
+        excluded = insert_stmt.excluded
+        # updated_at is set explicitly, the column's onupdate doesn't apply to ON CONFLICT DO UPDATE.
+        # unchanged products aren't rewritten, they aren't returned either.
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=["name"],
+            set_={"quantity": excluded.quantity, "price": excluded.price, "category_id": excluded.category_id,
+                  "updated_at": excluded.updated_at},
+            where=or_(Product.quantity != excluded.quantity, Product.price != excluded.price,
+                      Product.category_id != excluded.category_id)
+        ).returning(Product.name, Product.id)
+
+        for batch_start in range(0, len(entries), PRODUCTS_UPSERT_BATCH_SIZE):
+            batch = entries[batch_start:batch_start + PRODUCTS_UPSERT_BATCH_SIZE]
+
+            existing_products_stmt = (
+                select(Product.name, Product.id, Product.category_id)
+                .where(Product.name.in_([product.name for _, product in batch]))
+                .order_by(Product.name)
+                .with_for_update()
+            )
+            existing_products = {row.name: row for row in db.session.execute(existing_products_stmt)}
+
+            product_rows = [
+                {"name": product.name, "quantity": product.quantity, "price": product.price,
+                 "category_id": category_ids[product.category], "created_at": now, "updated_at": now}
+                for _, product in batch
+            ]
+            # executemany of one cached statement, sent as multi-row inserts by the driver ("insertmanyvalues")
+            written_ids = dict(db.session.execute(upsert_stmt, product_rows).all())
+
+            for index, product in batch:
+                existing_product = existing_products.get(product.name)
+                if product.name not in written_ids:
+                    results[index] = ProductUpsertResult(row=index, name=product.name, status="unchanged",
+                                                         id=existing_product.id if existing_product else None)
+                    continue
+
+                product_id = written_ids[product.name]
+                if not existing_product:
+                    inserted_ids.append(product_id)
+                    results[index] = ProductUpsertResult(row=index, name=product.name, status="inserted",
+                                                         id=product_id)
+                    continue
+
+                updated_ids.append(product_id)
+                results[index] = ProductUpsertResult(row=index, name=product.name, status="updated", id=product_id)
+                new_category_id = category_ids[product.category]
+                if existing_product.category_id != new_category_id:
+                    move_product_category_sales(product_id, existing_product.category_id, new_category_id)
+                    categories_changed = True
+
+        db.session.commit()
+    except SQLAlchemyError:
+        db.session.rollback()
+        raise
+
+    get_product_cache().invalidate(updated_ids)
+    if categories_changed:
+        invalidate_statistics_cache()
+    if inserted_ids:
+        get_product_search_index().invalidate()
+
+    return results
+
+
 def remove_product(product_id: int, commit: bool = True) -> None:
     """
     Remove a product by its ID.
@@ -119,6 +414,9 @@ def remove_product(product_id: int, commit: bool = True) -> None:
 
     if commit:
         db.session.commit()
+        invalidate_statistics_cache()
+        get_product_cache().invalidate([product_id])
+        get_product_search_index().remove(product_id)
 
 
 def update_product(new_product_details: UpdateProduct) -> Product:
@@ -159,10 +457,16 @@ def update_product(new_product_details: UpdateProduct) -> Product:
             category = Category(name=new_product_details.category)
             db.session.add(category)
             db.session.flush()
+        move_product_category_sales(product.id, product.category_id, category.id)
         product.category_id = category.id
 
     product.updated_at = datetime.utcnow()
     db.session.commit()
+    get_product_cache().invalidate([product.id])
+    if new_product_details.name or new_product_details.category:
+        invalidate_statistics_cache()
+    if new_product_details.name:
+        get_product_search_index().add(product.id, product.name)
     return product
 
 
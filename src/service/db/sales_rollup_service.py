@@ -0,0 +1,230 @@
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, delete, func, literal_column, String
+from sqlalchemy.sql import Select
+
+from database import get_db_connection
+from models.order import Order, OrderItem
+from models.product import Product
+from models.sales_bucket import ProductSalesBucket, CategorySalesBucket, SALES_BUCKET_GRANULARITIES
+from models.sales_rollup import ProductSalesRollup, CategorySalesRollup, LocationSalesRollup
+from service.statistics_cache import invalidate_statistics_cache
+from utils.db_utils import upsert_insert, truncate_datetime
+
+db = get_db_connection()
+
+SALES_COLUMNS = ("quantity_sold", "revenue")
+LOCATION_SALES_COLUMNS = ("orders_count", "quantity_sold", "revenue")
+
+
+def _product_sales_select(order_ids: Optional[List[int]] = None, sign: int = 1) -> Select:
+    """
+    Builds the per product sales aggregation of executed orders (optionally only of the given orders).
+    """
+    product_sales_stmt = (
+        select(OrderItem.product_id,
+               (func.sum(OrderItem.quantity) * sign).label("quantity_sold"),
+               (func.sum(OrderItem.quantity * OrderItem.unit_price) * sign).label("revenue"))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.executed.is_(True))
+        .group_by(OrderItem.product_id)
+    )
+    if order_ids is not None:
+        product_sales_stmt = product_sales_stmt.where(Order.id.in_(order_ids))
+    return product_sales_stmt
+
+
+def _category_sales_select(order_ids: Optional[List[int]] = None, sign: int = 1) -> Select:
+    """
+    Builds the per category sales aggregation of executed orders (optionally only of the given orders).
+    """
+    category_sales_stmt = (
+        select(Product.category_id,
+               (func.sum(OrderItem.quantity) * sign).label("quantity_sold"),
+               (func.sum(OrderItem.quantity * OrderItem.unit_price) * sign).label("revenue"))
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.executed.is_(True))
+        .group_by(Product.category_id)
+    )
+    if order_ids is not None:
+        category_sales_stmt = category_sales_stmt.where(Order.id.in_(order_ids))
+    return category_sales_stmt
+
+
+def _location_sales_select(order_ids: Optional[List[int]] = None, sign: int = 1) -> Select:
+    """
+    Builds the per location sales aggregation of executed orders (optionally only of the given orders).
+    """
+    location_sales_stmt = (
+        select(Order.location,
+               (func.count(Order.id) * sign).label("orders_count"),
+               (func.sum(Order.total_quantity) * sign).label("quantity_sold"),
+               (func.sum(Order.total_price) * sign).label("revenue"))
+        .where(Order.executed.is_(True))
+        .group_by(Order.location)
+    )
+    if order_ids is not None:
+        location_sales_stmt = location_sales_stmt.where(Order.id.in_(order_ids))
+    return location_sales_stmt
+
+
+def _bucket_sales_select(granularity: str, group_column):
+    """
+    Creates a builder of the per time bucket sales aggregation of executed orders, grouped by
+    `group_column` (the product id or the product's category id).
+    """
+
+    def build_select(order_ids: Optional[List[int]] = None, sign: int = 1) -> Select:
+        # orders executed before executed_at existed fall back to their last update time
+        bucket_start = truncate_datetime(func.coalesce(Order.executed_at, Order.updated_at), granularity)
+        bucket_sales_stmt = (
+            select(literal_column(f"'{granularity}'", String).label("granularity"),
+                   bucket_start.label("bucket_start"),
+                   group_column,
+                   (func.sum(OrderItem.quantity) * sign).label("quantity_sold"),
+                   (func.sum(OrderItem.quantity * OrderItem.unit_price) * sign).label("revenue"))
+            .select_from(OrderItem)
+            .join(Order, Order.id == OrderItem.order_id)
+            .join(Product, Product.id == OrderItem.product_id)
+            .where(Order.executed.is_(True))
+            .group_by(bucket_start, group_column)
+        )
+        if order_ids is not None:
+            bucket_sales_stmt = bucket_sales_stmt.where(Order.id.in_(order_ids))
+        return bucket_sales_stmt
+
+    return build_select
+
+
+def _rollup_sources() -> List[Tuple]:
+    """
+    Lists every rollup table with its key columns, value columns, aggregation builder and the filter
+    selecting the table rows that the aggregation produces.
+    """
+    sources = [
+        (ProductSalesRollup, ("product_id",), SALES_COLUMNS, _product_sales_select, []),
+        (CategorySalesRollup, ("category_id",), SALES_COLUMNS, _category_sales_select, []),
+        (LocationSalesRollup, ("location",), LOCATION_SALES_COLUMNS, _location_sales_select, []),
+    ]
+    for granularity in SALES_BUCKET_GRANULARITIES:
+        sources.append((ProductSalesBucket, ("granularity", "bucket_start", "product_id"), SALES_COLUMNS,
+                        _bucket_sales_select(granularity, OrderItem.product_id),
+                        [ProductSalesBucket.granularity == granularity]))
+        sources.append((CategorySalesBucket, ("granularity", "bucket_start", "category_id"), SALES_COLUMNS,
+                        _bucket_sales_select(granularity, Product.category_id),
+                        [CategorySalesBucket.granularity == granularity]))
+    return sources
+
+
+def _add_to_rollup(model, key_columns: Tuple[str, ...], value_columns: Tuple[str, ...], sales_select: Select) -> None:
+    """
+    Adds the rows of an aggregation to a rollup table with a single INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+    """
+    insert_stmt = upsert_insert(model).from_select([*key_columns, *value_columns], sales_select)
+    set_values = {column: getattr(model, column) + insert_stmt.excluded[column] for column in value_columns}
+    set_values["updated_at"] = datetime.utcnow()
+    db.session.execute(insert_stmt.on_conflict_do_update(index_elements=list(key_columns), set_=set_values))
+
+
+def record_executed_orders(order_ids: List[int]) -> None:
+    """
+    Adds the sales of newly executed orders to the rollup and time bucket tables.
+
+    Must run in the transaction that marks the orders as executed (after marking them), it doesn't commit.
+
+    Args:
+        order_ids: The IDs of the orders that were just executed.
+    """
+    if not order_ids:
+        return
+    for model, key_columns, value_columns, sales_select, _ in _rollup_sources():
+        _add_to_rollup(model, key_columns, value_columns, sales_select(order_ids))
+
+
+def remove_executed_orders(order_ids: List[int]) -> None:
+    """
+    Subtracts the sales of executed orders that are about to be deleted from the rollup and time bucket tables.
+
+    Must run in the transaction that deletes the orders (before deleting them), it doesn't commit.
+
+    Args:
+        order_ids: The IDs of the orders to be deleted (orders that aren't executed are ignored).
+    """
+    if not order_ids:
+        return
+    for model, key_columns, value_columns, sales_select, _ in _rollup_sources():
+        _add_to_rollup(model, key_columns, value_columns, sales_select(order_ids, sign=-1))
+
+
+def move_product_category_sales(product_id: int, old_category_id: int, new_category_id: int) -> None:
+    """
+    Moves the sales of a product from its old category to its new one (rollup and time buckets),
+    when it is re-categorized.
+
+    Doesn't commit, must run in the transaction that changes the product's category.
+
+    Args:
+        product_id: The ID of the re-categorized product.
+        old_category_id: The ID of the product's previous category.
+        new_category_id: The ID of the product's new category.
+    """
+    if old_category_id == new_category_id:
+        return
+
+    for category_id, sign in ((old_category_id, -1), (new_category_id, 1)):
+        _add_to_rollup(CategorySalesRollup, ("category_id",), SALES_COLUMNS, select(
+            literal_column(str(category_id)).label("category_id"),
+            ProductSalesRollup.quantity_sold * sign,
+            ProductSalesRollup.revenue * sign
+        ).where(ProductSalesRollup.product_id == product_id))
+
+        _add_to_rollup(CategorySalesBucket, ("granularity", "bucket_start", "category_id"), SALES_COLUMNS, select(
+            ProductSalesBucket.granularity,
+            ProductSalesBucket.bucket_start,
+            literal_column(str(category_id)).label("category_id"),
+            ProductSalesBucket.quantity_sold * sign,
+            ProductSalesBucket.revenue * sign
+        ).where(ProductSalesBucket.product_id == product_id))
+
+
+def rebuild_sales_rollups() -> None:
+    """
+    Recomputes all the rollup and time bucket tables from order_item and the executed orders,
+    in one transaction.
+    """
+    for model, key_columns, value_columns, sales_select, rows_filter in _rollup_sources():
+        db.session.execute(delete(model).where(*rows_filter))
+        db.session.execute(model.__table__.insert().from_select([*key_columns, *value_columns], sales_select()))
+    db.session.commit()
+    invalidate_statistics_cache()
+
+
+def check_sales_rollups() -> List[str]:
+    """
+    Compares the rollup and time bucket tables with the sales recomputed from order_item.
+
+    Returns:
+        List[str]: A description of every mismatching row, empty if the rollups are consistent.
+    """
+    mismatches = []
+    for model, key_columns, value_columns, sales_select, rows_filter in _rollup_sources():
+        expected_stmt = sales_select()
+        rollup_stmt = select(*[getattr(model, column) for column in (*key_columns, *value_columns)]).where(*rows_filter)
+
+        key_size = len(key_columns)
+        expected = {tuple(row[:key_size]): tuple(row[key_size:]) for row in db.session.execute(expected_stmt)}
+        actual = {tuple(row[:key_size]): tuple(row[key_size:]) for row in db.session.execute(rollup_stmt)}
+
+        for key in expected.keys() | actual.keys():
+            expected_values = expected.get(key, (0,) * len(value_columns))
+            actual_values = actual.get(key, (0,) * len(value_columns))
+            if any(abs(expected_value - actual_value) > 1e-6
+                   for expected_value, actual_value in zip(expected_values, actual_values)):
+                mismatches.append(f"{model.__tablename__} {dict(zip(key_columns, key))}: "
+                                  f"expected {dict(zip(value_columns, expected_values))}, "
+                                  f"found {dict(zip(value_columns, actual_values))}")
+
+    return mismatches
@@ -1,91 +1,232 @@
-
+from datetime import datetime
 from typing import List
 
+from models.sales_bucket import ProductSalesBucket, CategorySalesBucket, SALES_BUCKET_GRANULARITIES
+from models.sales_rollup import ProductSalesRollup, CategorySalesRollup, LocationSalesRollup
 from models.order import Order, OrderItem
 from models.product import Product
 from models.category import Category
-from schemas.statistics import ProductSalesPercentage, CategoryProductSales, ProductSalesInCategory
-from sqlalchemy.orm import joinedload
+from repository.countries import get_country_catalog
+from schemas.statistics import ProductSalesPercentage, CategoryProductSales, ProductSalesInCategory, \
+    SalesOverTime, SalesTotalInfo, SalesBucketInfo, LocationSalesInfo, LocationSalesDetails, LocationProductSales
+from sqlalchemy import select, func
+from sqlalchemy.sql import Select
+from config import TOP_PRODUCTS_MAX_K
 from database import get_db_connection
-from collections import defaultdict
+from service.statistics_cache import cached_statistics
+from utils.db_utils import truncate_datetime_value
 
 db = get_db_connection()
 
 
+@cached_statistics
 def calculate_product_sales_percentage() -> List[ProductSalesPercentage]:
     """
     Calculate the overall percentage of total sales for each product across all executed orders.
 
+    Read from the per product sales rollup (one small row per sold product), the overall total
+    comes from a window over the rollup rows. Served from the statistics cache.
+
     Returns:
         List[ProductSalesPercentage]: A list of products with their total quantity sold
         and the percentage they represent from the overall sold items.
     """
-    executed_orders = Order.query.options(joinedload(Order.items)).filter_by(executed=True).all()
-
-    product_sales = defaultdict(int)
-    total_quantity = 0
-
-    for order in executed_orders:
-        for item in order.items:
-            product_sales[item.product_id] += item.quantity
-            total_quantity += item.quantity
+    product_sales_stmt = (
+        select(Product.id, Product.name, ProductSalesRollup.quantity_sold,
+               func.sum(ProductSalesRollup.quantity_sold).over().label("total_quantity"))
+        .join(Product, Product.id == ProductSalesRollup.product_id)
+        .where(ProductSalesRollup.quantity_sold > 0)
+        .order_by(Product.id)
+    )
 
     results = []
-    for product_id, qty in product_sales.items():
-        product = Product.query.get(product_id)
-        percentage = (qty / total_quantity * 100) if total_quantity > 0 else 0
+    for row in db.session.execute(product_sales_stmt):
+        percentage = (row.quantity_sold / row.total_quantity * 100) if row.total_quantity > 0 else 0
         results.append(ProductSalesPercentage(
-            product_id=product.id,
-            product_name=product.name,
-            total_quantity_sold=qty,
+            product_id=row.id,
+            product_name=row.name,
+            total_quantity_sold=row.quantity_sold,
             sales_percentage=round(percentage, 2)
         ))
 
     return results
 
 
+@cached_statistics
 def calculate_category_product_sales() -> List[CategoryProductSales]:
     """
     Calculate the sales statistics per category, showing how much each product
     contributes to its own category's total sales.
 
+    Read from the per product and per category sales rollups joined to products and categories.
+    Served from the statistics cache.
+
     Returns:
         List[CategoryProductSales]: A list where each entry contains a category,
         its total quantity sold, and the list of products with their quantity
         and percentage within that category.
     """
-    executed_orders = Order.query.options(joinedload(Order.items)).filter_by(executed=True).all()
-
-    category_sales = defaultdict(lambda: defaultdict(int))
-    product_info = {}
-
-    for order in executed_orders:
-        for item in order.items:
-            product = Product.query.get(item.product_id)
-            product_info[product.id] = product
-            category_sales[product.category_id][product.id] += item.quantity
+    category_sales_stmt = (
+        select(Category.id.label("category_id"), Category.name.label("category_name"),
+               Product.id.label("product_id"), Product.name.label("product_name"),
+               ProductSalesRollup.quantity_sold,
+               CategorySalesRollup.quantity_sold.label("category_quantity"))
+        .select_from(ProductSalesRollup)
+        .join(Product, Product.id == ProductSalesRollup.product_id)
+        .join(Category, Category.id == Product.category_id)
+        .join(CategorySalesRollup, CategorySalesRollup.category_id == Category.id)
+        .where(ProductSalesRollup.quantity_sold > 0)
+        .order_by(Category.id, Product.id)
+    )
 
     category_results = []
-    for category_id, products in category_sales.items():
-        category = Category.query.get(category_id)
-        total_category_qty = sum(products.values())
-
-        product_data = []
-        for pid, qty in products.items():
-            product = product_info[pid]
-            percentage = (qty / total_category_qty * 100) if total_category_qty > 0 else 0
-            product_data.append(ProductSalesInCategory(
-                product_id=product.id,
-                product_name=product.name,
-                quantity_sold=qty,
-                sales_percentage_within_category=round(percentage, 2)
+    for row in db.session.execute(category_sales_stmt):
+        if not category_results or category_results[-1].category_id != row.category_id:
+            category_results.append(CategoryProductSales(
+                category_id=row.category_id,
+                category_name=row.category_name,
+                total_category_quantity=row.category_quantity,
+                products=[]
             ))
 
-        category_results.append(CategoryProductSales(
-            category_id=category.id,
-            category_name=category.name,
-            total_category_quantity=total_category_qty,
-            products=product_data
+        percentage = (row.quantity_sold / row.category_quantity * 100) if row.category_quantity > 0 else 0
+        category_results[-1].products.append(ProductSalesInCategory(
+            product_id=row.product_id,
+            product_name=row.product_name,
+            quantity_sold=row.quantity_sold,
+            sales_percentage_within_category=round(percentage, 2)
         ))
 
     return category_results
+
+
+def calculate_sales_over_time(group_by: str, granularity: str, start: datetime, end: datetime) -> SalesOverTime:
+    """
+    Calculate the sales of every product or category over a time range, by summing the hourly or
+    daily sales buckets maintained when orders execute (executed orders are never scanned).
+
+    Args:
+        group_by: 'product' or 'category'.
+        granularity: 'hour' or 'day'.
+        start: Start of the range (inclusive), truncated to the start of its bucket.
+        end: End of the range (exclusive).
+
+    Raises:
+        ValueError: If group_by or granularity are invalid, or the range is empty.
+
+    Returns:
+        SalesOverTime: The per bucket sales and the totals over the range.
+    """
+    if granularity not in SALES_BUCKET_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {list(SALES_BUCKET_GRANULARITIES)}.")
+    if group_by == "product":
+        bucket, entity, entity_id = ProductSalesBucket, Product, ProductSalesBucket.product_id
+    elif group_by == "category":
+        bucket, entity, entity_id = CategorySalesBucket, Category, CategorySalesBucket.category_id
+    else:
+        raise ValueError("group_by must be 'product' or 'category'.")
+
+    start = truncate_datetime_value(start, granularity)
+    if start >= end:
+        raise ValueError("the 'from' date must be before the 'to' date.")
+
+    bucket_filter = (
+        bucket.granularity == granularity,
+        bucket.bucket_start >= start,
+        bucket.bucket_start < end,
+        bucket.quantity_sold != 0
+    )
+    buckets_stmt = (
+        select(bucket.bucket_start, entity.id, entity.name, bucket.quantity_sold, bucket.revenue)
+        .join(entity, entity.id == entity_id)
+        .where(*bucket_filter)
+        .order_by(bucket.bucket_start, entity.id)
+    )
+    totals_stmt = (
+        select(entity.id, entity.name,
+               func.sum(bucket.quantity_sold).label("quantity_sold"), func.sum(bucket.revenue).label("revenue"))
+        .join(entity, entity.id == entity_id)
+        .where(*bucket_filter)
+        .group_by(entity.id, entity.name)
+        .order_by(entity.id)
+    )
+
+    return SalesOverTime(
+        group_by=group_by,
+        granularity=granularity,
+        start=start,
+        end=end,
+        totals=[SalesTotalInfo(**row._asdict()) for row in db.session.execute(totals_stmt)],
+        buckets=[SalesBucketInfo(**row._asdict()) for row in db.session.execute(buckets_stmt)]
+    )
+
+
+def calculate_location_sales() -> List[LocationSalesInfo]:
+    """
+    Calculate the sales totals (order count, units, revenue) of every shipping country,
+    read from the per location sales rollup.
+
+    Returns:
+        List[LocationSalesInfo]: The totals of every country with executed orders, by revenue (highest first).
+    """
+    location_sales_stmt = (
+        select(LocationSalesRollup.location, LocationSalesRollup.orders_count,
+               LocationSalesRollup.quantity_sold, LocationSalesRollup.revenue)
+        .where(LocationSalesRollup.orders_count > 0)
+        .order_by(LocationSalesRollup.revenue.desc(), LocationSalesRollup.location)
+    )
+    return [LocationSalesInfo(**row._asdict()) for row in db.session.execute(location_sales_stmt)]
+
+
+def location_top_products_select(location: str, top: int) -> Select:
+    """
+    Builds the query of the best selling products of a country: the executed orders of the location are
+    found with the orders(location, executed) index and their items by the order_item primary key.
+    """
+    quantity_sold = func.sum(OrderItem.quantity).label("quantity_sold")
+    return (
+        select(Product.id.label("product_id"), Product.name.label("product_name"), quantity_sold,
+               func.sum(OrderItem.quantity * OrderItem.unit_price).label("revenue"))
+        .select_from(Order)
+        .join(OrderItem, OrderItem.order_id == Order.id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.location == location, Order.executed.is_(True))
+        .group_by(Product.id, Product.name)
+        .order_by(quantity_sold.desc(), Product.id)
+        .limit(top)
+    )
+
+
+def calculate_location_sales_details(location_name: str, top: int) -> LocationSalesDetails:
+    """
+    Calculate the sales totals of one shipping country and its best selling products.
+
+    Args:
+        location_name: The country name (any case / spacing accepted for orders).
+        top: Number of best selling products to return, between 1 and TOP_PRODUCTS_MAX_K.
+
+    Raises:
+        ValueError: If the country isn't one we ship to, or top is invalid.
+
+    Returns:
+        LocationSalesDetails: The country totals (from the location sales rollup) and its top products.
+    """
+    location = get_country_catalog().resolve(location_name)
+    if not location:
+        raise ValueError("we dont ship for this country or invalid country name.")
+    if not 1 <= top <= TOP_PRODUCTS_MAX_K:
+        raise ValueError(f"top must be between 1 and {TOP_PRODUCTS_MAX_K}.")
+
+    totals = db.session.execute(
+        select(LocationSalesRollup.orders_count, LocationSalesRollup.quantity_sold, LocationSalesRollup.revenue)
+        .where(LocationSalesRollup.location == location)
+    ).one_or_none()
+
+    return LocationSalesDetails(
+        location=location,
+        orders_count=totals.orders_count if totals else 0,
+        quantity_sold=totals.quantity_sold if totals else 0,
+        revenue=totals.revenue if totals else 0,
+        top_products=[LocationProductSales(**row._asdict())
+                      for row in db.session.execute(location_top_products_select(location, top))]
+    )
@@ -0,0 +1,47 @@
+from sqlalchemy import select
+
+from config import TOP_PRODUCTS_MAX_K
+from database import get_db_connection
+from models.product import Product
+from models.sales_rollup import ProductSalesRollup
+from schemas.statistics import TopProducts, TopProductInfo
+from service.statistics_cache import cached_statistics
+
+db = get_db_connection()
+
+
+@cached_statistics
+def get_top_products(k: int) -> TopProducts:
+    """
+    Returns the k best selling products of all executed orders.
+
+    Read from the product sales rollup (one row per product, kept up to date when orders execute) with
+    ORDER BY quantity_sold DESC, product_id LIMIT k, which walks the `ix_product_sales_rollup_quantity_sold`
+    index, so the cost depends on k and not on the catalog size or the number of orders.
+    Served from the statistics cache.
+
+    Args:
+        k: The number of products, between 1 and TOP_PRODUCTS_MAX_K.
+
+    Raises:
+        ValueError: If k is out of range.
+
+    Returns:
+        TopProducts: The best selling products, best first.
+    """
+    if not 1 <= k <= TOP_PRODUCTS_MAX_K:
+        raise ValueError(f"k must be between 1 and {TOP_PRODUCTS_MAX_K}.")
+
+    top_products_stmt = (
+        select(Product.id, Product.name, ProductSalesRollup.quantity_sold)
+        .join(Product, Product.id == ProductSalesRollup.product_id)
+        .where(ProductSalesRollup.quantity_sold > 0)
+        .order_by(ProductSalesRollup.quantity_sold.desc(), ProductSalesRollup.product_id)
+        .limit(k)
+    )
+    products = [
+        TopProductInfo(product_id=row.id, product_name=row.name, quantity_sold=row.quantity_sold,
+                       max_overestimate=0)
+        for row in db.session.execute(top_products_stmt)
+    ]
+    return TopProducts(k=k, exact=True, products=products)
@@ -0,0 +1,52 @@
+import threading
+from typing import List
+
+from flask import Flask
+
+from service.db.execution_job_service import run_execution_batch
+
+
+class ExecutionWorkerPool:
+    """
+    Pool of threads that drain the execution jobs queue.
+
+    Each worker claims up to `batch_size` queued jobs, executes their orders in one transaction,
+    and sleeps `poll_interval` seconds whenever the queue is empty. Because jobs are claimed with
+    SKIP LOCKED, several pools (e.g. in different processes) can drain the same queue.
+    """
+
+    def __init__(self, app: Flask, workers: int, batch_size: int, poll_interval: float):
+        self._app = app
+        self._workers = workers
+        self._batch_size = batch_size
+        self._poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        for worker_number in range(self._workers):
+            thread = threading.Thread(target=self._run, name=f"execution-worker-{worker_number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads.clear()
+
+    def join(self) -> None:
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                with self._app.app_context():
+                    processed_jobs = run_execution_batch(self._batch_size)
+            except Exception as e:
+                print(f"execution worker failed to process a batch: {str(e)}")
+                processed_jobs = 0
+
+            if not processed_jobs:
+                self._stop_event.wait(self._poll_interval)
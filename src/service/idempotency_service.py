@@ -0,0 +1,254 @@
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from cachetools import TTLCache
+from sqlalchemy import select, update, delete, or_, and_
+from werkzeug.exceptions import BadRequest, Conflict, UnprocessableEntity
+
+from config import IDEMPOTENCY_KEY_TTL_SECONDS, IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_USE_DATABASE, \
+    IDEMPOTENCY_PENDING_TIMEOUT_SECONDS
+from database import get_db_connection
+from models.idempotency import IdempotencyKey
+from utils.db_utils import upsert_insert
+
+db = get_db_connection()
+
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class StoredResponse(NamedTuple):
+    """
+    The response of a request made with an Idempotency-Key, replayed for retries of the same request.
+    """
+    request_hash: str
+    status_code: int
+    body: Dict[str, Any]
+
+
+def hash_request_body(body: Any) -> str:
+    """
+    Hashes a JSON request body, so a key reused for a different request can be detected.
+
+    Args:
+        body: The parsed JSON body of the request.
+
+    Returns:
+        str: Hex sha256 of the canonical JSON encoding of the body.
+    """
+    return hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Bounded store of the responses of requests made with an Idempotency-Key header.
+
+    A request first claims its (user id, key), so a retry arriving while the original request is still
+    running is rejected instead of redoing the work. Responses are kept in an in-process LRU/TTL cache.
+    When `use_database` is set, keys are claimed by inserting a pending row in the idempotency_keys table
+    (INSERT ... ON CONFLICT DO NOTHING), so the claim also holds against retries landing on other workers,
+    and the row is completed with the response. Entries expire after `ttl_seconds` in both places.
+    """
+
+    def __init__(self, max_keys: int, ttl_seconds: int, pending_timeout_seconds: int, use_database: bool = False):
+        self._ttl = timedelta(seconds=ttl_seconds)
+        self._pending_timeout = timedelta(seconds=pending_timeout_seconds)
+        self._use_database = use_database
+        self._responses = TTLCache(maxsize=max_keys, ttl=ttl_seconds)
+        # keys claimed by the requests running in this worker, with their request hash
+        self._pending: Dict[Tuple[int, str], str] = {}
+        self._lock = threading.Lock()
+        self._last_purge = datetime.utcnow()
+
+    def claim(self, user_id: int, key: str, request_hash: str) -> Optional[StoredResponse]:
+        """
+        Claims a key for a new request, or finds the stored response of a completed one.
+
+        Args:
+            user_id: The user that sent the request.
+            key: The Idempotency-Key header value.
+            request_hash: Hash of the request body.
+
+        Raises:
+            UnprocessableEntity: If the key was already used for a different request body.
+            Conflict: If a request with the key is still running.
+
+        Returns:
+            Optional[StoredResponse]: The stored response to replay, or None if the key was claimed for
+            this request, which must then `save` or `release` it.
+        """
+        with self._lock:
+            stored_response = self._responses.get((user_id, key))
+            pending_hash = self._pending.get((user_id, key))
+            if not stored_response and not pending_hash and not self._use_database:
+                self._pending[(user_id, key)] = request_hash
+        if stored_response:
+            return self._check_request(stored_response.request_hash, request_hash, stored_response)
+        if pending_hash:
+            return self._check_request(pending_hash, request_hash, None)
+        if not self._use_database:
+            return None
+
+        stored_response = self._claim_row(user_id, key, request_hash)
+        if stored_response:
+            with self._lock:
+                self._responses[(user_id, key)] = stored_response
+        else:
+            with self._lock:
+                self._pending[(user_id, key)] = request_hash
+        return stored_response
+
+    @staticmethod
+    def _check_request(stored_hash: str, request_hash: str,
+                       stored_response: Optional[StoredResponse]) -> StoredResponse:
+        if stored_hash != request_hash:
+            raise UnprocessableEntity("Idempotency-Key was already used for a different request.")
+        if not stored_response:
+            raise Conflict("A request with this Idempotency-Key is still being processed, retry later.")
+        return stored_response
+
+    def _claim_row(self, user_id: int, key: str, request_hash: str) -> Optional[StoredResponse]:
+        """
+        Claims a key in the idempotency_keys table, or reads the response stored there.
+        """
+        now = datetime.utcnow()
+        self._purge_expired_rows()
+        claim_values = {"request_hash": request_hash, "pending": True, "status_code": 0, "response_body": "",
+                        "created_at": now}
+        claimed = db.session.execute(
+            upsert_insert(IdempotencyKey)
+            .values(user_id=user_id, key=key, **claim_values)
+            .on_conflict_do_nothing(index_elements=["user_id", "key"])
+        ).rowcount == 1
+        if not claimed:
+            # take over an expired key, or a pending key abandoned by a crashed worker
+            claimed = db.session.execute(
+                update(IdempotencyKey)
+                .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key,
+                       or_(IdempotencyKey.created_at < now - self._ttl,
+                           and_(IdempotencyKey.pending.is_(True),
+                                IdempotencyKey.created_at < now - self._pending_timeout)))
+                .values(**claim_values)
+            ).rowcount == 1
+        db.session.commit()
+        if claimed:
+            return None
+
+        row = db.session.execute(
+            select(IdempotencyKey.request_hash, IdempotencyKey.pending, IdempotencyKey.status_code,
+                   IdempotencyKey.response_body)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        ).one_or_none()
+        if not row:
+            # released by a request that failed in the meantime
+            return self._claim_row(user_id, key, request_hash)
+        if row.pending:
+            return self._check_request(row.request_hash, request_hash, None)
+        stored_response = StoredResponse(row.request_hash, row.status_code, json.loads(row.response_body))
+        return self._check_request(stored_response.request_hash, request_hash, stored_response)
+
+    def save(self, user_id: int, key: str, stored_response: StoredResponse) -> None:
+        """
+        Stores the response of a claimed key.
+
+        Args:
+            user_id: The user that sent the request.
+            key: The Idempotency-Key header value.
+            stored_response: The response to replay for retries.
+        """
+        with self._lock:
+            self._responses[(user_id, key)] = stored_response
+            self._pending.pop((user_id, key), None)
+        if not self._use_database:
+            return
+
+        db.session.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .values(pending=False, status_code=stored_response.status_code,
+                    response_body=json.dumps(stored_response.body))
+        )
+        db.session.commit()
+
+    def release(self, user_id: int, key: str) -> None:
+        """
+        Releases a claimed key without storing a response (the request failed and can be retried).
+
+        Args:
+            user_id: The user that sent the request.
+            key: The Idempotency-Key header value.
+        """
+        with self._lock:
+            self._pending.pop((user_id, key), None)
+        if not self._use_database:
+            return
+
+        db.session.rollback()
+        db.session.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key, IdempotencyKey.pending.is_(True))
+        )
+        db.session.commit()
+
+    def _purge_expired_rows(self) -> None:
+        """
+        Deletes expired rows from the idempotency_keys table, at most once per tenth of the ttl.
+        """
+        now = datetime.utcnow()
+        if now - self._last_purge < self._ttl / 10:
+            return
+        self._last_purge = now
+        db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at < now - self._ttl))
+
+
+def replay_or_run(user_id: int, key: str, request_body: Any, run) -> Tuple[StoredResponse, bool]:
+    """
+    Returns the stored response of an idempotency key, or claims the key, runs the request and stores
+    its response.
+
+    Args:
+        user_id: The user that sent the request.
+        key: The Idempotency-Key header value.
+        request_body: The parsed JSON body of the request.
+        run: Callable that performs the request and returns (body, status_code).
+             Only successful (2xx) responses are stored, failed requests can be retried.
+
+    Raises:
+        BadRequest: If the key is too long.
+        UnprocessableEntity: If the key was already used for a different request body.
+        Conflict: If a request with the same key is still running.
+
+    Returns:
+        Tuple[StoredResponse, bool]: The response, and whether it is a replay of a stored one.
+    """
+    if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise BadRequest(f"Idempotency-Key must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters.")
+
+    store = get_idempotency_store()
+    request_hash = hash_request_body(request_body)
+    stored_response = store.claim(user_id, key, request_hash)
+    if stored_response:
+        return stored_response, True
+
+    try:
+        body, status_code = run()
+    except Exception:
+        store.release(user_id, key)
+        raise
+
+    response = StoredResponse(request_hash, status_code, body)
+    if 200 <= status_code < 300:
+        store.save(user_id, key, response)
+    else:
+        store.release(user_id, key)
+    return response, False
+
+
+# using a singleton so all requests of this worker share the same store.
+@lru_cache(maxsize=1)
+def get_idempotency_store() -> IdempotencyStore:
+    return IdempotencyStore(IDEMPOTENCY_MAX_KEYS, IDEMPOTENCY_KEY_TTL_SECONDS, IDEMPOTENCY_PENDING_TIMEOUT_SECONDS,
+                            IDEMPOTENCY_USE_DATABASE)
@@ -0,0 +1,311 @@
+import threading
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, select, func
+from sqlalchemy.engine import Engine
+
+from config import ANALYTICS_DATABASE_URL, ANALYTICS_REFRESH_INTERVAL_SECONDS, ANALYTICS_REFRESH_OVERLAP_SECONDS, \
+    ANALYTICS_FULL_RELOAD_SECONDS
+from database import get_db_connection
+from models.category import Category
+from models.order import Order, OrderItem
+from models.product import Product
+from schemas.order import SalesInfo
+from schemas.statistics import ProductSalesPercentage, CategoryProductSales, ProductSalesInCategory, \
+    AnalyticsGroup
+
+ANALYTICS_DIMENSIONS = ("product", "category", "location", "hour", "day")
+_TIME_DIMENSION_FREQUENCIES = {"hour": "h", "day": "D"}
+_SALES_ITEM_DTYPES = {"order_id": "int64", "product_id": "int64", "location": "object", "quantity": "int64",
+                      "unit_price": "float64", "executed_at": "datetime64[ns]"}
+
+
+def _upsert_rows(frame: Union[pd.DataFrame, pd.Series],
+                 new_rows: Union[pd.DataFrame, pd.Series]) -> Union[pd.DataFrame, pd.Series]:
+    """
+    Replaces the rows of a frame (or series) indexed by id with the new versions of the same ids, and appends
+    the new ids.
+    """
+    if not len(new_rows):
+        return frame
+    return pd.concat([frame[~frame.index.isin(new_rows.index)], new_rows])
+
+
+class SalesAnalytics:
+    """
+    Columnar in-memory copy of the executed order items, for analytics queries that shouldn't hit the database.
+
+    The items of executed orders (order id, product id, location, quantity, unit price, execution time) are
+    kept in a pandas DataFrame. It is refreshed incrementally with the orders executed since the last load
+    (by `executed_at`, re-reading a short overlap for executions that committed late) and fully reloaded
+    every `full_reload_seconds`, which drops executed orders deleted by other workers. Products and
+    categories are refreshed the same way, by their `updated_at`, so statistics use current names and
+    categories like the SQL ones do (deleted products and categories are dropped by the full reload).
+    Results are computed with vectorized group-bys over the columns.
+    """
+
+    def __init__(self, database_url: Optional[str], refresh_interval_seconds: float,
+                 overlap_seconds: float, full_reload_seconds: float):
+        self._database_url = database_url
+        self._engine: Optional[Engine] = None
+        self._refresh_interval = timedelta(seconds=refresh_interval_seconds)
+        self._overlap = timedelta(seconds=overlap_seconds)
+        self._full_reload_interval = timedelta(seconds=full_reload_seconds)
+        self._lock = threading.Lock()
+
+        self._items = pd.DataFrame({name: pd.Series(dtype=dtype) for name, dtype in _SALES_ITEM_DTYPES.items()})
+        self._products = pd.DataFrame({"product_name": pd.Series(dtype="object"),
+                                       "category_id": pd.Series(dtype="int64")})
+        self._categories = pd.Series(dtype="object")
+        self._watermark: Optional[datetime] = None
+        self._dimensions_watermark: Optional[datetime] = None
+        self._last_refresh: Optional[datetime] = None
+        self._last_full_reload: Optional[datetime] = None
+
+    def _get_engine(self) -> Engine:
+        if self._database_url:
+            if self._engine is None:
+                self._engine = create_engine(self._database_url, pool_pre_ping=True)
+            return self._engine
+        return get_db_connection().engine
+
+    def refresh(self, force_full_reload: bool = False) -> int:
+        """
+        Loads the orders executed since the last load, or everything when a full reload is due.
+
+        Args:
+            force_full_reload: Reload all the executed order items.
+
+        Returns:
+            int: The number of order items loaded.
+        """
+        with self._lock:
+            return self._refresh(force_full_reload)
+
+    def _refresh(self, force_full_reload: bool) -> int:
+        now = datetime.utcnow()
+        full_reload = force_full_reload or self._last_full_reload is None or \
+            now - self._last_full_reload >= self._full_reload_interval
+
+        executed_at = func.coalesce(Order.executed_at, Order.updated_at).label("executed_at")
+        items_stmt = (
+            select(OrderItem.order_id, OrderItem.product_id, Order.location, OrderItem.quantity,
+                   OrderItem.unit_price, executed_at)
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.executed.is_(True))
+        )
+        products_stmt = select(Product.id, Product.name.label("product_name"), Product.category_id,
+                               Product.updated_at)
+        categories_stmt = select(Category.id, Category.name, Category.updated_at)
+        if not full_reload:
+            # orders executed before executed_at was recorded were loaded by the first full load.
+            overlap_start = self._watermark - self._overlap
+            items_stmt = items_stmt.where(Order.executed_at >= overlap_start)
+            dimensions_start = self._dimensions_watermark - self._overlap
+            products_stmt = products_stmt.where(Product.updated_at >= dimensions_start)
+            categories_stmt = categories_stmt.where(Category.updated_at >= dimensions_start)
+
+        with self._get_engine().connect() as connection:
+            new_items = pd.read_sql(items_stmt, connection).astype(_SALES_ITEM_DTYPES)
+            new_products = pd.read_sql(products_stmt, connection, index_col="id")
+            new_categories = pd.read_sql(categories_stmt, connection, index_col="id")
+
+        dimensions_updated_at = pd.concat([new_products["updated_at"], new_categories["updated_at"]]).max()
+        if not pd.isna(dimensions_updated_at):
+            self._dimensions_watermark = max(dimensions_updated_at.to_pydatetime(),
+                                             self._dimensions_watermark or datetime.min)
+        else:
+            self._dimensions_watermark = self._dimensions_watermark or datetime.min + self._overlap
+        new_products = new_products.drop(columns="updated_at")
+        new_categories = new_categories["name"]
+
+        if full_reload:
+            items, products, categories = new_items, new_products, new_categories
+            self._last_full_reload = now
+        else:
+            loaded_order_ids = self._items.loc[self._items["executed_at"] >= overlap_start, "order_id"]
+            new_items = new_items[~new_items["order_id"].isin(loaded_order_ids)]
+            items = pd.concat([self._items, new_items], ignore_index=True) if len(new_items) else self._items
+            products = _upsert_rows(self._products, new_products)
+            categories = _upsert_rows(self._categories, new_categories)
+
+        if len(items):
+            self._watermark = max(items["executed_at"].max().to_pydatetime(), self._watermark or datetime.min)
+        else:
+            self._watermark = self._watermark or datetime.min + self._overlap
+        # readers take a reference to these frames and never modify them.
+        self._items, self._products, self._categories = items, products, categories
+        self._last_refresh = now
+        return len(new_items)
+
+    def forget_orders(self, order_ids: Iterable[int]) -> None:
+        """
+        Drops the items of deleted executed orders.
+
+        Args:
+            order_ids: The IDs of the deleted orders.
+        """
+        with self._lock:
+            self._items = self._items[~self._items["order_id"].isin(list(order_ids))].reset_index(drop=True)
+
+    def _is_stale(self) -> bool:
+        return self._last_refresh is None or datetime.utcnow() - self._last_refresh >= self._refresh_interval
+
+    def _refresh_if_stale(self) -> None:
+        if not self._is_stale():
+            return
+        with self._lock:
+            # concurrent requests wait for the first one's refresh instead of running their own
+            if self._is_stale():
+                self._refresh(force_full_reload=False)
+
+    def _sales_frame(self) -> pd.DataFrame:
+        """
+        Refreshes the data if it is older than the refresh interval, and returns the executed order items
+        joined to the current product name and category (items of deleted products are dropped).
+        """
+        self._refresh_if_stale()
+        items, products, categories = self._items, self._products, self._categories
+        sales = items.join(products, on="product_id", how="inner")
+        sales["category_name"] = sales["category_id"].map(categories)
+        sales["revenue"] = sales["quantity"].to_numpy() * sales["unit_price"].to_numpy()
+        return sales
+
+    def total_sales(self) -> SalesInfo:
+        """
+        Returns the number of executed orders and their total price.
+        """
+        self._refresh_if_stale()
+        items = self._items
+        return SalesInfo(
+            number_of_executed_orders=int(items["order_id"].nunique()),
+            total_profit=float(np.dot(items["quantity"].to_numpy(), items["unit_price"].to_numpy()))
+        )
+
+    def product_sales_percentage(self) -> List[ProductSalesPercentage]:
+        """
+        Same result as `calculate_product_sales_percentage`, computed in memory.
+        """
+        sales = self._sales_frame()
+        quantities = sales.groupby(["product_id", "product_name"], sort=True)["quantity"].sum()
+        quantities = quantities[quantities > 0]
+        total_quantity = quantities.sum()
+        percentages = (quantities / total_quantity * 100) if total_quantity > 0 else quantities * 0.0
+
+        return [
+            ProductSalesPercentage(product_id=product_id, product_name=product_name,
+                                   total_quantity_sold=int(quantity), sales_percentage=round(float(percentage), 2))
+            for (product_id, product_name), quantity, percentage in
+            zip(quantities.index, quantities.to_numpy(), percentages.to_numpy())
+        ]
+
+    def category_product_sales(self) -> List[CategoryProductSales]:
+        """
+        Same result as `calculate_category_product_sales`, computed in memory.
+        """
+        sales = self._sales_frame()
+        quantities = sales.groupby(["category_id", "category_name", "product_id", "product_name"],
+                                   sort=True)["quantity"].sum()
+        quantities = quantities[quantities > 0].reset_index()
+        quantities["category_quantity"] = quantities.groupby("category_id")["quantity"].transform("sum")
+        quantities["percentage"] = quantities["quantity"] / quantities["category_quantity"] * 100
+
+        category_results = []
+        for row in quantities.itertuples(index=False):
+            if not category_results or category_results[-1].category_id != row.category_id:
+                category_results.append(CategoryProductSales(
+                    category_id=row.category_id,
+                    category_name=row.category_name,
+                    total_category_quantity=int(row.category_quantity),
+                    products=[]
+                ))
+            category_results[-1].products.append(ProductSalesInCategory(
+                product_id=row.product_id,
+                product_name=row.product_name,
+                quantity_sold=int(row.quantity),
+                sales_percentage_within_category=round(float(row.percentage), 2)
+            ))
+
+        return category_results
+
+    def group_sales(self, dimensions: List[str], start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> List[AnalyticsGroup]:
+        """
+        Sums the executed sales by any combination of dimensions.
+
+        Args:
+            dimensions: Names from ANALYTICS_DIMENSIONS ('product', 'category', 'location', 'hour', 'day').
+            start: Only orders executed at or after this time.
+            end: Only orders executed before this time.
+
+        Raises:
+            ValueError: If a dimension is unknown or repeated.
+
+        Returns:
+            List[AnalyticsGroup]: One entry per group, ordered by the dimension values.
+        """
+        unknown_dimensions = set(dimensions) - set(ANALYTICS_DIMENSIONS)
+        if unknown_dimensions:
+            raise ValueError(f"unknown dimensions {sorted(unknown_dimensions)}, "
+                             f"expected some of {list(ANALYTICS_DIMENSIONS)}.")
+        if len(set(dimensions)) != len(dimensions):
+            raise ValueError("dimensions must not repeat.")
+
+        sales = self._sales_frame()
+        if start:
+            sales = sales[sales["executed_at"] >= start]
+        if end:
+            sales = sales[sales["executed_at"] < end]
+
+        group_columns = []
+        for dimension in dimensions:
+            if dimension == "product":
+                group_columns += ["product_id", "product_name"]
+            elif dimension == "category":
+                group_columns += ["category_id", "category_name"]
+            elif dimension == "location":
+                group_columns.append("location")
+            else:
+                sales = sales.assign(**{dimension: sales["executed_at"].dt.floor(
+                    _TIME_DIMENSION_FREQUENCIES[dimension])})
+                group_columns.append(dimension)
+
+        if not group_columns:
+            groups = pd.DataFrame({"quantity_sold": [sales["quantity"].sum()], "revenue": [sales["revenue"].sum()],
+                                   "orders_count": [sales["order_id"].nunique()]})
+        else:
+            groups = sales.groupby(group_columns, sort=True).agg(
+                quantity_sold=("quantity", "sum"), revenue=("revenue", "sum"), orders_count=("order_id", "nunique")
+            ).reset_index()
+
+        return [
+            AnalyticsGroup(
+                keys={column: _to_json_value(row[column]) for column in group_columns},
+                quantity_sold=int(row["quantity_sold"]),
+                revenue=float(row["revenue"]),
+                orders_count=int(row["orders_count"])
+            )
+            for row in groups.to_dict("records")
+        ]
+
+
+def _to_json_value(value: Any) -> Any:
+    """
+    Converts a numpy/pandas scalar to the matching JSON value (timestamps to ISO 8601 strings).
+    """
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime().isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+# using a singleton so all requests of this worker share the loaded data.
+@lru_cache(maxsize=1)
+def get_sales_analytics() -> SalesAnalytics:
+    return SalesAnalytics(ANALYTICS_DATABASE_URL, ANALYTICS_REFRESH_INTERVAL_SECONDS,
+                          ANALYTICS_REFRESH_OVERLAP_SECONDS, ANALYTICS_FULL_RELOAD_SECONDS)
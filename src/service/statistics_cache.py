@@ -0,0 +1,140 @@
+import threading
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from cachetools import TTLCache
+
+from config import STATISTICS_CACHE_MAX_STALENESS_SECONDS, STATISTICS_CACHE_MAX_ENTRIES
+from schemas.statistics import StatisticsCacheInfo
+
+
+class _Computation:
+    """
+    A result being computed by one request, that concurrent requests for the same key wait for.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class StatisticsCache:
+    """
+    In-process cache of statistics results.
+
+    Results are dropped when executed sales change (`invalidate`, called by the services after they
+    commit) and in any case after `max_staleness_seconds`, which bounds how stale a result can be when
+    the change was made by another worker. Concurrent misses of the same key are computed once:
+    the first request computes the result and the others wait for it.
+    """
+
+    def __init__(self, max_entries: int, max_staleness_seconds: float):
+        self._max_staleness_seconds = max_staleness_seconds
+        self._results = TTLCache(maxsize=max_entries, ttl=max_staleness_seconds)
+        self._computations: Dict[Hashable, _Computation] = {}
+        self._lock = threading.Lock()
+        # bumped on every invalidation, results computed across an invalidation are not stored.
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._invalidations = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result of a key, or computes it (once for all concurrent requests).
+
+        Args:
+            key: The cache key of the result.
+            compute: Callable that computes the result, errors are raised to all waiting requests
+                     and are not cached.
+
+        Returns:
+            Any: The result. It is shared between requests and must not be modified.
+        """
+        with self._lock:
+            if key in self._results:
+                self._hits += 1
+                return self._results[key]
+
+            generation = self._generation
+            computation = self._computations.get(key)
+            is_computing_request = computation is None
+            if is_computing_request:
+                self._misses += 1
+                computation = self._computations[key] = _Computation()
+            else:
+                self._waits += 1
+
+        if not is_computing_request:
+            computation.done.wait()
+            if computation.error:
+                raise computation.error
+            return computation.result
+
+        try:
+            computation.result = compute()
+        except BaseException as e:
+            computation.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._computations.get(key) is computation:
+                    del self._computations[key]
+                if computation.error is None and generation == self._generation:
+                    self._results[key] = computation.result
+            computation.done.set()
+        return computation.result
+
+    def invalidate(self) -> None:
+        """
+        Drops all the cached results. Computations already running are not stored, so requests
+        arriving after the invalidation compute a fresh result.
+        """
+        with self._lock:
+            self._generation += 1
+            self._invalidations += 1
+            self._results.clear()
+            self._computations.clear()
+
+    def info(self) -> StatisticsCacheInfo:
+        """
+        Returns the cache counters of this worker.
+        """
+        with self._lock:
+            return StatisticsCacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                waits=self._waits,
+                invalidations=self._invalidations,
+                entries=len(self._results),
+                max_staleness_seconds=self._max_staleness_seconds
+            )
+
+
+# using a singleton so all requests of this worker share the same cache.
+@lru_cache(maxsize=1)
+def get_statistics_cache() -> StatisticsCache:
+    return StatisticsCache(STATISTICS_CACHE_MAX_ENTRIES, STATISTICS_CACHE_MAX_STALENESS_SECONDS)
+
+
+def cached_statistics(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Decorator that serves a statistics service function from the statistics cache,
+    keyed by the function name and its arguments.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        return get_statistics_cache().get_or_compute(key, lambda: func(*args, **kwargs))
+
+    return wrapper
+
+
+def invalidate_statistics_cache() -> None:
+    """
+    Drops the cached statistics, called after committing a change to executed sales
+    (or to the names of the products and categories they show).
+    """
+    get_statistics_cache().invalidate()
@@ -0,0 +1,125 @@
+from typing import Tuple
+
+import click
+from flask import Flask
+
+from config import EXECUTION_BATCH_SIZE, EXECUTION_POLL_INTERVAL_SECONDS
+from service.db.distinct_buyers_service import rebuild_distinct_buyers, benchmark_distinct_buyers
+from service.db.order_benchmark_service import benchmark_order_creation, benchmark_order_profit
+from service.db.order_service import backfill_order_totals
+from service.db.order_value_service import rebuild_order_value_digests
+from service.db.statistics import location_top_products_select
+from service.db.sales_rollup_service import rebuild_sales_rollups, check_sales_rollups
+from service.execution_worker import ExecutionWorkerPool
+from utils.db_utils import explain_query
+
+
+def setup_cli_commands(app: Flask) -> None:
+    """
+    Registers the maintenance commands of the app (run with `flask --app app <command>`).
+
+    :param app: the flask app.
+    :return: None
+    """
+
+    @app.cli.command("backfill-order-totals")
+    @click.option("--batch-size", default=1000, show_default=True, help="Orders updated per transaction.")
+    def backfill_order_totals_command(batch_size: int) -> None:
+        """Recomputes the stored item count and total price of every order."""
+        updated_orders = backfill_order_totals(batch_size)
+        click.echo(f"updated the totals of {updated_orders} orders.")
+
+    @app.cli.command("benchmark-order-creation")
+    @click.option("--items", "item_counts", multiple=True, type=click.IntRange(min=1), default=[1, 10, 50, 200],
+                  show_default=True, help="Products per order (repeatable).")
+    @click.option("--repeats", default=5, show_default=True, help="Orders created per item count.")
+    def benchmark_order_creation_command(item_counts: Tuple[int, ...], repeats: int) -> None:
+        """Compares the statements and latency of creating orders with per item and batched item inserts."""
+        try:
+            results = benchmark_order_creation(list(item_counts), repeats)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        for result in results:
+            click.echo(f"{result['items']} items: "
+                       f"per item {result['per_item_statements']} statements {result['per_item_ms']:.1f} ms, "
+                       f"batched {result['batched_statements']} statements {result['batched_ms']:.1f} ms.")
+
+    @app.cli.command("benchmark-order-profit")
+    @click.option("--orders", "orders_count", default=1_000_000, show_default=True, type=click.IntRange(min=0),
+                  help="Executed orders seeded for the benchmark (deleted at the end).")
+    @click.option("--items-per-order", default=3, show_default=True, type=click.IntRange(min=1))
+    @click.option("--batch-size", default=10000, show_default=True, type=click.IntRange(min=1),
+                  help="Orders inserted, backfilled and deleted per transaction.")
+    @click.option("--per-order/--no-per-order", default=True, show_default=True,
+                  help="Also time the per order calculation (loads every executed order in memory).")
+    def benchmark_order_profit_command(orders_count: int, items_per_order: int, batch_size: int,
+                                       per_order: bool) -> None:
+        """Compares the profit calculations and times the totals backfill, on a benchmark database."""
+        try:
+            results = benchmark_order_profit(orders_count, items_per_order, batch_size, per_order)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{results['executed_orders']} executed orders, seeded in {results['seed_seconds']:.1f} s, "
+                   f"totals backfilled in {results['backfill_seconds']:.1f} s.")
+        for name in ("per_order", "stored_totals", "rollup"):
+            if name in results:
+                orders, profit = results[name]
+                click.echo(f"{name}: {results[f'{name}_seconds'] * 1000:.1f} ms "
+                           f"({orders} orders, profit {profit:.2f}).")
+
+    @app.cli.command("run-execution-workers")
+    @click.option("--workers", default=2, show_default=True, help="Number of worker threads.")
+    @click.option("--batch-size", default=EXECUTION_BATCH_SIZE, show_default=True, help="Jobs executed together.")
+    def run_execution_workers_command(workers: int, batch_size: int) -> None:
+        """Drains the order execution queue in the foreground (for dedicated worker processes)."""
+        pool = ExecutionWorkerPool(app, workers, batch_size, EXECUTION_POLL_INTERVAL_SECONDS)
+        pool.start()
+        click.echo(f"started {workers} execution workers.")
+        pool.join()
+
+    @app.cli.command("rebuild-sales-rollups")
+    def rebuild_sales_rollups_command() -> None:
+        """Recomputes the product, category and location sales rollups from order_item."""
+        rebuild_sales_rollups()
+        click.echo("sales rollups rebuilt.")
+
+    @app.cli.command("check-sales-rollups")
+    def check_sales_rollups_command() -> None:
+        """Compares the sales rollups with order_item, exits with status 1 on mismatches."""
+        mismatches = check_sales_rollups()
+        for mismatch in mismatches:
+            click.echo(mismatch)
+        if mismatches:
+            raise SystemExit(1)
+        click.echo("sales rollups are consistent.")
+
+    @app.cli.command("rebuild-distinct-buyers")
+    def rebuild_distinct_buyers_command() -> None:
+        """Recomputes the per product and per category daily buyers sketches from the executed orders."""
+        rebuild_distinct_buyers()
+        click.echo("distinct buyers sketches rebuilt.")
+
+    @app.cli.command("benchmark-distinct-buyers")
+    @click.option("--group-by", type=click.Choice(["product", "category"]), default="product", show_default=True)
+    def benchmark_distinct_buyers_command(group_by: str) -> None:
+        """Compares the distinct buyers estimates with the exact COUNT(DISTINCT user_id) query."""
+        results = benchmark_distinct_buyers(group_by)
+        click.echo(f"compared {results['compared']} {group_by} estimates: "
+                   f"mean relative error {results['mean_relative_error']:.2%}, "
+                   f"max relative error {results['max_relative_error']:.2%}, "
+                   f"exact query {results['exact_query_seconds'] * 1000:.1f} ms, "
+                   f"sketches {results['sketch_query_seconds'] * 1000:.1f} ms.")
+
+    @app.cli.command("rebuild-order-value-digests")
+    def rebuild_order_value_digests_command() -> None:
+        """Recomputes the per day and per location order value digests from the executed orders."""
+        rebuild_order_value_digests()
+        click.echo("order value digests rebuilt.")
+
+    @app.cli.command("explain-location-sales")
+    @click.argument("location")
+    @click.option("--top", default=5, show_default=True, help="Number of top products.")
+    def explain_location_sales_command(location: str, top: int) -> None:
+        """Prints the query plan of a country's top products query, to check it uses the location index."""
+        for line in explain_query(location_top_products_select(location, top)):
+            click.echo(line)
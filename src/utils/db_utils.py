@@ -0,0 +1,122 @@
+from datetime import datetime
+from typing import List
+
+from sqlalchemy import inspect, text, func, literal_column, type_coerce, DateTime
+
+from database import get_db_connection
+
+
+def add_missing_columns() -> None:
+    """
+    Adds columns that were added to the models after their tables were created.
+
+    `db.create_all()` only creates missing tables, so columns added to an existing model are added
+    here with `ALTER TABLE ... ADD COLUMN`. Only nullable columns or columns with a server default
+    can be added this way.
+
+    :return: None
+    """
+    db = get_db_connection()
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+
+            column_ddl = f"{preparer.quote(column.name)} {column.type.compile(dialect=db.engine.dialect)}"
+            if column.server_default is not None:
+                column_ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                column_ddl += " NOT NULL"
+
+            with db.engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"))
+            print(f"added column {column.name} to table {table.name}")
+
+
+def add_missing_indexes() -> None:
+    """
+    Creates indexes that were added to the models after their tables were created.
+
+    `db.create_all()` only creates the indexes of the tables it creates, so indexes added to an existing
+    model are created here.
+
+    :return: None
+    """
+    db = get_db_connection()
+    inspector = inspect(db.engine)
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+                print(f"added index {index.name} to table {table.name}")
+
+
+def explain_query(statement) -> List[str]:
+    """
+    Returns the query plan of a statement (EXPLAIN on postgres, EXPLAIN QUERY PLAN on sqlite).
+
+    :param statement: the SQLAlchemy statement.
+    :return: the lines of the plan.
+    """
+    db = get_db_connection()
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    explain = "EXPLAIN QUERY PLAN" if dialect.name == "sqlite" else "EXPLAIN"
+    # the plan text is the last column (sqlite also returns the plan node ids)
+    return [row[-1] for row in db.session.execute(text(f"{explain} {sql}"))]
+
+
+def upsert_insert(model):
+    """
+    Creates an INSERT statement for the model that supports `on_conflict_do_update`.
+
+    :param model: the model (or table) to insert into.
+    :return: a postgresql (or sqlite, for local runs) dialect INSERT statement.
+    """
+    db = get_db_connection()
+    if db.engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(model)
+
+
+def truncate_datetime(column, granularity: str):
+    """
+    Truncates a datetime SQL expression to the start of its hour or day.
+
+    :param column: the datetime column or expression.
+    :param granularity: 'hour' or 'day'.
+    :return: SQL expression of the truncated datetime (date_trunc on postgres, strftime on sqlite).
+    """
+    db = get_db_connection()
+    if db.engine.dialect.name == "sqlite":
+        time_format = {'hour': '%Y-%m-%d %H:00:00.000000', 'day': '%Y-%m-%d 00:00:00.000000'}[granularity]
+        return type_coerce(func.strftime(literal_column(f"'{time_format}'"), column), DateTime)
+    # rendered inline, so postgres sees the same expression in the SELECT list and the GROUP BY
+    return func.date_trunc(literal_column(f"'{granularity}'"), column)
+
+
+def truncate_datetime_value(value: datetime, granularity: str) -> datetime:
+    """
+    Truncates a datetime to the start of its hour or day.
+
+    :param value: the datetime to truncate.
+    :param granularity: 'hour' or 'day'.
+    :return: the truncated datetime.
+    """
+    if granularity == 'day':
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
@@ -0,0 +1,70 @@
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, NamedTuple, Optional
+
+from flask import Response, request
+
+
+class ResourceVersion(NamedTuple):
+    """
+    Validators of a resource's current state, for conditional GET requests.
+    """
+    etag: str
+    last_modified: Optional[datetime]
+
+
+def make_resource_version(last_modified: Optional[datetime], *parts: Any) -> ResourceVersion:
+    """
+    Builds the validators of a resource from its last modification time and other version parts
+    (e.g. its rows count, so deletions change the ETag too).
+
+    :param last_modified: the latest `updated_at` of the resource's rows (naive UTC), if known.
+    :param parts: other values that change when the resource changes.
+    :return: the resource version, with a weak ETag (it identifies the data, not the response bytes).
+    """
+    digest = hashlib.sha1("|".join(map(str, (last_modified, *parts))).encode()).hexdigest()[:20]
+    if last_modified is not None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return ResourceVersion(etag=digest, last_modified=last_modified)
+
+
+def is_not_modified(version: ResourceVersion) -> bool:
+    """
+    Checks whether the client's cached copy of the resource is still current, from the request's
+    If-None-Match (checked first) or If-Modified-Since header.
+
+    :param version: the resource's current version.
+    :return: True if a 304 Not Modified response can be sent.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(version.etag)
+    if request.if_modified_since and version.last_modified:
+        # HTTP dates have a one second resolution
+        return version.last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def set_version_headers(response: Response, version: ResourceVersion) -> Response:
+    """
+    Adds the ETag and Last-Modified headers of a resource to a response, and asks clients to revalidate
+    their cached copy on every use.
+
+    :param response: the response.
+    :param version: the resource's current version.
+    :return: the same response.
+    """
+    response.set_etag(version.etag, weak=True)
+    if version.last_modified:
+        response.last_modified = version.last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified_response(version: ResourceVersion) -> Response:
+    """
+    Creates an empty 304 Not Modified response with the resource's validators.
+
+    :param version: the resource's current version.
+    :return: the response.
+    """
+    return set_version_headers(Response(status=304), version)
@@ -0,0 +1,50 @@
+import base64
+import json
+from typing import Any, List, Optional
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encodes the keyset values of the last returned row into an opaque cursor string.
+
+    :param values: JSON serializable values of the sort key (e.g. [created_at_iso, id]).
+    :return: url-safe cursor string.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """
+    Decodes a cursor created by `encode_cursor`.
+
+    :param cursor: the cursor string given by the client, may be None for the first page.
+    :param size: the expected number of keyset values in the cursor.
+    :raises ValueError: if the cursor is malformed.
+    :return: the keyset values, or None if no cursor was given.
+    """
+    if not cursor:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("invalid cursor.")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("invalid cursor.")
+    return values
+
+
+def parse_page_size(raw_limit: Optional[str], default: int, maximum: int) -> int:
+    """
+    Parses a page size query parameter.
+
+    :param raw_limit: the raw 'limit' query param, may be None.
+    :param default: the page size used when no limit is given.
+    :param maximum: the largest allowed page size.
+    :raises ValueError: if the limit isn't a positive integer.
+    :return: the page size, capped at `maximum`.
+    """
+    if raw_limit is None:
+        return default
+    if not raw_limit.isdigit() or int(raw_limit) == 0:
+        raise ValueError(f"invalid 'limit' parameter: {raw_limit}")
+    return min(int(raw_limit), maximum)
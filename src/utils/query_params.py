@@ -0,0 +1,55 @@
+from datetime import datetime
+from typing import Optional
+
+
+def parse_bool_param(raw_value: Optional[str], name: str) -> Optional[bool]:
+    """
+    Parses an optional boolean query parameter ('true'/'false', '1'/'0').
+
+    :param raw_value: the raw query param value, may be None.
+    :param name: the query param name, used in the error message.
+    :raises ValueError: if the value isn't a boolean.
+    :return: the parsed boolean, or None if the param wasn't given.
+    """
+    if raw_value is None:
+        return None
+    value = raw_value.strip().lower()
+    if value in ("true", "1"):
+        return True
+    if value in ("false", "0"):
+        return False
+    raise ValueError(f"invalid '{name}' parameter: {raw_value}")
+
+
+def parse_float_param(raw_value: Optional[str], name: str) -> Optional[float]:
+    """
+    Parses an optional number query parameter.
+
+    :param raw_value: the raw query param value, may be None.
+    :param name: the query param name, used in the error message.
+    :raises ValueError: if the value isn't a number.
+    :return: the parsed number, or None if the param wasn't given.
+    """
+    if raw_value is None:
+        return None
+    try:
+        return float(raw_value)
+    except ValueError:
+        raise ValueError(f"invalid '{name}' parameter: {raw_value}")
+
+
+def parse_datetime_param(raw_value: Optional[str], name: str) -> Optional[datetime]:
+    """
+    Parses an optional ISO 8601 date/datetime query parameter (e.g. 2025-01-31 or 2025-01-31T10:00:00).
+
+    :param raw_value: the raw query param value, may be None.
+    :param name: the query param name, used in the error message.
+    :raises ValueError: if the value isn't an ISO 8601 date.
+    :return: the parsed datetime, or None if the param wasn't given.
+    """
+    if not raw_value:
+        return None
+    try:
+        return datetime.fromisoformat(raw_value)
+    except ValueError:
+        raise ValueError(f"invalid '{name}' parameter, expected an ISO 8601 date: {raw_value}")
@@ -0,0 +1,144 @@
+import bisect
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Splits a text into lowercase trigrams the way pg_trgm does: every word is padded with two spaces
+    before and one after, so word starts weigh more than word ends.
+
+    :param text: the text.
+    :return: the set of its trigrams.
+    """
+    grams = set()
+    for word in _WORD_PATTERN.findall(text.lower()):
+        padded_word = f"  {word} "
+        grams.update(padded_word[index:index + 3] for index in range(len(padded_word) - 2))
+    return grams
+
+
+class SearchMatch(NamedTuple):
+    """
+    A name matching a search, with its trigram similarity to the query (0 to 1).
+    """
+    id: int
+    name: str
+    score: float
+    prefix_match: bool
+
+
+class NgramIndex:
+    """
+    In-memory name index for prefix and fuzzy (trigram similarity) search.
+
+    Prefix matches are found by binary search in a sorted list of the lowercase names. Fuzzy matches are
+    found through an inverted index from trigram to ids and ranked by trigram similarity
+    (shared trigrams / all trigrams of both, like pg_trgm's `similarity`).
+    """
+
+    def __init__(self):
+        self._names: Dict[int, str] = {}
+        self._trigram_counts: Dict[int, int] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._sorted_names: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+
+    def build(self, entries: Iterable[Tuple[int, str]]) -> None:
+        """
+        Replaces the index content with the given (id, name) entries.
+        """
+        names, trigram_counts, postings = {}, {}, {}
+        for entry_id, name in entries:
+            names[entry_id] = name
+            name_trigrams = trigrams(name)
+            trigram_counts[entry_id] = len(name_trigrams)
+            for gram in name_trigrams:
+                postings.setdefault(gram, set()).add(entry_id)
+        sorted_names = sorted((name.lower(), entry_id) for entry_id, name in names.items())
+
+        with self._lock:
+            self._names, self._trigram_counts, self._postings = names, trigram_counts, postings
+            self._sorted_names = sorted_names
+
+    def add(self, entry_id: int, name: str) -> None:
+        """
+        Adds an entry, or replaces the name of an existing one.
+        """
+        with self._lock:
+            self._remove(entry_id)
+            self._names[entry_id] = name
+            name_trigrams = trigrams(name)
+            self._trigram_counts[entry_id] = len(name_trigrams)
+            for gram in name_trigrams:
+                self._postings.setdefault(gram, set()).add(entry_id)
+            bisect.insort(self._sorted_names, (name.lower(), entry_id))
+
+    def remove(self, entry_id: int) -> None:
+        """
+        Removes an entry (ignored if it isn't indexed).
+        """
+        with self._lock:
+            self._remove(entry_id)
+
+    def _remove(self, entry_id: int) -> None:
+        name = self._names.pop(entry_id, None)
+        if name is None:
+            return
+        del self._trigram_counts[entry_id]
+        for gram in trigrams(name):
+            gram_ids = self._postings.get(gram)
+            if gram_ids is not None:
+                gram_ids.discard(entry_id)
+                if not gram_ids:
+                    del self._postings[gram]
+        position = bisect.bisect_left(self._sorted_names, (name.lower(), entry_id))
+        if position < len(self._sorted_names) and self._sorted_names[position] == (name.lower(), entry_id):
+            del self._sorted_names[position]
+
+    def search(self, query: str, limit: int, min_similarity: float) -> List[SearchMatch]:
+        """
+        Finds the names starting with the query or similar to it.
+
+        :param query: the search text.
+        :param limit: the maximum number of matches.
+        :param min_similarity: the lowest trigram similarity of a fuzzy match.
+        :return: the matches, prefix matches first, then by similarity (highest first) and name.
+        """
+        query_trigrams = trigrams(query)
+        prefix = query.lower()
+        with self._lock:
+            prefix_ids = []
+            position = bisect.bisect_left(self._sorted_names, (prefix,))
+            while position < len(self._sorted_names) and len(prefix_ids) < limit:
+                lowercase_name, entry_id = self._sorted_names[position]
+                if not lowercase_name.startswith(prefix):
+                    break
+                prefix_ids.append(entry_id)
+                position += 1
+
+            shared_trigrams = Counter()
+            for gram in query_trigrams:
+                shared_trigrams.update(self._postings.get(gram, ()))
+
+            def similarity(entry_id: int) -> float:
+                shared = shared_trigrams[entry_id]
+                total = len(query_trigrams) + self._trigram_counts[entry_id] - shared
+                return shared / total if total else 0.0
+
+            matches = [SearchMatch(entry_id, self._names[entry_id], similarity(entry_id), True)
+                       for entry_id in prefix_ids]
+            prefix_id_set = set(prefix_ids)
+            fuzzy_matches = [
+                SearchMatch(entry_id, self._names[entry_id], score, False)
+                for entry_id, score in ((entry_id, similarity(entry_id)) for entry_id in shared_trigrams)
+                if score >= min_similarity and entry_id not in prefix_id_set
+            ]
+
+        matches.sort(key=lambda match: (-match.score, match.name))
+        fuzzy_matches.sort(key=lambda match: (-match.score, match.name))
+        return (matches + fuzzy_matches)[:limit]
@@ -0,0 +1,208 @@
+import hashlib
+import math
+import struct
+from typing import Any, List, Optional, Tuple
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct count sketch (Flajolet et al.), with 2 ** precision one byte registers.
+
+    The relative standard error of `count` is about 1.04 / sqrt(2 ** precision). Sketches of the same
+    precision merge by taking the maximum of every register, so the sketches of several products, categories
+    or days can be combined into the distinct count of their union. Values are hashed with blake2b, so sketches
+    built by different processes are compatible.
+    """
+
+    _DENSE_FORMAT = 0
+    _SPARSE_FORMAT = 1
+
+    def __init__(self, precision: int):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    def add(self, value: Any) -> None:
+        """
+        Adds a value (compared by its str()) to the sketch.
+        """
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+        register_index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rank = remaining_bits - (hashed & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self._registers[register_index]:
+            self._registers[register_index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """
+        Adds all the values of another sketch of the same precision to this one.
+        """
+        if other.precision != self.precision:
+            raise ValueError("can't merge HyperLogLog sketches of different precisions")
+        self._registers = bytearray(map(max, self._registers, other._registers))
+
+    def count(self) -> int:
+        """
+        Returns the estimated number of distinct values added.
+        """
+        registers_count = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / registers_count)
+        estimate = alpha * registers_count ** 2 / sum(2.0 ** -register for register in self._registers)
+
+        empty_registers = self._registers.count(0)
+        if estimate <= 2.5 * registers_count and empty_registers:
+            # small range correction (linear counting)
+            estimate = registers_count * math.log(registers_count / empty_registers)
+        return round(estimate)
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the sketch. Sketches with few used registers are stored sparsely,
+        as (register index, value) pairs.
+        """
+        used_registers = [(index, register) for index, register in enumerate(self._registers) if register]
+        if len(used_registers) * 3 < len(self._registers):
+            return bytes([self._SPARSE_FORMAT, self.precision]) + b"".join(
+                index.to_bytes(2, "big") + bytes([register]) for index, register in used_registers)
+        return bytes([self._DENSE_FORMAT, self.precision]) + bytes(self._registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        """
+        Deserializes a sketch serialized with `to_bytes`.
+        """
+        sketch_format, precision = data[0], data[1]
+        sketch = cls(precision)
+        if sketch_format == cls._DENSE_FORMAT:
+            sketch._registers = bytearray(data[2:])
+        else:
+            for offset in range(2, len(data), 3):
+                sketch._registers[int.from_bytes(data[offset:offset + 2], "big")] = data[offset + 2]
+        return sketch
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning) for estimating quantiles of a stream of values.
+
+    Values are summarized by at most about `compression` centroids (mean, weight), kept small near the
+    extremes (k1 scale function) so tail quantiles like p99 stay accurate. Digests merge by compressing the
+    union of their centroids, so digests of several days or locations can be combined into the digest of
+    all their values.
+    """
+
+    _FORMAT = 0
+    _HEADER = struct.Struct(">BHddI")
+    _CENTROID = struct.Struct(">dd")
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids: List[Tuple[float, float]] = []
+        self._unmerged: List[Tuple[float, float]] = []
+
+    def add(self, value: float, weight: float = 1) -> None:
+        """
+        Adds a value with the given weight.
+        """
+        self._unmerged.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._unmerged) > 5 * self.compression:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> None:
+        """
+        Adds all the values of another digest to this one.
+        """
+        other._compress()
+        self._unmerged.extend(other._centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _scale(self, quantile: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * quantile - 1)
+
+    def _inverse_scale(self, scale: float) -> float:
+        return (math.sin(scale * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        """
+        Merges the buffered values into the centroids, merging neighbours while the centroid stays
+        within one unit of the scale function.
+        """
+        if not self._unmerged:
+            return
+        points = sorted(self._centroids + self._unmerged)
+        self._unmerged = []
+
+        centroids = []
+        merged_weight = 0.0
+        mean, weight = points[0]
+        weight_limit = self.count * self._inverse_scale(self._scale(0) + 1)
+        for point_mean, point_weight in points[1:]:
+            if merged_weight + weight + point_weight <= weight_limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                centroids.append((mean, weight))
+                merged_weight += weight
+                weight_limit = self.count * self._inverse_scale(self._scale(merged_weight / self.count) + 1)
+                mean, weight = point_mean, point_weight
+        centroids.append((mean, weight))
+        self._centroids = centroids
+
+    def quantile(self, quantile: float) -> Optional[float]:
+        """
+        Returns the estimated value at a quantile (0 to 1), or None if the digest is empty.
+        """
+        self._compress()
+        if not self._centroids:
+            return None
+        if len(self._centroids) == 1:
+            return self._centroids[0][0]
+
+        target = quantile * self.count
+        first_mean, first_weight = self._centroids[0]
+        if target < first_weight / 2:
+            return self.min + (first_mean - self.min) * target / (first_weight / 2)
+
+        # interpolate between the centers of the centroids around the target rank
+        center_rank = first_weight / 2
+        for (left_mean, left_weight), (right_mean, right_weight) in zip(self._centroids, self._centroids[1:]):
+            next_center_rank = center_rank + (left_weight + right_weight) / 2
+            if target <= next_center_rank:
+                fraction = (target - center_rank) / (next_center_rank - center_rank)
+                return left_mean + (right_mean - left_mean) * fraction
+            center_rank = next_center_rank
+
+        last_mean, last_weight = self._centroids[-1]
+        fraction = min((target - center_rank) / (last_weight / 2), 1)
+        return last_mean + (self.max - last_mean) * fraction
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the digest (its centroids).
+        """
+        self._compress()
+        return self._HEADER.pack(self._FORMAT, self.compression, self.min, self.max, len(self._centroids)) + \
+            b"".join(self._CENTROID.pack(mean, weight) for mean, weight in self._centroids)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        """
+        Deserializes a digest serialized with `to_bytes`.
+        """
+        _, compression, min_value, max_value, centroids_count = cls._HEADER.unpack_from(data)
+        digest = cls(compression)
+        digest.min, digest.max = min_value, max_value
+        digest._centroids = [cls._CENTROID.unpack_from(data, cls._HEADER.size + index * cls._CENTROID.size)
+                             for index in range(centroids_count)]
+        digest.count = sum(weight for _, weight in digest._centroids)
+        return digest
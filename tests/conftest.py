@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+sys.path.insert(0, SRC_DIR)
+
+from database import get_db_connection  # noqa: E402
+import models.buyer_sketch, models.category, models.execution_job, models.idempotency, models.order, \
+    models.order_value_digest, models.product, models.sales_bucket, models.sales_rollup, models.user  # noqa: E402,F401
+
+
+@pytest.fixture
+def app():
+    """
+    A Flask app bound to an empty in-memory SQLite database, with all tables created.
+    """
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+    app.config["TESTING"] = True
+    db = get_db_connection()
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return get_db_connection()
@@ -0,0 +1,126 @@
+import random
+from collections import defaultdict
+
+from models.category import Category
+from models.order import Order, OrderItem
+from models.product import Product
+from models.user import User
+from schemas.product import UpdateProduct
+from service.db.order_service import execute_order, execute_orders
+from service.db.product_service import update_product
+from service.db.sales_rollup_service import rebuild_sales_rollups
+from service.db.statistics import calculate_category_product_sales
+
+
+def seed_orders(db, categories_count=4, products_count=30, orders_count=200, seed=12):
+    """
+    Seeds categories, products and orders with random items, about a third of the orders are not executed,
+    and rebuilds the sales rollups from them.
+    """
+    rng = random.Random(seed)
+    user = User(email="buyer@example.com", password_hash="x", full_name="Buyer")
+    categories = [Category(name=f"category-{index}") for index in range(categories_count)]
+    db.session.add_all([user, *categories])
+    db.session.flush()
+
+    products = [Product(name=f"product-{index}", quantity=1000, price=rng.randint(1, 50),
+                        category_id=rng.choice(categories).id)
+                for index in range(products_count)]
+    db.session.add_all(products)
+    db.session.flush()
+
+    for _ in range(orders_count):
+        order = Order(user_id=user.id, location="Israel", executed=rng.random() < 0.66)
+        for product in rng.sample(products, rng.randint(1, min(5, len(products)))):
+            order.items.append(OrderItem(product_id=product.id, quantity=rng.randint(1, 9), unit_price=product.price))
+        db.session.add(order)
+    db.session.flush()
+    rebuild_sales_rollups()
+    db.session.commit()
+
+
+def per_item_category_product_sales(db):
+    """
+    The previous implementation: loads the executed orders and looks up the product of every item and the
+    category of every product.
+    """
+    category_sales = defaultdict(lambda: defaultdict(int))
+    product_info = {}
+    for order in Order.query.filter_by(executed=True).all():
+        for item in order.items:
+            product = db.session.get(Product, item.product_id)
+            product_info[product.id] = product
+            category_sales[product.category_id][product.id] += item.quantity
+
+    category_results = []
+    for category_id, products in category_sales.items():
+        category = db.session.get(Category, category_id)
+        total_category_qty = sum(products.values())
+        category_results.append({
+            "category_id": category.id,
+            "category_name": category.name,
+            "total_category_quantity": total_category_qty,
+            "products": sorted([{
+                "product_id": product_id,
+                "product_name": product_info[product_id].name,
+                "quantity_sold": qty,
+                "sales_percentage_within_category": round(qty / total_category_qty * 100, 2),
+            } for product_id, qty in products.items()], key=lambda product: product["product_id"]),
+        })
+    return sorted(category_results, key=lambda category: category["category_id"])
+
+
+def test_matches_per_item_algorithm(db):
+    seed_orders(db)
+
+    results = [category.dict() for category in calculate_category_product_sales()]
+
+    assert results == per_item_category_product_sales(db)
+
+
+def test_ignores_orders_that_were_not_executed(db):
+    seed_orders(db, orders_count=20)
+    Order.query.update({Order.executed: False})
+    rebuild_sales_rollups()
+    db.session.commit()
+
+    assert calculate_category_product_sales() == []
+
+
+def test_categories_without_sales_are_omitted(db):
+    seed_orders(db, categories_count=2, products_count=4, orders_count=30)
+    db.session.add(Category(name="unsold"))
+    db.session.commit()
+
+    category_names = {category.category_name for category in calculate_category_product_sales()}
+
+    assert "unsold" not in category_names
+    assert category_names <= {"category-0", "category-1"}
+
+
+def test_executing_orders_updates_the_breakdown(db):
+    seed_orders(db)
+    user_id = User.query.one().id
+    pending_ids = [order.id for order in Order.query.filter_by(executed=False).order_by(Order.id)]
+
+    execute_order(pending_ids[0], user_id)
+    execute_orders(pending_ids[1:], user_id)
+
+    results = [category.dict() for category in calculate_category_product_sales()]
+    assert Order.query.filter_by(executed=False).count() == 0
+    assert results == per_item_category_product_sales(db)
+
+
+def test_moving_a_product_moves_its_sales_to_the_new_category(db):
+    seed_orders(db)
+    user_id = User.query.one().id
+    execute_orders([order.id for order in Order.query.filter_by(executed=False)], user_id)
+    product = db.session.get(Product, 1)
+    old_category_name = product.category.name
+
+    update_product(UpdateProduct(id=product.id, category="category-new"))
+
+    results = {category.category_name: category for category in calculate_category_product_sales()}
+    assert [category.dict() for category in results.values()] == per_item_category_product_sales(db)
+    assert [sold.product_id for sold in results["category-new"].products] == [product.id]
+    assert product.id not in [sold.product_id for sold in results[old_category_name].products]
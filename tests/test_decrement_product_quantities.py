@@ -0,0 +1,41 @@
+import pytest
+
+from models.category import Category
+from models.product import Product
+from service.db.product_service import decrement_product_quantities
+
+
+def seed_products(db, stock):
+    """
+    Seeds one product per (name, quantity) pair, returns their ids by name.
+    """
+    category = Category(name="pantry")
+    db.session.add(category)
+    db.session.flush()
+    products = [Product(name=name, quantity=quantity, price=1.0, category_id=category.id)
+                for name, quantity in stock.items()]
+    db.session.add_all(products)
+    db.session.commit()
+    return {product.name: product.id for product in products}
+
+
+def test_decrements_every_product(db):
+    ids = seed_products(db, {"rice": 5, "beans": 3})
+
+    decrement_product_quantities({ids["rice"]: 2, ids["beans"]: 3})
+
+    assert {product.name: product.quantity for product in Product.query.all()} == {"rice": 3, "beans": 0}
+
+
+def test_names_the_short_product_when_an_earlier_one_was_decremented(db):
+    ids = seed_products(db, {"rice": 5, "beans": 1})
+
+    with pytest.raises(ValueError, match="asked for 2 of beans"):
+        decrement_product_quantities({ids["rice"]: 3, ids["beans"]: 2})
+
+
+def test_reports_a_missing_product(db):
+    ids = seed_products(db, {"rice": 5})
+
+    with pytest.raises(ValueError, match="product with id 999 doesn't exist"):
+        decrement_product_quantities({ids["rice"]: 1, 999: 1})